@@ -0,0 +1,30 @@
+"""Add composite indexes for audit log keyset pagination
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Newest-first listing, overall and filtered by user or document
+    op.create_index('ix_audit_logs_timestamp_id', 'audit_logs', ['timestamp', 'id'], unique=False)
+    op.create_index('ix_audit_logs_user_id_timestamp_id', 'audit_logs', ['user_id', 'timestamp', 'id'], unique=False)
+    op.create_index(
+        'ix_audit_logs_document_id_timestamp_id', 'audit_logs', ['document_id', 'timestamp', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_audit_logs_document_id_timestamp_id', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_user_id_timestamp_id', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_timestamp_id', table_name='audit_logs')
@@ -0,0 +1,67 @@
+"""Add full-text document search index
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+# External-content FTS5 table over document_search, kept in sync by triggers
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS document_search_fts USING fts5("
+    "document_number, title, body, content='document_search', content_rowid='document_id')",
+    "CREATE TRIGGER IF NOT EXISTS document_search_ai AFTER INSERT ON document_search BEGIN "
+    "INSERT INTO document_search_fts(rowid, document_number, title, body) "
+    "VALUES (new.document_id, new.document_number, new.title, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS document_search_ad AFTER DELETE ON document_search BEGIN "
+    "INSERT INTO document_search_fts(document_search_fts, rowid, document_number, title, body) "
+    "VALUES ('delete', old.document_id, old.document_number, old.title, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS document_search_au AFTER UPDATE ON document_search BEGIN "
+    "INSERT INTO document_search_fts(document_search_fts, rowid, document_number, title, body) "
+    "VALUES ('delete', old.document_id, old.document_number, old.title, old.body); "
+    "INSERT INTO document_search_fts(rowid, document_number, title, body) "
+    "VALUES (new.document_id, new.document_number, new.title, new.body); END",
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'document_search',
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('document_number', sa.String(length=30), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('document_id')
+    )
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.create_index(
+            'ft_document_search', 'document_search', ['document_number', 'title', 'body'],
+            unique=False, mysql_prefix='FULLTEXT'
+        )
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+
+    # Existing documents are indexed from their stored PDFs by
+    # POST /api/documents/search/reindex
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS document_search_fts')
+    elif dialect == 'mysql':
+        op.drop_index('ft_document_search', table_name='document_search')
+    op.drop_table('document_search')
@@ -0,0 +1,35 @@
+"""Add sync state table for incremental sync
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sync_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('destination', sa.String(length=255), nullable=False),
+        sa.Column('path', sa.String(length=500), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('synced_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('destination', 'path', name='uq_sync_state_destination_path')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sync_state')
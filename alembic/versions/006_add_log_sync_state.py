@@ -0,0 +1,37 @@
+"""Add log sync state table for delta log shipping
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'log_sync_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('destination', sa.String(length=255), nullable=False),
+        sa.Column('path', sa.String(length=255), nullable=False),
+        sa.Column('inode', sa.BigInteger(), nullable=False),
+        sa.Column('offset', sa.BigInteger(), nullable=False),
+        sa.Column('head_hash', sa.String(length=64), nullable=False),
+        sa.Column('segment_seq', sa.Integer(), nullable=False),
+        sa.Column('rotated', sa.Boolean(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('destination', 'path', name='uq_log_sync_state_destination_path')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('log_sync_state')
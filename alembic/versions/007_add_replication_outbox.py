@@ -0,0 +1,39 @@
+"""Add replication outbox
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'replication_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('target', sa.String(length=20), nullable=False),
+        sa.Column('file_path', sa.String(length=500), nullable=False),
+        sa.Column('relative_path', sa.String(length=500), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_replication_outbox_next_attempt_at_id', 'replication_outbox', ['next_attempt_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_replication_outbox_next_attempt_at_id', table_name='replication_outbox')
+    op.drop_table('replication_outbox')
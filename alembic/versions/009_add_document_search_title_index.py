@@ -0,0 +1,26 @@
+"""Add full-text index on document search titles
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # MySQL only: SQLite filters titles through the FTS5 table of 004
+    if op.get_bind().dialect.name == 'mysql':
+        op.create_index('ft_document_search_title', 'document_search', ['title'], mysql_prefix='FULLTEXT')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'mysql':
+        op.drop_index('ft_document_search_title', table_name='document_search')
@@ -26,6 +26,16 @@ class Settings(BaseSettings):
     company_address: str = Field(default="123 Business Road, City, Country", alias="COMPANY_ADDRESS")
 
     storage_dir: str = Field(default="/app/storage/uploads", alias="STORAGE_DIR")
+
+    # Buffered audit writer for read endpoints (views, downloads, logins)
+    audit_buffer_enabled: bool = Field(default=True, alias="AUDIT_BUFFER_ENABLED")
+    audit_flush_interval_ms: int = Field(default=500, alias="AUDIT_FLUSH_INTERVAL_MS")
+    audit_flush_batch_size: int = Field(default=200, alias="AUDIT_FLUSH_BATCH_SIZE")
+    audit_queue_size: int = Field(default=10000, alias="AUDIT_QUEUE_SIZE")
+    audit_spill_dir: str = Field(default="", alias="AUDIT_SPILL_DIR")
+
+    # Numbers reserved per worker at a time; 1 allocates each number in its own upsert
+    document_number_block_size: int = Field(default=1, alias="DOCUMENT_NUMBER_BLOCK_SIZE")
     
     # SMB/NAS Configuration
     smb_enabled: bool = Field(default=False, alias="SMB_ENABLED")
@@ -36,6 +46,68 @@ class Settings(BaseSettings):
     smb_share: str = Field(default="", alias="SMB_SHARE")
     smb_path: str = Field(default="/DMS", alias="SMB_PATH")
 
+    # Document sync uploads: parallel connections and per-file retries
+    sync_workers: int = Field(default=4, alias="SYNC_WORKERS")
+    sync_retry_attempts: int = Field(default=3, alias="SYNC_RETRY_ATTEMPTS")
+    sync_retry_backoff_seconds: float = Field(default=1.0, alias="SYNC_RETRY_BACKOFF_SECONDS")
+    # A run that finds more than this share of the recorded files missing
+    # locally (an empty or unmounted storage dir) keeps their sync state
+    sync_max_forget_fraction: float = Field(default=0.5, alias="SYNC_MAX_FORGET_FRACTION")
+    # Upload bandwidth per destination, e.g. "08:00-18:00=2M; unlimited"
+    # (bytes/s with K/M/G suffixes, local time); SMB/Nextcloud fall back to SYNC_BANDWIDTH_LIMIT
+    sync_bandwidth_limit: str = Field(default="", alias="SYNC_BANDWIDTH_LIMIT")
+    smb_bandwidth_limit: str = Field(default="", alias="SMB_BANDWIDTH_LIMIT")
+    nextcloud_bandwidth_limit: str = Field(default="", alias="NEXTCLOUD_BANDWIDTH_LIMIT")
+    # Nextcloud files at least this large are sent as resumable chunked uploads
+    nextcloud_chunked_threshold_mb: int = Field(default=64, alias="NEXTCLOUD_CHUNKED_THRESHOLD_MB")
+    nextcloud_chunk_size_mb: int = Field(default=10, alias="NEXTCLOUD_CHUNK_SIZE_MB")
+
+    # Nextcloud target for replication
+    nextcloud_url: str = Field(default="", alias="NEXTCLOUD_URL")
+    nextcloud_username: str = Field(default="", alias="NEXTCLOUD_USERNAME")
+    nextcloud_password: str = Field(default="", alias="NEXTCLOUD_PASSWORD")
+    nextcloud_path: str = Field(default="/DMS", alias="NEXTCLOUD_PATH")
+
+    # Outbox replication of new documents and templates; targets is a
+    # comma-separated list of smb, nextcloud and local
+    replication_enabled: bool = Field(default=False, alias="REPLICATION_ENABLED")
+    replication_targets: str = Field(default="", alias="REPLICATION_TARGETS")
+    replication_local_dir: str = Field(default="", alias="REPLICATION_LOCAL_DIR")
+    replication_interval_ms: int = Field(default=2000, alias="REPLICATION_INTERVAL_MS")
+    replication_batch_size: int = Field(default=50, alias="REPLICATION_BATCH_SIZE")
+    replication_retry_backoff_seconds: float = Field(default=5.0, alias="REPLICATION_RETRY_BACKOFF_SECONDS")
+    replication_max_backoff_seconds: float = Field(default=600.0, alias="REPLICATION_MAX_BACKOFF_SECONDS")
+    # A claimed outbox row is offered to other processes again after this long
+    # (the claiming process died, or its batch is still being delivered)
+    replication_lease_seconds: float = Field(default=300.0, alias="REPLICATION_LEASE_SECONDS")
+
+    # Backups are incremental; every this many incrementals the next one is full
+    backup_full_every: int = Field(default=7, alias="BACKUP_FULL_EVERY")
+    # Archive format: zip, or tar.zst (needs the zstandard package)
+    backup_format: str = Field(default="zip", alias="BACKUP_FORMAT")
+    # Threads that read and hash files (and compress, for tar.zst)
+    backup_workers: int = Field(default=4, alias="BACKUP_WORKERS")
+    backup_zstd_level: int = Field(default=3, alias="BACKUP_ZSTD_LEVEL")
+
+    # Background jobs (sync, backup); schedules look like
+    # "backup=0 2 * * *; sync_smb=*/30 * * * *" (local time)
+    job_workers: int = Field(default=2, alias="JOB_WORKERS")
+    job_schedules: str = Field(default="", alias="JOB_SCHEDULES")
+    # Target directory for scheduled sync_local jobs
+    sync_local_dir: str = Field(default="", alias="SYNC_LOCAL_DIR")
+    # Scheduled local syncs write hardlinked snapshots instead of a mirror;
+    # 0 keeps every snapshot
+    sync_local_snapshots: bool = Field(default=False, alias="SYNC_LOCAL_SNAPSHOTS")
+    sync_local_keep_snapshots: int = Field(default=0, alias="SYNC_LOCAL_KEEP_SNAPSHOTS")
+
+    # PDF render engine
+    render_pool_size: int = Field(default=2, alias="RENDER_POOL_SIZE")
+    render_timeout_seconds: float = Field(default=60.0, alias="RENDER_TIMEOUT_SECONDS")
+    render_queue_size: int = Field(default=16, alias="RENDER_QUEUE_SIZE")
+    template_cache_size: int = Field(default=8, alias="TEMPLATE_CACHE_SIZE")
+    # "xobject" embeds the template once per document, "copy" duplicates it on every page
+    template_merge_mode: str = Field(default="xobject", alias="TEMPLATE_MERGE_MODE")
+
     @property
     def database_url(self) -> str:
         return (
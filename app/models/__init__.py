@@ -3,5 +3,21 @@ from app.models.document import Document
 from app.models.audit_log import AuditLog
 from app.models.document_sequence import DocumentSequence
 from app.models.document_template import DocumentTemplate
+from app.models.document_search import DocumentSearchIndex
+from app.models.sync_state import SyncState
+from app.models.log_sync_state import LogSyncState
+from app.models.replication_outbox import ReplicationOutbox
+from app.models.job import Job
 
-__all__ = ["User", "Document", "AuditLog", "DocumentSequence", "DocumentTemplate"]
+__all__ = [
+    "User",
+    "Document",
+    "AuditLog",
+    "DocumentSequence",
+    "DocumentTemplate",
+    "DocumentSearchIndex",
+    "SyncState",
+    "LogSyncState",
+    "ReplicationOutbox",
+    "Job",
+]
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, DateTime, ForeignKey, Text
+from sqlalchemy import String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database.base import Base
@@ -7,6 +7,12 @@ from app.database.base import Base
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    # Composite indexes backing newest-first keyset pagination, overall and per filter
+    __table_args__ = (
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_user_id_timestamp_id", "user_id", "timestamp", "id"),
+        Index("ix_audit_logs_document_id_timestamp_id", "document_id", "timestamp", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,49 @@
+from sqlalchemy import DDL, ForeignKey, Index, String, Text, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class DocumentSearchIndex(Base):
+    """Searchable text of a document: number, title and the rendered body text."""
+
+    __tablename__ = "document_search"
+    __table_args__ = (
+        # MySQL full-text index; SQLite uses the FTS5 table created below
+        Index("ft_document_search", "document_number", "title", "body", mysql_prefix="FULLTEXT").ddl_if(
+            dialect="mysql"
+        ),
+        # For the title filter, which MATCH() can only use with an index on exactly that column
+        Index("ft_document_search_title", "title", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
+    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    document_number: Mapped[str] = mapped_column(String(30), nullable=False)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False, default="")
+
+
+# SQLite: an external-content FTS5 table over document_search, kept in sync by triggers
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS document_search_fts USING fts5("
+    "document_number, title, body, content='document_search', content_rowid='document_id')",
+    "CREATE TRIGGER IF NOT EXISTS document_search_ai AFTER INSERT ON document_search BEGIN "
+    "INSERT INTO document_search_fts(rowid, document_number, title, body) "
+    "VALUES (new.document_id, new.document_number, new.title, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS document_search_ad AFTER DELETE ON document_search BEGIN "
+    "INSERT INTO document_search_fts(document_search_fts, rowid, document_number, title, body) "
+    "VALUES ('delete', old.document_id, old.document_number, old.title, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS document_search_au AFTER UPDATE ON document_search BEGIN "
+    "INSERT INTO document_search_fts(document_search_fts, rowid, document_number, title, body) "
+    "VALUES ('delete', old.document_id, old.document_number, old.title, old.body); "
+    "INSERT INTO document_search_fts(rowid, document_number, title, body) "
+    "VALUES (new.document_id, new.document_number, new.title, new.body); END",
+]
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(DocumentSearchIndex.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    DocumentSearchIndex.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS document_search_fts").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,35 @@
+from datetime import datetime
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.database.base import Base
+
+
+class Job(Base):
+    """A background sync or backup run, queued from the API or the scheduler."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_kind_status", "kind", "status"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")
+    # Request parameters with secrets removed; the real ones only live in memory
+    params: Mapped[dict] = mapped_column(JSON, nullable=True)
+    progress_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    progress_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    message: Mapped[str] = mapped_column(String(255), nullable=True)
+    result: Mapped[dict] = mapped_column(JSON, nullable=True)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    # "<name>@<minute>" for scheduled runs, so only one process starts each run
+    schedule_key: Mapped[str] = mapped_column(String(100), unique=True, nullable=True)
+    # "<hostname>:<pid>" of the process executing the job
+    runner: Mapped[str] = mapped_column(String(100), nullable=True)
+    created_by_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    created_by = relationship("User")
@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Boolean, DateTime, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class LogSyncState(Base):
+    """How far a log file has been shipped to a sync destination."""
+
+    __tablename__ = "log_sync_state"
+    __table_args__ = (
+        UniqueConstraint("destination", "path", name="uq_log_sync_state_destination_path"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    destination: Mapped[str] = mapped_column(String(255), nullable=False)
+    path: Mapped[str] = mapped_column(String(255), nullable=False)
+    inode: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    offset: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # SHA-256 of the first min(offset, 4 KiB) bytes, to detect a truncated or replaced file
+    head_hash: Mapped[str] = mapped_column(String(64), nullable=False, default="")
+    segment_seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Rotated files are uploaded once and then left alone; their path is "<name>@<inode>"
+    # since numbered rotation reuses names
+    rotated: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
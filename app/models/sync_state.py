@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class SyncState(Base):
+    """What was last uploaded to a sync destination for one file."""
+
+    __tablename__ = "sync_state"
+    __table_args__ = (
+        UniqueConstraint("destination", "path", name="uq_sync_state_destination_path"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    destination: Mapped[str] = mapped_column(String(255), nullable=False)
+    path: Mapped[str] = mapped_column(String(500), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    synced_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -1,44 +1,67 @@
 from typing import List
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.orm import Session, joinedload
 
 from app.auth.security import get_current_active_user, require_admin
 from app.database.session import get_db
 from app.models.audit_log import AuditLog
 from app.models.user import User
 from app.schemas.audit_log import AuditLogResponse
+from app.services.pagination import NEXT_CURSOR_HEADER, next_cursor, paginate_desc
 
 router = APIRouter(prefix="/api/audit", tags=["Audit Logs"])
 
 
+def _page(query, response: Response, cursor: str | None, skip: int, limit: int) -> list:
+    """
+    Return one newest-first page. With a cursor (from the X-Next-Cursor header
+    of the previous page) the query seeks on (timestamp, id); skip is only
+    honoured for offset-style callers that do not send one.
+    """
+    try:
+        query = paginate_desc(query, AuditLog.timestamp, AuditLog.id, cursor, limit)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    if skip and not cursor:
+        query = query.offset(skip)
+    logs = query.all()
+    token = next_cursor(logs, limit, "timestamp")
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return logs
+
+
 @router.get("/", response_model=List[AuditLogResponse])
 async def list_audit_logs(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin),
     skip: int = 0,
-    limit: int = 50
+    limit: int = 50,
+    cursor: str | None = None,
+    document_id: int | None = None,
 ):
     """List audit logs (admin only)."""
-    logs = db.query(AuditLog).order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
-    return logs
+    query = db.query(AuditLog).options(joinedload(AuditLog.user))
+    if document_id is not None:
+        query = query.filter(AuditLog.document_id == document_id)
+    return _page(query, response, cursor, skip, limit)
 
 
 @router.get("/user/{user_id}", response_model=List[AuditLogResponse])
 async def get_user_audit_logs(
     user_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: str | None = None,
 ):
     """Get audit logs for a specific user (admin only)."""
-    logs = (
-        db.query(AuditLog)
-        .filter(AuditLog.user_id == user_id)
-        .order_by(AuditLog.timestamp.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return logs
+    query = db.query(AuditLog).options(joinedload(AuditLog.user)).filter(AuditLog.user_id == user_id)
+    return _page(query, response, cursor, skip, limit)
@@ -42,7 +42,7 @@ async def login(
     )
     
     # Log login
-    AuditService.log_action(db, user.id, "USER_LOGIN")
+    AuditService.record(db, user.id, "USER_LOGIN")
     
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -1,18 +1,19 @@
 import os
-import shutil
-import zipfile
-from datetime import datetime
-from io import BytesIO
-from pathlib import Path
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.auth.security import get_current_active_user
 from app.config import get_settings
 from app.database.session import get_db
 from app.models.user import User
+from app.schemas.job import JobAccepted
+from app.services.archive import FORMATS, HAS_ZSTD
+from app.services.backup import BackupError, BackupService, BackupStream
+from app.services.job_handlers import job_runner, run_backup, run_backup_restore
 
 settings = get_settings()
 router = APIRouter(prefix="/api/admin/backup", tags=["Backup"])
@@ -27,51 +28,72 @@ def check_admin(current_user: User) -> None:
         )
 
 
-@router.post("/create")
+def check_format(format: Optional[str]) -> None:
+    if format is not None and format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown backup format. Use one of: {', '.join(FORMATS)}"
+        )
+    if (format or settings.backup_format) == 'tar.zst' and not HAS_ZSTD:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="tar.zst backups need the zstandard package"
+        )
+
+
+def media_type(backup_name: str) -> str:
+    return 'application/zstd' if backup_name.endswith('.tar.zst') else 'application/zip'
+
+
+@router.post("/create", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
 async def create_backup(
+    full: bool = Query(False, description="Store every file instead of only changes since the last backup"),
+    format: Optional[str] = Query(None, description="Archive format: zip or tar.zst (default: BACKUP_FORMAT)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Create a backup of documents, templates, and logs."""
+    """Start a background backup of documents, templates, and logs."""
     check_admin(current_user)
+    check_format(format)
     
-    try:
-        backup_dir = os.path.join(settings.storage_dir, 'backups')
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        # Create zip file
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_name = f"DMS_Backup_{timestamp}.zip"
-        backup_path = os.path.join(backup_dir, backup_name)
-        
-        with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add all files recursively from storage directory
-            storage_path = settings.storage_dir
-            if os.path.exists(storage_path):
-                for root, dirs, files in os.walk(storage_path):
-                    # Skip backups directory to avoid recursion
-                    if 'backups' in root:
-                        continue
-                    
-                    for file in files:
-                        if file.startswith('.'):
-                            continue
-                        file_path = os.path.join(root, file)
-                        # Create relative path for archive
-                        arcname = os.path.relpath(file_path, storage_path)
-                        zipf.write(file_path, arcname=arcname)
-        
-        return {
-            'backup_file': backup_name,
-            'path': backup_path,
-            'size': os.path.getsize(backup_path),
-            'timestamp': timestamp
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Backup creation failed: {str(e)}"
-        )
+    params = {'full': full, 'format': format}
+    job = job_runner.submit(db, 'backup', run_backup, params=params, public_params=params,
+                            user_id=current_user.id)
+    return JobAccepted(job_id=job.id, status=job.status, status_url=f"/api/admin/jobs/{job.id}")
+
+
+@router.get("/stream")
+async def stream_backup(
+    format: Optional[str] = Query(None, description="Archive format: zip or tar.zst (default: BACKUP_FORMAT)"),
+    save: bool = Query(False, description="Also keep the archive in the backup directory"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Download a full backup generated on the fly, without writing it to
+    disk first (unless ``save``). Disconnecting stops the backup.
+    """
+    check_admin(current_user)
+    check_format(format)
+    
+    stream = BackupStream(fmt=format, save=save, bind=db.get_bind()).start()
+    
+    async def body():
+        try:
+            while True:
+                chunk = await run_in_threadpool(stream.next_chunk)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            # Also reached when the client disconnects and the response is cancelled
+            stream.cancel()
+    
+    return StreamingResponse(
+        body(),
+        media_type=media_type(stream.name),
+        headers={'Content-Disposition': f'attachment; filename="{stream.name}"'}
+    )
 
 
 @router.get("/list")
@@ -79,26 +101,11 @@ async def list_backups(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """List available backups."""
+    """List available backups with their chain and size."""
     check_admin(current_user)
     
     try:
-        backup_dir = os.path.join(settings.storage_dir, 'backups')
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        backups = []
-        if os.path.exists(backup_dir):
-            for file in sorted(os.listdir(backup_dir), reverse=True):
-                if file.endswith('.zip'):
-                    file_path = os.path.join(backup_dir, file)
-                    stat = os.stat(file_path)
-                    backups.append({
-                        'name': file,
-                        'size': stat.st_size,
-                        'date': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
-                    })
-        
-        return {'backups': backups}
+        return {'backups': BackupService.list_backups()}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -134,7 +141,7 @@ async def download_backup(
         
         return FileResponse(
             path=backup_path,
-            media_type='application/zip',
+            media_type=media_type(backup_name),
             filename=backup_name
         )
     except HTTPException:
@@ -146,65 +153,47 @@ async def download_backup(
         )
 
 
-@router.post("/restore")
+@router.post("/restore", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
 async def restore_backup(
     backup_data: dict,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Restore from a backup file."""
+    """Start a background restore from a backup file."""
     check_admin(current_user)
     
+    backup_name = backup_data.get('backup_file')
+    if not backup_name:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="backup_file required"
+        )
+    
     try:
-        backup_name = backup_data.get('backup_file')
-        if not backup_name:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="backup_file required"
-            )
-        
-        backup_dir = os.path.join(settings.storage_dir, 'backups')
-        backup_path = os.path.join(backup_dir, backup_name)
-        
-        # Security check
-        if '..' in backup_name or not backup_path.startswith(backup_dir):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid backup name"
-            )
-        
-        if not os.path.exists(backup_path):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Backup not found"
-            )
-        
-        # Extract backup
-        docs_dir = os.path.join(settings.storage_dir, 'uploads')
-        
-        with zipfile.ZipFile(backup_path, 'r') as zipf:
-            for file_info in zipf.filelist:
-                if file_info.filename.startswith('documents/'):
-                    file_name = os.path.basename(file_info.filename)
-                    with zipf.open(file_info) as source:
-                        target_path = os.path.join(docs_dir, file_name)
-                        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                        with open(target_path, 'wb') as target:
-                            target.write(source.read())
-                
-                elif file_info.filename.startswith('templates/'):
-                    file_name = os.path.basename(file_info.filename)
-                    with zipf.open(file_info) as source:
-                        target_path = os.path.join(docs_dir, 'templates', file_name)
-                        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                        with open(target_path, 'wb') as target:
-                            target.write(source.read())
-        
-        return {'message': 'Backup restored successfully'}
-    except HTTPException:
-        raise
+        BackupService.check_restorable(backup_name)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid backup name"
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Backup not found"
+        )
+    except BackupError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Restore failed: {str(e)}"
         )
+    
+    # Files only, unless the caller opts in with "database": true to also replace the tables
+    params = {'backup_file': backup_name, 'database': bool(backup_data.get('database', False))}
+    job = job_runner.submit(db, 'restore_backup', run_backup_restore, params=params, public_params=params,
+                            user_id=current_user.id)
+    return JobAccepted(job_id=job.id, status=job.status, status_url=f"/api/admin/jobs/{job.id}")
@@ -1,12 +1,13 @@
 import os
 from typing import Annotated, List
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_
 
-from app.auth.security import get_current_active_user
+from app.auth.security import get_current_active_user, require_admin
 from app.config import get_settings
 from app.database.session import get_db
 from app.models.document import Document
@@ -16,8 +17,12 @@ from app.schemas.document import DocumentCreate, DocumentResponse, DocumentFilte
 from app.services.audit import AuditService
 from app.services.document_number import DocumentNumberService
 from app.services.pdf_generator import PDFGeneratorService
+from app.services.render_engine import render_engine, RenderQueueFullError, RenderTimeoutError
+from app.services.replication import ReplicationService, replicator
+from app.services.search import SearchService, html_to_text
 
 settings = get_settings()
+logger = structlog.get_logger()
 
 router = APIRouter(prefix="/api/documents", tags=["Documents"])
 
@@ -41,45 +46,77 @@ async def create_document(
         if template:
             template_path = template.file_path
     
-    # Generate document number
+    # The number is reserved and committed in its own short transaction, so
+    # the day's sequence row is never locked while a render runs. If the
+    # render or save fails, the number is given back when no later number has
+    # been issued meanwhile; otherwise it is left as a gap.
     doc_number = DocumentNumberService.generate_document_number(db)
+    file_path = None
+    try:
+        # Generate PDF with template in the render pool, off the event loop
+        try:
+            pdf_bytes = await render_engine.render(
+                document_number=doc_number,
+                title=document_data.title,
+                content=content,
+                requested_by=current_user.username,
+                template_path=template_path,
+            )
+        except RenderQueueFullError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="PDF renderer is busy, please try again shortly",
+                headers={"Retry-After": "5"},
+            )
+        except RenderTimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="PDF generation timed out"
+            )
+        
+        # Save PDF to storage
+        file_name = f"{doc_number}.pdf"
+        file_path = os.path.join(settings.storage_dir, file_name)
+        PDFGeneratorService.save_pdf(pdf_bytes, file_path)
+        
+        # Create document record; flush to get its id for the audit row
+        new_document = Document(
+            document_number=doc_number,
+            title=document_data.title,
+            template_id=document_data.template_id,
+            requested_by_id=current_user.id,
+            file_path=file_path,
+            file_name=file_name,
+        )
+        db.add(new_document)
+        db.flush()
+        
+        # Index number, title and body text for full-text search
+        SearchService.index_document(db, new_document, html_to_text(content))
+        
+        # Log document creation
+        AuditService.log_action(
+            db,
+            current_user.id,
+            "DOCUMENT_CREATED",
+            document_id=new_document.id,
+            details=f"Created document: {doc_number}",
+            commit=False,
+        )
+        
+        # Queue the PDF for the replication targets in the same transaction
+        ReplicationService.enqueue(db, file_path)
+        
+        db.commit()
+    except Exception:
+        db.rollback()
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+        if not DocumentNumberService.release_number(db, doc_number):
+            logger.warning("Document number left unused", document_number=doc_number)
+        raise
     
-    # Generate PDF with template
-    pdf_bytes = PDFGeneratorService.generate_document_pdf(
-        document_number=doc_number,
-        title=document_data.title,
-        content=content,
-        requested_by=current_user.username,
-        template_path=template_path,
-    )
-    
-    # Save PDF to storage
-    file_name = f"{doc_number}.pdf"
-    file_path = os.path.join(settings.storage_dir, file_name)
-    PDFGeneratorService.save_pdf(pdf_bytes, file_path)
-    
-    # Create document record
-    new_document = Document(
-        document_number=doc_number,
-        title=document_data.title,
-        template_id=document_data.template_id,
-        requested_by_id=current_user.id,
-        file_path=file_path,
-        file_name=file_name,
-    )
-    db.add(new_document)
-    db.commit()
-    db.refresh(new_document)
-    
-    # Log document creation
-    AuditService.log_action(
-        db,
-        current_user.id,
-        "DOCUMENT_CREATED",
-        document_id=new_document.id,
-        details=f"Created document: {doc_number}"
-    )
-    
+    replicator.notify()
     return new_document
 
 
@@ -94,7 +131,8 @@ async def list_documents(
     date_to: str | None = None,
 ):
     """List documents. Admins see all, users see only their own."""
-    query = db.query(Document)
+    # Load requested_by in the same query instead of one SELECT per row
+    query = db.query(Document).options(joinedload(Document.requested_by))
     
     # Role-based filtering
     if current_user.role != 'admin':
@@ -132,26 +170,51 @@ async def list_documents(
 
 @router.get("/search", response_model=List[DocumentResponse])
 async def search_documents(
+    q: str | None = None,
     document_number: str | None = None,
     title: str | None = None,
     user_id: int | None = None,
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Search and filter documents."""
-    query = db.query(Document)
+    """
+    Search and filter documents.
+    ``q`` is a full-text search over document number, title and body text,
+    returned best match first. ``title`` matches words of the title (by
+    prefix) and ``document_number`` the start of the number; the filters
+    narrow the results.
+    """
+    query = db.query(Document).options(joinedload(Document.requested_by))
     
     if document_number:
-        query = query.filter(Document.document_number.contains(document_number))
-    
-    if title:
-        query = query.filter(Document.title.contains(title))
+        query = query.filter(Document.document_number.startswith(document_number, autoescape=True))
     
     if user_id:
         query = query.filter(Document.requested_by_id == user_id)
     
-    documents = query.all()
-    return documents
+    if not q and not title:
+        return query.order_by(Document.created_at.desc()).offset(skip).limit(limit).all()
+    
+    ids = SearchService.search(
+        db, q, user_id=user_id, skip=skip, limit=limit, document_number=document_number, title=title
+    )
+    if not ids:
+        return []
+    
+    documents = {doc.id: doc for doc in query.filter(Document.id.in_(ids)).all()}
+    return [documents[doc_id] for doc_id in ids if doc_id in documents]
+
+
+@router.post("/search/reindex")
+async def reindex_documents(
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin)
+):
+    """Index documents that are missing from the search index, from their stored PDFs (admin only)."""
+    indexed = SearchService.reindex_missing(db)
+    return {"indexed": indexed}
 
 
 @router.get("/{document_id}", response_model=DocumentResponse)
@@ -161,7 +224,12 @@ async def get_document(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific document by ID."""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = (
+        db.query(Document)
+        .options(joinedload(Document.requested_by))
+        .filter(Document.id == document_id)
+        .first()
+    )
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -169,7 +237,7 @@ async def get_document(
         )
     
     # Log document access
-    AuditService.log_action(
+    AuditService.record(
         db,
         current_user.id,
         "DOCUMENT_VIEWED",
@@ -201,7 +269,7 @@ async def download_document(
         )
     
     # Log document download
-    AuditService.log_action(
+    AuditService.record(
         db,
         current_user.id,
         "DOCUMENT_DOWNLOADED",
@@ -0,0 +1,45 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.auth.security import require_admin
+from app.database.session import get_db
+from app.models.job import Job
+from app.models.user import User
+from app.schemas.job import JobResponse
+
+router = APIRouter(prefix="/api/admin/jobs", tags=["Jobs"])
+
+
+@router.get("/", response_model=List[JobResponse])
+async def list_jobs(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin),
+    kind: str | None = None,
+    status_filter: str | None = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=200),
+):
+    """List background jobs, newest first (admin only)."""
+    query = db.query(Job)
+    if kind:
+        query = query.filter(Job.kind == kind)
+    if status_filter:
+        query = query.filter(Job.status == status_filter)
+    return query.order_by(Job.id.desc()).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin),
+):
+    """Get the status, progress and result of a background job (admin only)."""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
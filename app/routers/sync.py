@@ -12,7 +12,12 @@ from app.auth.security import get_current_active_user
 from app.config import get_settings
 from app.database.session import get_db
 from app.models.user import User
-from app.services.sync import SyncService, LocalBackupSync, NextcloudSync
+from app.schemas.job import JobAccepted
+from app.services.job_handlers import (
+    job_runner, run_local_sync, run_nextcloud_restore, run_nextcloud_sync, run_smb_restore, run_smb_sync,
+)
+from app.services.sync import SyncService, NextcloudSync
+from app.services.throttle import BandwidthSchedule
 
 settings = get_settings()
 router = APIRouter(prefix="/api/admin/sync", tags=["Sync"])
@@ -34,6 +39,7 @@ class SMBConfig(BaseModel):
     password: str = Field(..., description="SMB password", min_length=1)
     share: str = Field(..., description="SMB share name", min_length=1)
     path: str = Field(default="/DMS", description="Path within SMB share")
+    bandwidth: Optional[str] = Field(default=None, description="Upload bandwidth schedule, e.g. '08:00-18:00=2M; unlimited'")
     
     @field_validator('path')
     @classmethod
@@ -45,6 +51,14 @@ class SMBConfig(BaseModel):
         if v.startswith('../') or '/..' in v or v.endswith('..'):
             raise ValueError('Path cannot contain ".." sequences')
         return v.rstrip('/') or '/DMS'
+    
+    @field_validator('bandwidth')
+    @classmethod
+    def validate_bandwidth(cls, v):
+        """Reject schedules the sync could not apply."""
+        if v:
+            BandwidthSchedule.parse(v)
+        return v
 
 
 class NextcloudConfig(BaseModel):
@@ -53,6 +67,7 @@ class NextcloudConfig(BaseModel):
     username: str = Field(..., description="Nextcloud username", min_length=1)
     password: str = Field(..., description="Nextcloud app password", min_length=1)
     path: str = Field(default="/DMS", description="Path within Nextcloud")
+    bandwidth: Optional[str] = Field(default=None, description="Upload bandwidth schedule, e.g. '08:00-18:00=2M; unlimited'")
     
     @field_validator('url')
     @classmethod
@@ -71,12 +86,28 @@ class NextcloudConfig(BaseModel):
         if v.startswith('../') or '/..' in v or v.endswith('..'):
             raise ValueError('Path cannot contain ".." sequences')
         return v.rstrip('/') or '/DMS'
+    
+    @field_validator('bandwidth')
+    @classmethod
+    def validate_bandwidth(cls, v):
+        """Reject schedules the sync could not apply."""
+        if v:
+            BandwidthSchedule.parse(v)
+        return v
 
 
 class SyncRequest(BaseModel):
     """Sync request parameters."""
     sync_type: SyncType = Field(..., description="Type of sync: documents, logs, or all")
     target: Optional[str] = Field(default=None, description="Local directory for local sync")
+    dry_run: bool = Field(default=False, description="Only report which documents would be synced")
+    full: bool = Field(default=False, description="Re-upload every document, ignoring the recorded sync state")
+    snapshot: bool = Field(default=False, description="Local sync: write a new hardlinked snapshot instead of mirroring")
+
+
+class RestoreRequest(BaseModel):
+    """Restore-from-remote parameters."""
+    overwrite: bool = Field(default=False, description="Replace local files that differ from the synced copy")
 
 
 def check_admin(current_user: User) -> None:
@@ -88,6 +119,23 @@ def check_admin(current_user: User) -> None:
         )
 
 
+def accepted(job) -> JobAccepted:
+    return JobAccepted(job_id=job.id, status=job.status, status_url=f"/api/admin/jobs/{job.id}")
+
+
+def _submit_remote(db: Session, kind: str, handler, config: BaseModel, request: BaseModel, user: User) -> JobAccepted:
+    job = job_runner.submit(
+        db, kind, handler,
+        params={'config': config.model_dump(), 'request': request.model_dump(mode='json')},
+        public_params={
+            'config': config.model_dump(exclude={'password'}),
+            'request': request.model_dump(mode='json'),
+        },
+        user_id=user.id
+    )
+    return accepted(job)
+
+
 @router.post("/test-smb")
 async def test_smb_connection(
     config: SMBConfig,
@@ -116,64 +164,26 @@ async def test_smb_connection(
         )
 
 
-@router.post("/smb")
+@router.post("/smb", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
 async def sync_to_smb(
     config: SMBConfig,
     request: SyncRequest,
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Sync documents and logs to SMB share."""
+    """Start a background sync of documents and logs to an SMB share."""
     check_admin(current_user)
     
-    try:
-        sync_service = SyncService(
-            smb_host=config.host,
-            smb_port=config.port,
-            smb_username=config.username,
-            smb_password=config.password,
-            smb_share=config.share,
-            smb_path=config.path
-        )
-        
-        results = {}
-        
-        if request.sync_type in ['documents', 'all']:
-            docs_dir = settings.storage_dir  # Already /app/storage/uploads
-            result = sync_service.sync_documents(docs_dir)
-            results['documents'] = result
-        
-        if request.sync_type in ['logs', 'all']:
-            # Sync application logs
-            log_dir = os.path.join(settings.storage_dir, '../logs')
-            if os.path.exists(log_dir):
-                for log_file in os.listdir(log_dir):
-                    if log_file.endswith('.log'):
-                        log_path = os.path.join(log_dir, log_file)
-                        result = sync_service.sync_logs(log_path)
-                        if 'logs' not in results:
-                            results['logs'] = []
-                        results['logs'].append(result)
-        
-        return {
-            'success': True,
-            'message': 'Sync completed',
-            'results': results
-        }
-    
-    except Exception as e:
-        logger.error(f"SMB sync failed: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Sync operation failed. Please check your configuration and try again."
-        )
+    return _submit_remote(db, 'sync_smb', run_smb_sync, config, request, current_user)
 
 
-@router.post("/local")
+@router.post("/local", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
 async def sync_to_local(
     request: SyncRequest,
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Sync documents to local directory."""
+    """Start a background sync of documents to a local directory."""
     check_admin(current_user)
     
     if not request.target:
@@ -182,33 +192,10 @@ async def sync_to_local(
             detail="target directory required"
         )
     
-    try:
-        results = {}
-        
-        if request.sync_type in ['documents', 'all']:
-            docs_dir = settings.storage_dir  # Already /app/storage/uploads
-            result = LocalBackupSync.sync_to_local(docs_dir, request.target)
-            results['documents'] = result
-        
-        if request.sync_type in ['logs', 'all']:
-            log_dir = os.path.join(settings.storage_dir, '../logs')
-            logs_target = os.path.join(request.target, 'logs')
-            if os.path.exists(log_dir):
-                result = LocalBackupSync.sync_to_local(log_dir, logs_target)
-                results['logs'] = result
-        
-        return {
-            'success': True,
-            'message': 'Local sync completed',
-            'results': results
-        }
-    
-    except Exception as e:
-        logger.error(f"Local sync failed: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Sync operation failed. Please check the target directory and try again."
-        )
+    params = {'request': request.model_dump(mode='json')}
+    job = job_runner.submit(db, 'sync_local', run_local_sync, params=params, public_params=params,
+                            user_id=current_user.id)
+    return accepted(job)
 
 
 @router.get("/status")
@@ -253,52 +240,38 @@ async def test_nextcloud_connection(
         )
 
 
-@router.post("/nextcloud")
+@router.post("/nextcloud", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
 async def sync_to_nextcloud(
     config: NextcloudConfig,
     request: SyncRequest,
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Sync documents and logs to Nextcloud."""
+    """Start a background sync of documents and logs to Nextcloud."""
     check_admin(current_user)
     
-    try:
-        sync_service = NextcloudSync(
-            url=config.url,
-            username=config.username,
-            password=config.password,
-            base_path=config.path
-        )
-        
-        results = {}
-        
-        if request.sync_type in ['documents', 'all']:
-            docs_dir = settings.storage_dir  # Already /app/storage/uploads
-            result = sync_service.sync_documents(docs_dir)
-            results['documents'] = result
-        
-        if request.sync_type in ['logs', 'all']:
-            # Sync application logs
-            log_dir = os.path.join(settings.storage_dir, '../logs')
-            if os.path.exists(log_dir):
-                for log_file in os.listdir(log_dir):
-                    if log_file.endswith('.log'):
-                        log_path = os.path.join(log_dir, log_file)
-                        result = sync_service.sync_logs(log_path)
-                        if 'logs' not in results:
-                            results['logs'] = []
-                        results['logs'].append(result)
-        
-        return {
-            'success': True,
-            'message': 'Nextcloud sync completed',
-            'results': results
-        }
-    
-    except Exception as e:
-        logger.error(f"Nextcloud sync failed: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Sync operation failed. Please check your Nextcloud configuration and try again."
-        )
+    return _submit_remote(db, 'sync_nextcloud', run_nextcloud_sync, config, request, current_user)
 
+
+@router.post("/restore/smb", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def restore_from_smb(
+    config: SMBConfig,
+    request: RestoreRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Start a background restore of synced documents from an SMB share into storage."""
+    check_admin(current_user)
+    return _submit_remote(db, 'restore_smb', run_smb_restore, config, request, current_user)
+
+
+@router.post("/restore/nextcloud", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def restore_from_nextcloud(
+    config: NextcloudConfig,
+    request: RestoreRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Start a background restore of synced documents from Nextcloud into storage."""
+    check_admin(current_user)
+    return _submit_remote(db, 'restore_nextcloud', run_nextcloud_restore, config, request, current_user)
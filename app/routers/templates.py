@@ -12,6 +12,9 @@ from app.models.user import User
 from app.schemas.template import DocumentTemplateResponse
 from app.services.template import TemplateService
 from app.services.audit import AuditService
+from app.services.render_engine import render_engine
+from app.services.replication import ReplicationService, replicator
+from app.services.template_cache import template_cache
 from app.config import get_settings
 
 settings = get_settings()
@@ -75,6 +78,7 @@ async def upload_template(
     
     # Save file
     file_path = TemplateService.save_template_file(content, safe_filename)
+    template_cache.invalidate(file_path)
     
     # Create template record
     template = DocumentTemplate(
@@ -85,8 +89,10 @@ async def upload_template(
         mime_type=file.content_type,
     )
     db.add(template)
+    ReplicationService.enqueue(db, file_path)
     db.commit()
     db.refresh(template)
+    replicator.notify()
     
     # Log action
     AuditService.log_action(
@@ -111,6 +117,17 @@ async def list_templates(
     return templates
 
 
+@router.get("/cache/stats")
+async def get_template_cache_stats(
+    admin_user: User = Depends(require_admin)
+):
+    """Parsed-template cache counters (admin only)."""
+    return {
+        'render_workers': render_engine.cache_stats(),
+        'api_process': template_cache.stats(),
+    }
+
+
 @router.get("/{template_id}", response_model=DocumentTemplateResponse)
 async def get_template(
     template_id: int,
@@ -141,8 +158,9 @@ async def delete_template(
             detail="Template not found"
         )
     
-    # Delete file
+    # Delete file and drop the parsed copy
     TemplateService.delete_template_file(template.file_path)
+    template_cache.invalidate(template.file_path)
     
     # Delete record
     db.delete(template)
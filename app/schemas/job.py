@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Any
+from pydantic import BaseModel, ConfigDict
+
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    params: dict | None = None
+    progress_done: int
+    progress_total: int
+    message: str | None = None
+    result: Any = None
+    error: str | None = None
+    created_by_id: int | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class JobAccepted(BaseModel):
+    job_id: int
+    status: str
+    status_url: str
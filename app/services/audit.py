@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 
 from app.models.audit_log import AuditLog
+from app.services.audit_writer import audit_writer
 
 
 class AuditService:
@@ -11,8 +12,13 @@ class AuditService:
         action: str,
         document_id: int | None = None,
         details: str | None = None,
+        commit: bool = True,
     ) -> AuditLog:
-        """Create an audit log entry."""
+        """
+        Create an audit log entry.
+        With commit=False the entry is only added to the session and is written
+        by the caller's commit, as part of the caller's unit of work.
+        """
         audit_log = AuditLog(
             user_id=user_id,
             action=action,
@@ -20,6 +26,26 @@ class AuditService:
             details=details,
         )
         db.add(audit_log)
+        if not commit:
+            return audit_log
         db.commit()
         db.refresh(audit_log)
         return audit_log
+
+    @staticmethod
+    def record(
+        db: Session,
+        user_id: int,
+        action: str,
+        document_id: int | None = None,
+        details: str | None = None,
+    ) -> None:
+        """
+        Record an audit entry without waiting for the database.
+        Queued for the background bulk writer when it is running, otherwise
+        written synchronously with log_action.
+        """
+        if audit_writer.running:
+            audit_writer.enqueue(user_id, action, document_id=document_id, details=details)
+        else:
+            AuditService.log_action(db, user_id, action, document_id=document_id, details=details)
@@ -0,0 +1,266 @@
+"""Buffered background writer that bulk-inserts audit log entries."""
+
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import structlog
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.session import SessionLocal
+from app.models.audit_log import AuditLog
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+SPILL_FILE = "audit-spill.jsonl"
+# Spilled events being replayed, moved aside so new spills do not wait for the replay
+REPLAY_FILE = "audit-spill.replay.jsonl"
+# Spilled events the database rejected on their own; kept for inspection, never retried
+QUARANTINE_FILE = "audit-spill.quarantine.jsonl"
+
+
+class AuditWriter:
+    """
+    Queue audit events in memory and write them with bulk INSERTs from a
+    background thread, every ``flush_interval_ms`` or every ``batch_size``
+    events, whichever comes first.
+
+    If the database is slow or unavailable, events are appended to a JSONL
+    spill file instead of being dropped: a failed flush spills its batch, and
+    so does ``enqueue`` once the in-memory queue is full. The spill file is
+    replayed in the background as soon as inserts succeed again, and on the
+    next start. A replay moves the spill file aside and inserts without
+    holding the spill lock, so ``enqueue`` can keep spilling meanwhile.
+    Events the database rejects one by one while it is otherwise reachable
+    (bad data, a constraint) go to a quarantine file instead of blocking
+    the replay forever.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        flush_interval_ms: int = 500,
+        batch_size: int = 200,
+        max_queue: int = 10000,
+        spill_dir: str | None = None,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = max(flush_interval_ms, 1) / 1000
+        self.batch_size = max(batch_size, 1)
+        self._spill_dir = spill_dir
+        self._queue: queue.Queue = queue.Queue(maxsize=max(max_queue, 1))
+        self._spill_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.written = 0
+        self.spilled = 0
+
+    @property
+    def spill_path(self) -> str:
+        spill_dir = self._spill_dir or os.path.join(settings.storage_dir, '../audit_spill')
+        return os.path.join(spill_dir, SPILL_FILE)
+
+    def _spill_file(self, name: str) -> str:
+        return os.path.join(os.path.dirname(self.spill_path), name)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        logger.info("Audit writer started", flush_interval=self.flush_interval, batch_size=self.batch_size)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Flush everything still queued and stop the background thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        # Anything left (e.g. the join timed out) goes to disk rather than being lost
+        leftovers = self._drain(self._queue.qsize())
+        if leftovers:
+            self._spill(leftovers)
+        logger.info("Audit writer stopped", written=self.written, spilled=self.spilled)
+
+    def enqueue(
+        self,
+        user_id: int,
+        action: str,
+        document_id: int | None = None,
+        details: str | None = None,
+    ) -> None:
+        event = {
+            'user_id': user_id,
+            'action': action,
+            'document_id': document_id,
+            'details': details,
+            # Record when it happened, not when the batch is flushed
+            'timestamp': datetime.utcnow(),
+        }
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._spill([event])
+
+    # -- background thread ------------------------------------------------
+
+    def _run(self) -> None:
+        self._replay_spill()
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                if self._write(batch):
+                    self._replay_spill()
+                else:
+                    self._spill(batch)
+        # Graceful shutdown: drain the queue in full batches
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                break
+            if not self._write(batch):
+                self._spill(batch)
+
+    def _collect(self) -> List[Dict]:
+        """Wait for the first event, then gather more until the batch is full or the interval ends."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, limit: int) -> List[Dict]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict]) -> bool:
+        """Bulk insert a batch in one transaction. Returns False if it failed."""
+        db = self.session_factory()
+        try:
+            db.execute(insert(AuditLog), batch)
+            db.commit()
+            self.written += len(batch)
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.warning("Audit flush failed, spilling to disk", error=str(e), events=len(batch))
+            return False
+        finally:
+            db.close()
+
+    # -- spill file -------------------------------------------------------
+
+    def _spill(self, batch: List[Dict]) -> None:
+        with self._spill_lock:
+            self._append(self.spill_path, batch)
+            self.spilled += len(batch)
+
+    @staticmethod
+    def _append(path: str, events: List[Dict]) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps({**event, 'timestamp': event['timestamp'].isoformat()}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _take_spill(self) -> str | None:
+        """Move the spill file behind any unfinished replay; returns the file to replay, if any."""
+        replay_path = self._spill_file(REPLAY_FILE)
+        with self._spill_lock:
+            if os.path.exists(self.spill_path):
+                if os.path.exists(replay_path):
+                    # Older events first: append the new spill to the unfinished replay
+                    with open(self.spill_path, 'rb') as src, open(replay_path, 'ab') as dst:
+                        dst.write(src.read())
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    os.remove(self.spill_path)
+                else:
+                    os.replace(self.spill_path, replay_path)
+        return replay_path if os.path.exists(replay_path) else None
+
+    def _replay_spill(self) -> None:
+        """Insert spilled events back into the database, oldest first."""
+        replay_path = self._take_spill()
+        if replay_path is None:
+            return
+        with open(replay_path, 'r', encoding='utf-8') as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        for event in events:
+            event['timestamp'] = datetime.fromisoformat(event['timestamp'])
+
+        quarantined = 0
+        for start in range(0, len(events), self.batch_size):
+            batch = events[start:start + self.batch_size]
+            if self._write(batch):
+                continue
+            # Find out which events the database rejects, if it is reachable at all
+            rejected = [event for event in batch if not self._write([event])]
+            if len(rejected) == len(batch) and not self._database_available():
+                # Keep what has not been written for the next attempt
+                self._rewrite(replay_path, events[start:])
+                return
+            if rejected:
+                self._append(self._spill_file(QUARANTINE_FILE), rejected)
+                quarantined += len(rejected)
+                logger.error("Quarantined audit events the database rejects", events=len(rejected),
+                             path=self._spill_file(QUARANTINE_FILE))
+        os.remove(replay_path)
+        logger.info("Replayed spilled audit events", events=len(events) - quarantined, quarantined=quarantined)
+
+    def _database_available(self) -> bool:
+        db = self.session_factory()
+        try:
+            db.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+        finally:
+            db.close()
+
+    @staticmethod
+    def _rewrite(path: str, events: List[Dict]) -> None:
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps({**event, 'timestamp': event['timestamp'].isoformat()}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+audit_writer = AuditWriter(
+    SessionLocal,
+    flush_interval_ms=settings.audit_flush_interval_ms,
+    batch_size=settings.audit_flush_batch_size,
+    max_queue=settings.audit_queue_size,
+    spill_dir=settings.audit_spill_dir or None,
+)
@@ -0,0 +1,797 @@
+"""Backup archive creation, listing and restore."""
+
+import functools
+import hashlib
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import structlog
+
+from app.config import get_settings
+from app.services.archive import (
+    SAMPLE_SIZE, HashingReader, ZipReaders, archive_format, extension, iter_tar_zst, open_writer, raw_deflate,
+    read_member, should_compress,
+)
+from app.services.db_export import DatabaseExportService
+from app.services.file_index import FileEntry, file_sha256, scan_tree
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+# (done, total[, message])
+ProgressCallback = Callable[..., None]
+
+# Inside every archive: the complete file set at backup time and where each file's content lives
+MANIFEST_NAME = '.manifest.json'
+MANIFEST_VERSION = 1
+BACKUP_PREFIX = 'DMS_Backup_'
+COPY_CHUNK_SIZE = 1024 * 1024
+# Files up to this size are read, hashed and (for zip) deflated ahead by the
+# worker pool; larger ones are streamed into the archive by the writer
+PREFETCH_MAX_BYTES = 4 * 1024 * 1024
+# Streamed backups: at most STREAM_QUEUE_CHUNKS chunks wait for the client
+STREAM_CHUNK_SIZE = 256 * 1024
+STREAM_QUEUE_CHUNKS = 16
+STREAM_PUT_TIMEOUT = 0.5
+# Database tables are exported into archives under this directory
+DATABASE_DIR = '.database/'
+# Table exports are buffered in memory up to this size, then on disk
+DATABASE_SPOOL_BYTES = 16 * 1024 * 1024
+
+
+class PreparedFile(NamedTuple):
+    entry: FileEntry
+    compress: bool
+    data: Optional[bytes]
+    sha256: Optional[str]
+    # Raw deflate stream of ``data`` and its CRC-32, when deflated ahead
+    deflated: Optional[bytes] = None
+    crc: int = 0
+
+
+def prepare_file(entry: FileEntry, deflate: bool = False) -> PreparedFile:
+    """
+    Read a small file and hash it, or only sample a large one; decide whether
+    to compress it. With ``deflate`` a small compressible file is also
+    deflated here, on the worker pool, instead of by the archive writer.
+    """
+    with open(entry.path, 'rb') as f:
+        if entry.size <= PREFETCH_MAX_BYTES:
+            data = f.read()
+            compress = should_compress(entry.path, data[:SAMPLE_SIZE])
+            sha256 = hashlib.sha256(data).hexdigest()
+            if compress and deflate:
+                return PreparedFile(entry, compress, data, sha256, raw_deflate(data), zlib.crc32(data))
+            return PreparedFile(entry, compress, data, sha256)
+        sample = f.read(SAMPLE_SIZE)
+    return PreparedFile(entry, should_compress(entry.path, sample), None, None)
+
+
+def prefetch(executor: ThreadPoolExecutor, fn, items: Iterable, window: int) -> Iterator:
+    """``executor.map`` in order, with at most ``window`` results in flight (bounded memory)."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class BackupError(Exception):
+    """A backup cannot be created or restored (missing archive, broken chain, ...)."""
+
+
+class BackupService:
+    """
+    Incremental backups driven by manifests.
+
+    Every archive carries a manifest listing all files of the storage
+    directory at backup time (path, size, mtime, SHA-256) and, per file,
+    the archive that holds its content. A full backup stores every file;
+    an incremental one stores only files that are new or changed since its
+    parent (the previous backup) and refers to older archives for the
+    rest. Restoring a backup therefore needs its whole chain, back to the
+    last full backup. After ``backup_full_every`` incrementals the next
+    backup is a full one again, which bounds the chain length.
+
+    Archives are zip (default, readable anywhere) or tar.zst. In a zip
+    each file is stored or deflated depending on whether it compresses at
+    all, so PDFs and images are not deflated again; tar.zst is compressed
+    by zstd on several threads. A pool of ``backup_workers`` threads reads
+    and hashes files ahead of the archive writer.
+    """
+
+    @staticmethod
+    def backup_dir() -> str:
+        return os.path.join(settings.storage_dir, 'backups')
+
+    @staticmethod
+    def backup_path(backup_name: str) -> str:
+        """Path of a backup archive; rejects names that would leave the backup directory."""
+        backup_dir = os.path.abspath(BackupService.backup_dir())
+        backup_path = os.path.abspath(os.path.join(backup_dir, backup_name))
+        if '..' in backup_name or os.path.dirname(backup_path) != backup_dir:
+            raise ValueError("Invalid backup name")
+        return backup_path
+
+    @staticmethod
+    def manifest_sidecar(backup_path: str) -> str:
+        return f"{backup_path}.manifest.json"
+
+    @staticmethod
+    def read_manifest(backup_path: str) -> Optional[Dict]:
+        """The manifest of an archive, or None for archives made before manifests existed."""
+        # tar.zst archives keep a copy next to them: the one inside is at
+        # the end of a stream that would have to be decompressed to reach it
+        sidecar = BackupService.manifest_sidecar(backup_path)
+        if archive_format(backup_path) == 'tar.zst' and os.path.exists(sidecar):
+            with open(sidecar, 'rb') as f:
+                return json.load(f)
+        data = read_member(backup_path, MANIFEST_NAME)
+        return json.loads(data) if data is not None else None
+
+    @staticmethod
+    def _backup_names() -> List[str]:
+        backup_dir = BackupService.backup_dir()
+        if not os.path.isdir(backup_dir):
+            return []
+        return sorted(name for name in os.listdir(backup_dir) if name.endswith(('.zip', '.tar.zst')))
+
+    @staticmethod
+    def _latest_manifest() -> Optional[Dict]:
+        for name in reversed(BackupService._backup_names()):
+            try:
+                manifest = BackupService.read_manifest(BackupService.backup_path(name))
+            except (OSError, zipfile.BadZipFile, ValueError) as e:
+                logger.warning("Skipping unreadable backup", backup=name, error=str(e))
+                continue
+            if manifest is not None:
+                return manifest
+        return None
+
+    @staticmethod
+    def _store(writer, prepared: PreparedFile) -> str:
+        """Add a file to the archive. Returns its SHA-256, computed in the same pass for large files."""
+        entry = prepared.entry
+        mtime = entry.mtime_ns / 1e9
+        if prepared.deflated is not None:
+            writer.add_deflated(entry.relative_path, prepared.deflated, prepared.crc, entry.size, mtime)
+            return prepared.sha256
+        if prepared.data is not None:
+            writer.add_bytes(entry.relative_path, prepared.data, mtime, prepared.compress)
+            return prepared.sha256
+        with open(entry.path, 'rb') as source:
+            reader = HashingReader(source)
+            writer.add_stream(entry.relative_path, reader, entry.size, mtime, prepared.compress)
+        return reader.digest.hexdigest()
+
+    @staticmethod
+    def _new_backup_name(fmt: str) -> str:
+        backup_dir = BackupService.backup_dir()
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_name = f"{BACKUP_PREFIX}{timestamp}{extension(fmt)}"
+        suffix = 0
+        while os.path.exists(os.path.join(backup_dir, backup_name)):
+            suffix += 1
+            backup_name = f"{BACKUP_PREFIX}{timestamp}_{suffix}{extension(fmt)}"
+        return backup_name
+
+    @staticmethod
+    def _scan_storage() -> Dict[str, FileEntry]:
+        if not os.path.exists(settings.storage_dir):
+            return {}
+        # Skip the backups directory to avoid recursion
+        return {
+            path: entry for path, entry in scan_tree(settings.storage_dir).items()
+            if not path.startswith('backups/')
+        }
+
+    @staticmethod
+    def _write_files(writer, executor: ThreadPoolExecutor, window: int, to_store: List[FileEntry],
+                     backup_name: str, files: Dict[str, Dict],
+                     on_stored: Optional[Callable[[PreparedFile], None]] = None) -> None:
+        """Add ``to_store`` to the archive, read ahead on ``executor``, and record them in ``files``."""
+        prepare = functools.partial(prepare_file, deflate=writer.deflates_in_parallel)
+        for prepared in prefetch(executor, prepare, to_store, window=window):
+            entry = prepared.entry
+            files[entry.relative_path] = {
+                'size': entry.size,
+                'mtime_ns': entry.mtime_ns,
+                'sha256': BackupService._store(writer, prepared),
+                'archive': backup_name,
+            }
+            if on_stored:
+                on_stored(prepared)
+
+    @staticmethod
+    def _manifest(backup_name: str, fmt: str, parent: Optional[Dict], files: Dict[str, Dict],
+                  stored: List[FileEntry], database: Optional[Dict] = None) -> Dict:
+        return {
+            'version': MANIFEST_VERSION,
+            'name': backup_name,
+            'created': datetime.now().isoformat(),
+            'format': fmt,
+            'type': 'incremental' if parent else 'full',
+            'parent': parent['name'] if parent else None,
+            'chain_length': parent.get('chain_length', 0) + 1 if parent else 0,
+            'files_stored': len(stored),
+            'bytes_stored': sum(entry.size for entry in stored),
+            'files': dict(sorted(files.items())),
+            'database': database,
+        }
+
+    @staticmethod
+    def _export_database(bind) -> List[Tuple[str, BinaryIO, int]]:
+        """Export the database into spooled temporary files: (table, file, rows), in load order."""
+        spools: Dict[str, BinaryIO] = {}
+
+        def open_output(table) -> BinaryIO:
+            spools[table.name] = tempfile.SpooledTemporaryFile(max_size=DATABASE_SPOOL_BYTES,
+                                                               dir=BackupService.backup_dir())
+            return spools[table.name]
+
+        os.makedirs(BackupService.backup_dir(), exist_ok=True)
+        try:
+            counts = DatabaseExportService.export_tables(bind, open_output)
+        except Exception:
+            for spool in spools.values():
+                spool.close()
+            raise
+        return [(name, spool, counts[name]) for name, spool in spools.items()]
+
+    @staticmethod
+    def _add_database(writer, exported: List[Tuple[str, BinaryIO, int]]) -> Dict:
+        """Add exported tables to the archive (already gzipped, so stored). Returns the manifest entry."""
+        tables = {}
+        for name, spool, rows in exported:
+            with spool:
+                size = spool.tell()
+                spool.seek(0)
+                reader = HashingReader(spool)
+                member = f"{DATABASE_DIR}{name}.jsonl.gz"
+                writer.add_stream(member, reader, size, time.time(), False)
+            tables[name] = {'member': member, 'rows': rows, 'size': size, 'sha256': reader.digest.hexdigest()}
+        return {'tables': tables}
+
+    @staticmethod
+    def create_backup(progress: Optional[ProgressCallback] = None, full: bool = False,
+                      fmt: Optional[str] = None, bind=None) -> Dict:
+        """
+        Back up documents, templates and logs under the storage directory,
+        incrementally on top of the latest backup unless ``full`` (or the
+        chain has reached ``backup_full_every``). ``fmt`` is ``zip`` or
+        ``tar.zst`` (default: the BACKUP_FORMAT setting). With ``bind`` (an
+        engine) every archive also holds a complete export of the database.
+        """
+        started = time.monotonic()
+        timings: Dict[str, float] = {}
+        fmt = fmt or settings.backup_format
+        workers = max(settings.backup_workers, 1)
+        backup_dir = BackupService.backup_dir()
+        os.makedirs(backup_dir, exist_ok=True)
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_name = BackupService._new_backup_name(fmt)
+        backup_path = os.path.join(backup_dir, backup_name)
+
+        parent = None if full else BackupService._latest_manifest()
+        if parent is not None and parent.get('chain_length', 0) >= settings.backup_full_every:
+            parent = None
+        if parent is not None:
+            archives = {item['archive'] for item in parent['files'].values()}
+            if not all(os.path.exists(os.path.join(backup_dir, name)) for name in archives):
+                logger.warning("Parent backup chain is incomplete, creating a full backup", parent=parent['name'])
+                parent = None
+        parent_files = parent['files'] if parent else {}
+
+        # The database goes first: every file a row refers to then exists by the time the files are scanned
+        exported = []
+        if bind is not None:
+            exported = BackupService._export_database(bind)
+            timings['database_seconds'] = round(time.monotonic() - started, 3)
+
+        phase = time.monotonic()
+        entries = BackupService._scan_storage()
+        timings['scan_seconds'] = round(time.monotonic() - phase, 3)
+
+        files: Dict[str, Dict] = {}
+        to_store: List[FileEntry] = []
+        compressed = 0
+        # Written under a temporary name: a half-written archive must never become a parent
+        partial_path = f"{backup_path}.partial"
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backup") as executor:
+            # Plan: unchanged files keep their parent's archive. Touched
+            # files (same size, new mtime) are hashed on the pool to tell
+            # whether their content changed
+            phase = time.monotonic()
+            touched = []
+            for relative_path in sorted(entries):
+                entry = entries[relative_path]
+                previous = parent_files.get(relative_path)
+                if previous and previous['size'] == entry.size:
+                    if previous['mtime_ns'] == entry.mtime_ns:
+                        files[relative_path] = {**previous, 'mtime_ns': entry.mtime_ns}
+                    else:
+                        touched.append(entry)
+                    continue
+                to_store.append(entry)
+            for entry, content_hash in zip(touched, executor.map(lambda e: file_sha256(e.path), touched)):
+                previous = parent_files[entry.relative_path]
+                if content_hash == previous['sha256']:
+                    files[entry.relative_path] = {**previous, 'mtime_ns': entry.mtime_ns}
+                else:
+                    to_store.append(entry)
+            to_store.sort(key=lambda entry: entry.relative_path)
+            timings['plan_seconds'] = round(time.monotonic() - phase, 3)
+
+            phase = time.monotonic()
+
+            def on_stored(prepared: PreparedFile) -> None:
+                nonlocal compressed
+                compressed += prepared.compress
+                if progress:
+                    progress(len(files), len(entries))
+
+            manifest_data = None
+            try:
+                writer = open_writer(partial_path, fmt, workers=workers, level=settings.backup_zstd_level)
+                try:
+                    BackupService._write_files(writer, executor, workers * 2, to_store, backup_name, files,
+                                               on_stored)
+                    timings['write_seconds'] = round(time.monotonic() - phase, 3)
+
+                    phase = time.monotonic()
+                    database = BackupService._add_database(writer, exported) if bind is not None else None
+                    manifest = BackupService._manifest(backup_name, fmt, parent, files, to_store, database)
+                    manifest_data = json.dumps(manifest).encode('utf-8')
+                    writer.add_bytes(MANIFEST_NAME, manifest_data, time.time(), True)
+                finally:
+                    writer.close()
+                if fmt == 'tar.zst':
+                    with open(BackupService.manifest_sidecar(backup_path), 'wb') as f:
+                        f.write(manifest_data)
+                os.replace(partial_path, backup_path)
+                timings['finalize_seconds'] = round(time.monotonic() - phase, 3)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+        size = os.path.getsize(backup_path)
+        logger.info("Backup created", backup=backup_name, type=manifest['type'], parent=manifest['parent'],
+                    files=len(files), stored=manifest['files_stored'], size=size, **timings)
+        return {
+            'success': True,
+            'message': (f"Backup created: {backup_name} "
+                        f"({manifest['type']}, {manifest['files_stored']} of {len(files)} files stored)"),
+            'backup_file': backup_name,
+            'path': backup_path,
+            'size': size,
+            'format': fmt,
+            'type': manifest['type'],
+            'parent': manifest['parent'],
+            'files': len(files),
+            'files_stored': manifest['files_stored'],
+            'files_compressed': compressed,
+            'bytes_stored': manifest['bytes_stored'],
+            'total_bytes': sum(item['size'] for item in files.values()),
+            'workers': workers,
+            'timings': timings,
+            'duration_seconds': round(time.monotonic() - started, 3),
+            'timestamp': timestamp
+        }
+
+    @staticmethod
+    def list_backups() -> List[Dict]:
+        """Backups, newest first, with their type, chain and the size each archive really takes."""
+        manifests: Dict[str, Optional[Dict]] = {}
+        stats = {}
+        for name in BackupService._backup_names():
+            path = BackupService.backup_path(name)
+            stats[name] = os.stat(path)
+            try:
+                manifests[name] = BackupService.read_manifest(path)
+            except (OSError, zipfile.BadZipFile, ValueError):
+                manifests[name] = None
+
+        backups = []
+        for name in sorted(manifests, reverse=True):
+            manifest = manifests[name]
+            st = stats[name]
+            item = {
+                'name': name,
+                'size': st.st_size,
+                'date': datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            if manifest is None:
+                item.update({'type': 'legacy', 'parent': None, 'chain': [name], 'restorable': True})
+            else:
+                chain = BackupService._chain(name, manifests)
+                item.update({
+                    'type': manifest['type'],
+                    'parent': manifest.get('parent'),
+                    'chain': chain,
+                    'restorable': chain[0] in manifests and manifests[chain[0]] is not None
+                                  and manifests[chain[0]]['type'] == 'full',
+                    'files': len(manifest['files']),
+                    'files_stored': manifest.get('files_stored', 0),
+                    'total_bytes': sum(f['size'] for f in manifest['files'].values()),
+                    'chain_bytes': sum(stats[n].st_size for n in chain if n in stats),
+                    'database': bool(manifest.get('database')),
+                })
+            backups.append(item)
+        return backups
+
+    @staticmethod
+    def _chain(name: str, manifests: Dict[str, Optional[Dict]]) -> List[str]:
+        """Archive names from the full backup down to ``name``; starts with a missing name if broken."""
+        chain = [name]
+        while True:
+            manifest = manifests.get(chain[0])
+            parent = manifest.get('parent') if manifest else None
+            if not parent or parent in chain:
+                return chain
+            chain.insert(0, parent)
+            if parent not in manifests:
+                return chain
+
+    @staticmethod
+    def _target_path(relative_path: str) -> str:
+        storage_dir = os.path.abspath(settings.storage_dir)
+        target = os.path.normpath(os.path.join(storage_dir, relative_path))
+        if not target.startswith(storage_dir + os.sep) or relative_path.startswith('backups/'):
+            raise BackupError(f"Refusing to restore outside the storage directory: {relative_path}")
+        return target
+
+    @staticmethod
+    def _extract_verified(source: BinaryIO, relative_path: str, expected: Optional[Dict]) -> int:
+        """
+        Stream a member to its place under the storage directory through a
+        hidden temporary file, which replaces the target only once its size
+        and SHA-256 match the manifest (``expected``; archives without a
+        manifest rely on the zip CRC, which zipfile checks at the end of
+        each member). Returns the number of bytes written.
+        """
+        target = BackupService._target_path(relative_path)
+        directory, name = os.path.split(target)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".{name}.restore")
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                with open(tmp_path, 'wb') as out:
+                    for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b''):
+                        digest.update(chunk)
+                        out.write(chunk)
+                        size += len(chunk)
+            except zipfile.BadZipFile as e:
+                raise BackupError(f"Corrupt archive member {relative_path}: {e}") from e
+            if expected is not None:
+                if size != expected['size']:
+                    raise BackupError(f"Size mismatch for {relative_path}: "
+                                      f"expected {expected['size']} bytes, got {size}")
+                if digest.hexdigest() != expected['sha256']:
+                    raise BackupError(f"Checksum mismatch for {relative_path}")
+                os.utime(tmp_path, ns=(expected['mtime_ns'], expected['mtime_ns']))
+            os.replace(tmp_path, target)
+            return size
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _extract_all(members: Dict[str, List[str]], expected: Dict[str, Dict], label: str,
+                     progress: Optional[ProgressCallback] = None) -> Dict:
+        """
+        Extract ``members`` (archive name -> member names). Zip members are
+        extracted in parallel, each worker reading through its own handle;
+        a tar.zst archive is one compressed stream and is read in order.
+        """
+        started = time.monotonic()
+        total = sum(len(names) for names in members.values())
+        workers = max(settings.backup_workers, 1)
+        stats = {'files': 0, 'bytes': 0}
+
+        def report() -> None:
+            if progress:
+                elapsed = max(time.monotonic() - started, 1e-6)
+                progress(stats['files'], total,
+                         f"Restoring from {label}: {stats['bytes'] / elapsed / (1024 * 1024):.1f} MB/s")
+
+        def done(size: int) -> None:
+            stats['files'] += 1
+            stats['bytes'] += size
+            report()
+
+        readers = ZipReaders()
+
+        def extract_zip_member(archive_path: str, relative_path: str) -> int:
+            with readers.get(archive_path).open(relative_path) as source:
+                return BackupService._extract_verified(source, relative_path, expected.get(relative_path))
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="restore")
+        try:
+            futures = []
+            for archive in sorted(members):
+                archive_path = BackupService.backup_path(archive)
+                if archive_format(archive_path) == 'zip':
+                    futures += [executor.submit(extract_zip_member, archive_path, relative_path)
+                                for relative_path in members[archive]]
+            # Streams are read on this thread while the pool works through the zips
+            for archive in sorted(members):
+                archive_path = BackupService.backup_path(archive)
+                if archive_format(archive_path) == 'tar.zst':
+                    for info, source in iter_tar_zst(archive_path, set(members[archive])):
+                        done(BackupService._extract_verified(source, info.name, expected.get(info.name)))
+            for future in as_completed(futures):
+                done(future.result())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            readers.close()
+
+        if stats['files'] != total:
+            raise BackupError(f"Archive is missing {total - stats['files']} of {total} files")
+        duration = time.monotonic() - started
+        return {
+            'files_restored': total,
+            'bytes_restored': stats['bytes'],
+            'workers': workers,
+            'duration_seconds': round(duration, 3),
+            'bytes_per_second': int(stats['bytes'] / duration) if duration > 0 else 0,
+        }
+
+    @staticmethod
+    def _restore_plan(backup_name: str) -> Tuple[Dict[str, List[str]], Optional[Dict]]:
+        """(archive name -> member names, manifest or None) for restoring ``backup_name``."""
+        backup_path = BackupService.backup_path(backup_name)
+        if not os.path.exists(backup_path):
+            raise FileNotFoundError(backup_name)
+
+        manifest = BackupService.read_manifest(backup_path)
+        if manifest is None:
+            # Archives without a manifest hold storage-relative paths; extract them all
+            with zipfile.ZipFile(backup_path) as zipf:
+                return {backup_name: [info.filename for info in zipf.infolist() if not info.is_dir()]}, None
+
+        by_archive: Dict[str, List[str]] = {}
+        for relative_path, item in manifest['files'].items():
+            by_archive.setdefault(item['archive'], []).append(relative_path)
+        missing = [name for name in by_archive if not os.path.exists(BackupService.backup_path(name))]
+        if missing:
+            raise BackupError(f"Backup chain is incomplete, missing: {', '.join(sorted(missing))}")
+        return by_archive, manifest
+
+    @staticmethod
+    def check_restorable(backup_name: str) -> None:
+        """Raise ValueError, FileNotFoundError or BackupError if ``backup_name`` cannot be restored."""
+        BackupService._restore_plan(backup_name)
+
+    @staticmethod
+    def _read_members(archive_path: str, names: List[str]) -> Iterator[Tuple[str, BinaryIO]]:
+        """(name, file object) for the given members, in the order the archive reads best."""
+        if archive_format(archive_path) == 'tar.zst':
+            for info, source in iter_tar_zst(archive_path, set(names)):
+                yield info.name, source
+            return
+        with zipfile.ZipFile(archive_path) as zipf:
+            for name in names:
+                with zipf.open(name) as source:
+                    yield name, source
+
+    @staticmethod
+    def _restore_database(bind, backup_name: str, database: Dict) -> Dict[str, int]:
+        """
+        Load the database export of ``backup_name``. A checksum mismatch or
+        a table missing from the archive rolls the whole load back.
+        """
+        tables = database['tables']
+        by_member = {item['member']: name for name, item in tables.items()}
+        readers: Dict[str, HashingReader] = {}
+
+        def sources() -> Iterator[Tuple[str, BinaryIO]]:
+            archive_path = BackupService.backup_path(backup_name)
+            for member, source in BackupService._read_members(archive_path, list(by_member)):
+                name = by_member[member]
+                readers[name] = HashingReader(source)
+                yield name, readers[name]
+            # Raised inside the import's transaction: the reader skips members that are not there
+            missing = set(tables) - set(readers)
+            if missing:
+                raise BackupError(f"Backup is missing database tables: {', '.join(sorted(missing))}")
+
+        def verify(name: str) -> None:
+            if readers[name].digest.hexdigest() != tables[name]['sha256']:
+                raise BackupError(f"Checksum mismatch for database table {name}")
+
+        return DatabaseExportService.import_tables(bind, sources(), after_table=verify)
+
+    @staticmethod
+    def restore_backup(backup_name: str, progress: Optional[ProgressCallback] = None, bind=None) -> Dict:
+        """
+        Restore the storage directory as of ``backup_name``, reading each
+        file from the archive in the chain that holds it. Every file is
+        verified before it replaces the current one. With ``bind`` (an
+        engine) the database export in the backup, if any, replaces the
+        current content of the exported tables.
+        """
+        members, manifest = BackupService._restore_plan(backup_name)
+        expected = manifest['files'] if manifest else {}
+        result = BackupService._extract_all(members, expected, backup_name, progress)
+        result['database'] = None
+        if bind is not None and manifest and manifest.get('database'):
+            if progress:
+                progress(result['files_restored'], result['files_restored'], "Restoring database")
+            result['database'] = BackupService._restore_database(bind, backup_name, manifest['database'])
+        logger.info("Backup restored", backup=backup_name, archives=len(members), **result)
+        return {
+            'success': True,
+            'message': f"Restored {result['files_restored']} files from {backup_name}",
+            **result,
+            'archives': sorted(members),
+        }
+
+
+class BackupCancelled(Exception):
+    """The client of a streamed backup went away."""
+
+
+class StreamSink:
+    """
+    Write end of a streamed archive. Writes are cut into chunks for a
+    bounded queue, so the archive writer blocks (instead of buffering)
+    when the client reads slower than the archive is produced. Optionally
+    keeps a copy of every byte in ``copy``.
+    """
+
+    def __init__(self, max_chunks: int, chunk_size: int, copy: Optional[BinaryIO] = None):
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_chunks)
+        self.chunk_size = chunk_size
+        self.copy = copy
+        self.cancelled = threading.Event()
+        self.discard = False
+        self._buffer = bytearray()
+        self._position = 0
+
+    def write(self, data) -> int:
+        if self.discard:
+            # The stream was abandoned; this is the writer cleaning up
+            return len(data)
+        if self.cancelled.is_set():
+            raise BackupCancelled()
+        self._buffer += data
+        self._position += len(data)
+        if self.copy is not None:
+            self.copy.write(data)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        if self.discard:
+            self._buffer.clear()
+        if self._buffer:
+            self.put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def put(self, item) -> None:
+        while True:
+            if self.cancelled.is_set():
+                raise BackupCancelled()
+            try:
+                self.queue.put(item, timeout=STREAM_PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+
+
+class BackupStream:
+    """
+    A full backup generated while the client downloads it: a producer
+    thread writes the archive into a StreamSink and the response reads
+    the chunks with ``next_chunk``. Memory stays bounded by the sink's
+    queue and the read-ahead window whatever the backup size. With
+    ``save`` the archive is also written to the backup directory (and
+    becomes the parent of the next incremental backup) once complete.
+    """
+
+    def __init__(self, fmt: Optional[str] = None, save: bool = False, bind=None):
+        self.fmt = fmt or settings.backup_format
+        self.save = save
+        self.bind = bind
+        self.name = BackupService._new_backup_name(self.fmt)
+        self.path = os.path.join(BackupService.backup_dir(), self.name)
+        self.bytes_sent = 0
+        self._sink: Optional[StreamSink] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BackupStream":
+        copy = None
+        if self.save:
+            os.makedirs(BackupService.backup_dir(), exist_ok=True)
+            copy = open(f"{self.path}.partial", 'wb')
+        self._sink = StreamSink(STREAM_QUEUE_CHUNKS, STREAM_CHUNK_SIZE, copy)
+        self._thread = threading.Thread(target=self._produce, name="backup-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def _produce(self) -> None:
+        sink = self._sink
+        partial_path = f"{self.path}.partial"
+        workers = max(settings.backup_workers, 1)
+        try:
+            exported = BackupService._export_database(self.bind) if self.bind is not None else []
+            entries = BackupService._scan_storage()
+            to_store = [entries[path] for path in sorted(entries)]
+            files: Dict[str, Dict] = {}
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backup-stream") as executor:
+                writer = open_writer(sink, self.fmt, workers=workers, level=settings.backup_zstd_level)
+                BackupService._write_files(writer, executor, workers * 2, to_store, self.name, files)
+                database = BackupService._add_database(writer, exported) if self.bind is not None else None
+                manifest = BackupService._manifest(self.name, self.fmt, None, files, to_store, database)
+                manifest_data = json.dumps(manifest).encode('utf-8')
+                writer.add_bytes(MANIFEST_NAME, manifest_data, time.time(), True)
+                writer.close()
+            sink.flush()
+            if sink.copy is not None:
+                sink.copy.close()
+                # Closed: the cleanup below is only for failures
+                sink.copy = None
+                if self.fmt == 'tar.zst':
+                    with open(BackupService.manifest_sidecar(self.path), 'wb') as f:
+                        f.write(manifest_data)
+                os.replace(partial_path, self.path)
+            logger.info("Backup streamed", backup=self.name, files=len(files), bytes=sink.tell(), saved=self.save)
+            sink.put(None)
+        except BackupCancelled:
+            sink.discard = True
+            logger.warning("Backup stream cancelled by the client", backup=self.name, bytes=sink.tell())
+        except Exception as e:
+            sink.discard = True
+            logger.error("Backup stream failed", backup=self.name, error=str(e))
+            try:
+                sink.put(e)
+            except BackupCancelled:
+                pass
+        finally:
+            if sink.copy is not None:
+                sink.copy.close()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def next_chunk(self) -> Optional[bytes]:
+        """The next piece of the archive (blocking), or None at its end."""
+        item = self._sink.queue.get()
+        if isinstance(item, Exception):
+            raise item
+        if item is not None:
+            self.bytes_sent += len(item)
+        return item
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            while True:
+                chunk = self.next_chunk()
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.cancel()
+
+    def cancel(self) -> None:
+        """Stop the producer (the client disconnected); a no-op once the archive is complete."""
+        if self._sink is not None:
+            self._sink.cancelled.set()
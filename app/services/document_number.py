@@ -1,32 +1,144 @@
-from datetime import date
+import threading
+from datetime import date, datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
 from app.models.document_sequence import DocumentSequence
 
+settings = get_settings()
+
+
+class NumberBlockAllocator:
+    """
+    Hi-lo allocation: reserve a block of numbers for the day in one short
+    transaction, then hand them out from memory.
+
+    Each worker process owns one allocator, so the sequence row is touched once
+    per block instead of once per document. Numbers left in a block when the
+    process exits (or the day rolls over) are never issued, so each worker can
+    leave at most ``block_size - 1`` gaps per day.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = max(int(block_size), 1)
+        self._lock = threading.Lock()
+        self._date: date | None = None
+        self._next = 0
+        self._high = -1
+
+    def allocate(self, db: Session, sequence_date: date) -> int:
+        with self._lock:
+            if self._date != sequence_date or self._next > self._high:
+                # Reserve in a separate session so the block is committed on its
+                # own and never rolled back together with the caller's work
+                with Session(bind=db.get_bind()) as block_db:
+                    high = DocumentNumberService.reserve_numbers(block_db, sequence_date, self.block_size)
+                    block_db.commit()
+                self._date = sequence_date
+                self._next = high - self.block_size + 1
+                self._high = high
+            number = self._next
+            self._next += 1
+            return number
+
 
 class DocumentNumberService:
+    block_allocator = NumberBlockAllocator(settings.document_number_block_size)
+
     @staticmethod
-    def generate_document_number(db: Session) -> str:
+    def reserve_numbers(db: Session, sequence_date: date, count: int = 1) -> int:
+        """
+        Atomically advance the day's counter by ``count`` and return the new
+        last number; the caller owns numbers ``last - count + 1 .. last``.
+
+        Uses a single upsert, so concurrent callers never read-modify-write the
+        same value. The sequence row stays locked until the caller's
+        transaction ends.
+        """
+        table = DocumentSequence.__table__
+        dialect = db.get_bind().dialect.name
+
+        if dialect == 'mysql':
+            stmt = mysql.insert(table).values(sequence_date=sequence_date, last_number=count)
+            db.execute(stmt.on_duplicate_key_update(last_number=table.c.last_number + count))
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(table).values(sequence_date=sequence_date, last_number=count)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.sequence_date],
+                set_={'last_number': table.c.last_number + count},
+            ))
+        else:
+            result = db.execute(
+                update(table)
+                .where(table.c.sequence_date == sequence_date)
+                .values(last_number=table.c.last_number + count)
+            )
+            if result.rowcount == 0:
+                try:
+                    with db.begin_nested():
+                        db.execute(table.insert().values(sequence_date=sequence_date, last_number=count))
+                except IntegrityError:
+                    # Another transaction created today's row first
+                    db.execute(
+                        update(table)
+                        .where(table.c.sequence_date == sequence_date)
+                        .values(last_number=table.c.last_number + count)
+                    )
+
+        return db.execute(
+            select(table.c.last_number)
+            .where(table.c.sequence_date == sequence_date)
+            .with_for_update()
+        ).scalar_one()
+
+    @staticmethod
+    def generate_document_number(db: Session, commit: bool = True) -> str:
         """
         Generate a unique document number in the format: DOC-YYYYMMDD-XXXX
         where XXXX is a sequential number that resets daily.
+
+        With DOCUMENT_NUMBER_BLOCK_SIZE > 1 numbers come from a block reserved
+        by this worker (hi-lo), so numbers from different workers interleave and
+        unused numbers at shutdown are skipped.
+
+        With commit=False (block size 1) the number is part of the caller's
+        transaction: it is only used if the caller commits, and the day's
+        sequence row stays locked until then. Gapless numbering implies that
+        concurrent creates are serialized on that row.
         """
         today = date.today()
-        
-        # Get or create sequence for today
-        sequence = db.query(DocumentSequence).filter(
-            DocumentSequence.sequence_date == today
-        ).first()
-        
-        if not sequence:
-            sequence = DocumentSequence(sequence_date=today, last_number=0)
-            db.add(sequence)
-        
-        # Increment the sequence
-        sequence.last_number += 1
-        db.commit()
-        
+
+        if DocumentNumberService.block_allocator.block_size > 1:
+            number = DocumentNumberService.block_allocator.allocate(db, today)
+        else:
+            number = DocumentNumberService.reserve_numbers(db, today)
+            if commit:
+                db.commit()
+
         # Format: DOC-YYYYMMDD-XXXX
-        doc_number = f"DOC-{today.strftime('%Y%m%d')}-{sequence.last_number:04d}"
-        
-        return doc_number
+        return f"DOC-{today.strftime('%Y%m%d')}-{number:04d}"
+
+    @staticmethod
+    def release_number(db: Session, document_number: str) -> bool:
+        """
+        Give back a number from ``generate_document_number`` whose document
+        was never created, in its own committed transaction. Only possible
+        while it is still the day's last number (block size 1); otherwise
+        it stays a gap. Returns whether the number was released.
+        """
+        if DocumentNumberService.block_allocator.block_size > 1:
+            return False
+        _, day, number = document_number.split('-')
+        table = DocumentSequence.__table__
+        result = db.execute(
+            update(table)
+            .where(table.c.sequence_date == datetime.strptime(day, '%Y%m%d').date())
+            .where(table.c.last_number == int(number))
+            .values(last_number=table.c.last_number - 1)
+        )
+        db.commit()
+        return result.rowcount == 1
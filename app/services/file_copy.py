@@ -0,0 +1,73 @@
+"""File copies that let the kernel (or the filesystem) do the work."""
+
+import errno
+import os
+import shutil
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+# ioctl(dest_fd, FICLONE, src_fd): share the source's extents (Btrfs, XFS, ...)
+FICLONE = 0x40049409
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# Errors meaning "not supported here", after which a simpler method is tried
+UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY, errno.EBADF, errno.EPERM,
+}
+
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    if not HAS_FCNTL:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno in UNSUPPORTED_ERRNOS:
+            return False
+        raise
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int) -> bool:
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            count = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - copied))
+            if count == 0:
+                break
+            copied += count
+        return True
+    except OSError as e:
+        if e.errno in UNSUPPORTED_ERRNOS:
+            # Start over with a plain copy
+            os.lseek(src_fd, 0, os.SEEK_SET)
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+            os.ftruncate(dst_fd, 0)
+            return False
+        raise
+
+
+def copy_file(src: str, dst: str) -> str:
+    """
+    Copy ``src`` to ``dst`` with its timestamps and permissions, like
+    shutil.copy2. A reflink (copy-on-write clone) is tried first, then
+    copy_file_range, which copies inside the kernel (server-side on NFS
+    and SMB mounts); a regular read/write copy is the fallback. Returns
+    the method used: ``reflink``, ``copy_file_range`` or ``copy``.
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        if _reflink(fsrc.fileno(), fdst.fileno()):
+            method = 'reflink'
+        elif size and _copy_file_range(fsrc.fileno(), fdst.fileno(), size):
+            method = 'copy_file_range'
+        else:
+            shutil.copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
+            method = 'copy'
+    shutil.copystat(src, dst)
+    return method
@@ -0,0 +1,47 @@
+"""Local file scanning and hashing helpers shared by sync and backup."""
+
+import hashlib
+import os
+from typing import Dict, NamedTuple
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class FileEntry(NamedTuple):
+    """A file under a scanned directory, keyed by its '/'-separated relative path."""
+    relative_path: str
+    path: str
+    size: int
+    mtime_ns: int
+
+
+def scan_tree(source_dir: str) -> Dict[str, FileEntry]:
+    """
+    Stat every regular file under ``source_dir`` (hidden files and
+    directories skipped). Uses os.scandir so the directory read already
+    carries the file type and no extra stat is needed to tell files from
+    directories.
+    """
+    entries: Dict[str, FileEntry] = {}
+    pending = [source_dir]
+    while pending:
+        current = pending.pop()
+        with os.scandir(current) as it:
+            for item in it:
+                if item.name.startswith('.'):
+                    continue
+                if item.is_dir(follow_symlinks=False):
+                    pending.append(item.path)
+                elif item.is_file():
+                    st = item.stat()
+                    relative_path = os.path.relpath(item.path, source_dir).replace(os.sep, '/')
+                    entries[relative_path] = FileEntry(relative_path, item.path, st.st_size, st.st_mtime_ns)
+    return entries
+
+
+def file_sha256(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,343 @@
+"""Single-pass conversion of CKEditor HTML into ReportLab flowables."""
+
+from html import escape
+from html.parser import HTMLParser
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, Spacer, PageBreak, Table, TableStyle
+
+# Inline tags mapped to the ReportLab paragraph markup that replaces them
+INLINE_TAGS = {
+    'strong': 'b', 'b': 'b',
+    'em': 'i', 'i': 'i',
+    'u': 'u',
+    's': 'strike', 'strike': 'strike', 'del': 'strike',
+    'sub': 'sub', 'sup': 'sup',
+}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+LIST_TAGS = {'ul', 'ol'}
+SKIP_TAGS = {'script', 'style', 'head', 'title'}
+VOID_TAGS = {'br', 'hr', 'img', 'input', 'meta', 'link', 'col', 'area', 'base', 'wbr', 'source'}
+ALIGNMENTS = {'center': TA_CENTER, 'right': TA_RIGHT, 'justify': TA_JUSTIFY, 'left': TA_LEFT}
+
+TABLE_STYLE = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e8e8e8')),
+    ('FONTNAME', (0, 0), (-1, 0), 'Times-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Times-Roman'),
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('LEFTPADDING', (0, 0), (-1, -1), 8),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+])
+
+
+def _alignment(attrs: dict) -> int | None:
+    """Read text alignment from a style or align attribute."""
+    style = (attrs.get('style') or '').replace(' ', '').lower()
+    for name, value in ALIGNMENTS.items():
+        if f'text-align:{name}' in style or (attrs.get('align') or '').lower() == name:
+            return value
+    return None
+
+
+def _is_page_break(attrs: dict) -> bool:
+    return 'page-break' in (attrs.get('class') or '') or 'page-break-after' in (attrs.get('style') or '')
+
+
+class HTMLFlowableConverter(HTMLParser):
+    """
+    Convert HTML to ReportLab flowables in one streaming pass.
+
+    Text is collected into the current block (paragraph, heading, list item or
+    table cell) and a flowable is emitted as soon as the block closes, so the
+    work done is linear in the size of the input regardless of nesting depth.
+    Text outside any block becomes its own paragraph.
+
+    Links keep their target as ReportLab ``<a href>`` markup. A table inside a
+    table cell becomes a nested Table in that cell.
+    """
+
+    def __init__(self, styles, font_name: str = 'Times-Roman', bold_font_name: str = 'Times-Bold'):
+        super().__init__(convert_charrefs=True)
+        self.elements = []
+
+        self.body_style = ParagraphStyle(
+            'CKBody',
+            parent=styles['BodyText'],
+            fontSize=12,
+            fontName=font_name,
+            alignment=TA_JUSTIFY,
+            spaceBefore=6,
+            spaceAfter=6,
+            leading=14,
+        )
+        heading = dict(parent=self.body_style, fontName=bold_font_name, spaceBefore=12, spaceAfter=6)
+        h3 = ParagraphStyle('CKH3', fontSize=14, **heading)
+        self.heading_styles = {
+            'h1': ParagraphStyle('CKH1', fontSize=18, **heading),
+            'h2': ParagraphStyle('CKH2', fontSize=16, **heading),
+            'h3': h3, 'h4': h3, 'h5': h3, 'h6': h3,
+        }
+        self.cell_style = ParagraphStyle('TableCell', parent=self.body_style, fontSize=10, fontName=font_name)
+        self._aligned_styles = {}
+        self._list_styles = {}
+
+        # Current block: markup and plain-text fragments plus its style
+        self._markup = []
+        self._plain = []
+        self._block_style = None
+        self._block_is_heading = False
+        # Stack of [tag, counter] for open <ul>/<ol>
+        self._lists = []
+        # Open tables, innermost last: {'rows': [[cell, ...], ...], 'cell': cell or None},
+        # each cell a list of markup fragments and nested Tables
+        self._tables = []
+        # One entry per open <a>: whether it opened a link (only <a href> does)
+        self._links = []
+        self._skip_depth = 0
+
+    @classmethod
+    def convert(cls, html_content: str, styles, **kwargs) -> list:
+        converter = cls(styles, **kwargs)
+        converter.feed(html_content or '')
+        converter.close()
+        return converter.elements
+
+    # -- styles -----------------------------------------------------------
+
+    def _style_for(self, base: ParagraphStyle, alignment: int | None) -> ParagraphStyle:
+        if alignment is None:
+            return base
+        key = (base.name, alignment)
+        if key not in self._aligned_styles:
+            self._aligned_styles[key] = ParagraphStyle(f'{base.name}-{alignment}', parent=base, alignment=alignment)
+        return self._aligned_styles[key]
+
+    def _list_style(self, depth: int) -> ParagraphStyle:
+        if depth not in self._list_styles:
+            self._list_styles[depth] = ParagraphStyle(
+                f'ListItem{depth}', parent=self.body_style,
+                leftIndent=20 * depth, bulletIndent=10 + 20 * (depth - 1),
+            )
+        return self._list_styles[depth]
+
+    # -- block handling ---------------------------------------------------
+
+    def _start_block(self, style: ParagraphStyle, heading: bool = False, prefix: str = '') -> None:
+        self._flush_block()
+        self._block_style = style
+        self._block_is_heading = heading
+        if prefix:
+            self._markup.append(prefix)
+            self._plain.append(prefix)
+
+    def _flush_block(self) -> None:
+        """Emit the collected block as a Paragraph, if it has any text."""
+        markup, plain = ''.join(self._markup).strip(), ''.join(self._plain).strip()
+        style = self._block_style or self.body_style
+        self._markup, self._plain = [], []
+        self._block_style, heading, self._block_is_heading = None, self._block_is_heading, False
+        if not plain:
+            return
+        if heading:
+            # Headings are rendered as plain text in their own font
+            markup = escape(plain, quote=False)
+        try:
+            self.elements.append(Paragraph(markup, style))
+        except Exception:
+            # Fallback to plain text if the markup is rejected
+            self.elements.append(Paragraph(escape(plain, quote=False), style))
+
+    @property
+    def _cell(self) -> list | None:
+        return self._tables[-1]['cell'] if self._tables else None
+
+    def _cell_paragraph(self, markup: str) -> Paragraph:
+        try:
+            return Paragraph(markup, self.cell_style)
+        except Exception:
+            return Paragraph('&nbsp;', self.cell_style)
+
+    def _cell_content(self, parts: list):
+        """A cell's Paragraph, or its list of flowables when it holds nested tables."""
+        flowables, fragments = [], []
+        for part in parts + [None]:
+            if isinstance(part, str):
+                fragments.append(part)
+                continue
+            markup = ''.join(fragments).strip()
+            fragments = []
+            if markup:
+                flowables.append(self._cell_paragraph(markup))
+            if part is not None:
+                flowables.append(part)
+        if not flowables:
+            return Paragraph('&nbsp;', self.cell_style)
+        return flowables[0] if len(flowables) == 1 else flowables
+
+    def _build_table(self, rows: list) -> Table | None:
+        rows = [row for row in rows if row]
+        if not rows:
+            return None
+        width = max(len(row) for row in rows)
+        data = [[self._cell_content(parts) for parts in row + [[]] * (width - len(row))] for row in rows]
+        table = Table(data)
+        table.setStyle(TABLE_STYLE)
+        return table
+
+    def _end_table(self) -> None:
+        table = self._build_table(self._tables.pop()['rows'])
+        if table is None:
+            return
+        if self._tables:
+            outer = self._tables[-1]
+            if outer['cell'] is None:
+                # A table between rows of the outer table gets a row of its own
+                outer['cell'] = []
+                outer['rows'].append([outer['cell']])
+            outer['cell'].append(table)
+            return
+        self.elements.append(table)
+        self.elements.append(Spacer(1, 0.15 * inch))
+
+    def _write(self, markup: str, plain: str = '') -> None:
+        if self._cell is not None:
+            self._cell.append(markup)
+        elif not self._tables:
+            self._markup.append(markup)
+            self._plain.append(plain)
+
+    # -- HTMLParser callbacks ---------------------------------------------
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_depth or tag in SKIP_TAGS:
+            if tag not in VOID_TAGS:
+                self._skip_depth += 1
+            return
+        attrs = dict(attrs)
+
+        if tag == 'table':
+            if not self._tables:
+                self._flush_block()
+            self._tables.append({'rows': [], 'cell': None})
+            return
+        if tag == 'a':
+            href = attrs.get('href')
+            self._links.append(bool(href))
+            if href:
+                self._write(f'<a href="{escape(href, quote=True)}">')
+            return
+        if self._tables:
+            self._handle_table_tag(tag)
+            return
+
+        if tag == 'p' or tag in HEADING_TAGS:
+            if self._lists and self._block_style is not None and tag == 'p':
+                # <li><p>text</p></li>: the paragraph belongs to the list item
+                return
+            base = self.heading_styles[tag] if tag in HEADING_TAGS else self.body_style
+            self._start_block(self._style_for(base, _alignment(attrs)), heading=tag in HEADING_TAGS)
+        elif tag in LIST_TAGS:
+            self._flush_block()
+            self._lists.append([tag, 0])
+        elif tag == 'li':
+            if self._lists:
+                self._lists[-1][1] += 1
+                kind, number = self._lists[-1]
+            else:
+                kind, number = 'ul', 1
+            bullet = '•' if kind == 'ul' else f'{number}.'
+            self._start_block(self._list_style(max(len(self._lists), 1)), prefix=f'{bullet} ')
+        elif tag == 'br':
+            if self._block_style is not None:
+                self._write('<br/>', ' ')
+            else:
+                self._flush_block()
+                self.elements.append(Spacer(1, 0.1 * inch))
+        elif tag in ('figure', 'hr', 'div'):
+            if _is_page_break(attrs):
+                self._flush_block()
+                self.elements.append(PageBreak())
+            elif tag != 'hr':
+                self._flush_block()
+        elif tag in INLINE_TAGS:
+            self._write(f'<{INLINE_TAGS[tag]}>')
+
+    def _handle_table_tag(self, tag):
+        table = self._tables[-1]
+        if tag == 'tr':
+            table['rows'].append([])
+        elif tag in ('td', 'th'):
+            if not table['rows']:
+                table['rows'].append([])
+            table['cell'] = []
+            table['rows'][-1].append(table['cell'])
+        elif table['cell'] is not None:
+            cell = table['cell']
+            if tag in INLINE_TAGS:
+                cell.append(f'<{INLINE_TAGS[tag]}>')
+            elif tag == 'br' or (tag in ('p', 'li') and cell and isinstance(cell[-1], str)
+                                 and ''.join(part for part in cell if isinstance(part, str)).strip()):
+                cell.append('<br/>')
+
+    def handle_endtag(self, tag):
+        if self._skip_depth:
+            if tag not in VOID_TAGS:
+                self._skip_depth -= 1
+            return
+
+        if tag == 'table':
+            if self._tables:
+                self._end_table()
+            return
+        if tag == 'a':
+            if self._links and self._links.pop():
+                self._write('</a>')
+            return
+        if self._tables:
+            if tag in ('td', 'th'):
+                self._tables[-1]['cell'] = None
+            elif self._cell is not None and tag in INLINE_TAGS:
+                self._cell.append(f'</{INLINE_TAGS[tag]}>')
+            return
+
+        if tag in INLINE_TAGS:
+            self._write(f'</{INLINE_TAGS[tag]}>')
+        elif tag == 'p' and self._lists:
+            # Paragraphs inside list items are part of the item
+            if self._block_style is not None and self._block_style in self._list_styles.values():
+                return
+            self._flush_block()
+        elif tag in ('p', 'li', 'div', 'figure') or tag in HEADING_TAGS:
+            self._flush_block()
+        elif tag in LIST_TAGS:
+            self._flush_block()
+            if self._lists:
+                self._lists.pop()
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_data(self, data):
+        if self._skip_depth or not data:
+            return
+        if self._tables:
+            if self._cell is not None:
+                self._cell.append(escape(data, quote=False))
+            return
+        self._write(escape(data, quote=False), data)
+
+    def close(self):
+        super().close()
+        self._flush_block()
+        while self._tables:
+            self._end_table()
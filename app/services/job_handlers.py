@@ -0,0 +1,178 @@
+"""Sync and backup job handlers, and the scheduler that runs them."""
+
+import os
+from typing import Dict
+
+from app.config import get_settings
+from app.database.session import SessionLocal
+from app.services.backup import BackupService
+from app.services.jobs import JobContext, JobRunner, JobScheduler, parse_schedules
+from app.services.log_sync import LogSyncStateStore
+from app.services.restore import RestoreService
+from app.services.sync import LocalBackupSync, NextcloudSync, RemoteSync, SyncService
+from app.services.sync_state import SyncStateStore
+
+settings = get_settings()
+
+
+def _log_dir() -> str:
+    return os.path.join(settings.storage_dir, '../logs')
+
+
+def _run_remote_sync(ctx: JobContext, sync_service: RemoteSync, request: Dict) -> Dict:
+    sync_type = request.get('sync_type', 'all')
+    dry_run = request.get('dry_run', False)
+    results = {}
+    
+    if sync_type in ['documents', 'all']:
+        ctx.report(0, 0, "Syncing documents")
+        results['documents'] = sync_service.sync_documents(
+            settings.storage_dir,
+            state_store=SyncStateStore(ctx.db, sync_service.destination),
+            dry_run=dry_run,
+            full=request.get('full', False),
+            progress=ctx.report
+        )
+    
+    if sync_type in ['logs', 'all'] and not dry_run:
+        # Ship new log lines and rotated log files
+        if os.path.exists(_log_dir()):
+            ctx.report(0, 0, "Syncing logs")
+            results['logs'] = sync_service.sync_logs(
+                _log_dir(),
+                state_store=LogSyncStateStore(ctx.db, sync_service.destination)
+            )
+    
+    return {
+        'success': all(result.get('success', True) for result in results.values()),
+        'message': 'Sync completed',
+        'results': results
+    }
+
+
+def _run_restore(ctx: JobContext, sync_service: RemoteSync, request: Dict) -> Dict:
+    ctx.report(0, 0, "Restoring documents")
+    result = sync_service.restore_documents(
+        settings.storage_dir,
+        SyncStateStore(ctx.db, sync_service.destination),
+        overwrite=request.get('overwrite', False),
+        progress=ctx.report
+    )
+    if 'log' in result:
+        # Also after a partial restore: whatever came back should be reachable
+        ctx.report(0, 0, "Relinking document files")
+        result['relinked'] = RestoreService.relink_files(ctx.db, settings.storage_dir)
+    return result
+
+
+def _smb_service(config: Dict) -> SyncService:
+    return SyncService(
+        smb_host=config['host'],
+        smb_port=config['port'],
+        smb_username=config['username'],
+        smb_password=config['password'],
+        smb_share=config['share'],
+        smb_path=config['path'],
+        bandwidth=config.get('bandwidth')
+    )
+
+
+def _nextcloud_service(config: Dict) -> NextcloudSync:
+    return NextcloudSync(
+        url=config['url'],
+        username=config['username'],
+        password=config['password'],
+        base_path=config['path'],
+        bandwidth=config.get('bandwidth')
+    )
+
+
+def run_smb_sync(ctx: JobContext, params: Dict) -> Dict:
+    return _run_remote_sync(ctx, _smb_service(params['config']), params['request'])
+
+
+def run_nextcloud_sync(ctx: JobContext, params: Dict) -> Dict:
+    return _run_remote_sync(ctx, _nextcloud_service(params['config']), params['request'])
+
+
+def run_smb_restore(ctx: JobContext, params: Dict) -> Dict:
+    return _run_restore(ctx, _smb_service(params['config']), params['request'])
+
+
+def run_nextcloud_restore(ctx: JobContext, params: Dict) -> Dict:
+    return _run_restore(ctx, _nextcloud_service(params['config']), params['request'])
+
+
+def run_local_sync(ctx: JobContext, params: Dict) -> Dict:
+    request = params['request']
+    target = request['target']
+    results = {}
+    
+    if request.get('sync_type', 'all') in ['documents', 'all']:
+        if request.get('snapshot'):
+            results['documents'] = LocalBackupSync.snapshot_to_local(
+                settings.storage_dir, target, progress=ctx.report, keep=settings.sync_local_keep_snapshots
+            )
+        else:
+            results['documents'] = LocalBackupSync.sync_to_local(settings.storage_dir, target, progress=ctx.report)
+    
+    if request.get('sync_type', 'all') in ['logs', 'all'] and os.path.exists(_log_dir()):
+        results['logs'] = LocalBackupSync.sync_to_local(_log_dir(), os.path.join(target, 'logs'))
+    
+    return {
+        'success': all(result.get('success', True) for result in results.values()),
+        'message': 'Local sync completed',
+        'results': results
+    }
+
+
+def run_backup(ctx: JobContext, params: Dict) -> Dict:
+    return BackupService.create_backup(progress=ctx.report, full=params.get('full', False),
+                                       fmt=params.get('format'), bind=ctx.bind)
+
+
+def run_backup_restore(ctx: JobContext, params: Dict) -> Dict:
+    bind = ctx.bind if params.get('database', False) else None
+    result = BackupService.restore_backup(params['backup_file'], progress=ctx.report, bind=bind)
+    # Restored files may sit at different absolute paths than the database says
+    result['relinked'] = RestoreService.relink_files(ctx.db)
+    return result
+
+
+HANDLERS = {
+    'sync_smb': run_smb_sync,
+    'sync_nextcloud': run_nextcloud_sync,
+    'sync_local': run_local_sync,
+    'backup': run_backup,
+    'restore_backup': run_backup_restore,
+    'restore_smb': run_smb_restore,
+    'restore_nextcloud': run_nextcloud_restore,
+}
+
+
+def scheduled_params(kind: str) -> Dict:
+    """Parameters for a scheduled run, taken from the server configuration."""
+    request = {'sync_type': 'all'}
+    if kind == 'sync_smb':
+        return {'request': request, 'config': {
+            'host': settings.smb_host, 'port': settings.smb_port, 'username': settings.smb_username,
+            'password': settings.smb_password, 'share': settings.smb_share, 'path': settings.smb_path,
+        }}
+    if kind == 'sync_nextcloud':
+        return {'request': request, 'config': {
+            'url': settings.nextcloud_url, 'username': settings.nextcloud_username,
+            'password': settings.nextcloud_password, 'path': settings.nextcloud_path,
+        }}
+    if kind == 'sync_local':
+        return {'request': {**request, 'target': settings.sync_local_dir, 'snapshot': settings.sync_local_snapshots}}
+    return {}
+
+
+job_runner = JobRunner(max_workers=settings.job_workers)
+job_scheduler = JobScheduler(
+    job_runner,
+    parse_schedules(settings.job_schedules),
+    HANDLERS,
+    scheduled_params,
+    SessionLocal,
+)
@@ -0,0 +1,333 @@
+"""Background job execution, progress tracking and cron-style scheduling."""
+
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import structlog
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.job import Job
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+RUNNER_ID = f"{socket.gethostname()}:{os.getpid()}"
+ACTIVE_STATUSES = ('queued', 'running')
+# Progress is written at most this often, to keep status updates cheap
+PROGRESS_INTERVAL_SECONDS = 0.5
+# Long lists (e.g. every synced file) are cut to this many items in the stored result
+RESULT_LIST_LIMIT = 200
+
+
+def compact_result(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: compact_result(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [compact_result(item) for item in value[:RESULT_LIST_LIMIT]]
+        if len(value) > RESULT_LIST_LIMIT:
+            items.append({'truncated': len(value) - RESULT_LIST_LIMIT})
+        return items
+    return value
+
+
+class JobContext:
+    """Handed to a job handler: a DB session of its own and progress reporting."""
+
+    def __init__(self, runner: "JobRunner", bind, job_id: int, db: Session):
+        self.runner = runner
+        self.bind = bind
+        self.job_id = job_id
+        self.db = db
+        self._last_report = 0.0
+
+    def report(self, done: int, total: int, message: Optional[str] = None) -> None:
+        now = time.monotonic()
+        if done < total and now - self._last_report < PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_report = now
+        fields = {'progress_done': done, 'progress_total': total}
+        if message is not None:
+            fields['message'] = message[:255]
+        self.runner.update(self.bind, self.job_id, **fields)
+
+
+JobHandler = Callable[[JobContext, Dict], Dict]
+
+
+class JobRunner:
+    """
+    Run jobs on a small thread pool. ``submit`` records the job (status
+    ``queued``) and returns at once; the handler runs in the background
+    with its own session on the same database as the caller, and the job
+    row is updated with progress, the result and the final status.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max(max_workers, 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            return self._executor
+
+    def submit(
+        self,
+        db: Session,
+        kind: str,
+        handler: JobHandler,
+        params: Optional[Dict] = None,
+        public_params: Optional[Dict] = None,
+        user_id: Optional[int] = None,
+        schedule_key: Optional[str] = None,
+    ) -> Job:
+        """
+        Queue a job. ``params`` go to the handler; ``public_params`` (no
+        secrets) are what is stored on the job row.
+        """
+        job = Job(kind=kind, status='queued', params=public_params, created_by_id=user_id,
+                  schedule_key=schedule_key, runner=RUNNER_ID)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        future = self._get_executor().submit(self._execute, db.get_bind(), job.id, handler, params or {})
+        with self._lock:
+            self._futures[job.id] = future
+        future.add_done_callback(lambda _: self._forget(job.id))
+        logger.info("Job queued", job_id=job.id, kind=kind, schedule_key=schedule_key)
+        return job
+
+    def _forget(self, job_id: int) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> None:
+        """Block until a job submitted by this process has finished."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+
+    def update(self, bind, job_id: int, **fields) -> None:
+        with Session(bind=bind) as db:
+            db.execute(update(Job).where(Job.id == job_id).values(**fields))
+            db.commit()
+
+    def _execute(self, bind, job_id: int, handler: JobHandler, params: Dict) -> None:
+        self.update(bind, job_id, status='running', started_at=datetime.utcnow())
+        db = Session(bind=bind)
+        try:
+            result = handler(JobContext(self, bind, job_id, db), params) or {}
+            succeeded = result.get('success', True)
+            self.update(
+                bind, job_id,
+                status='succeeded' if succeeded else 'failed',
+                result=compact_result(result),
+                message=str(result.get('message', ''))[:255] or None,
+                finished_at=datetime.utcnow(),
+            )
+            logger.info("Job finished", job_id=job_id, success=succeeded)
+        except Exception as e:
+            db.rollback()
+            logger.error("Job failed", job_id=job_id, error=str(e), exc_info=True)
+            self.update(bind, job_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+        finally:
+            db.close()
+
+    def recover_interrupted(self, db: Session) -> int:
+        """
+        Fail jobs left queued or running by a process on this host that no
+        longer exists (e.g. the server was restarted mid-job).
+        """
+        host = RUNNER_ID.split(':', 1)[0]
+        stale = []
+        for job in db.query(Job).filter(Job.status.in_(ACTIVE_STATUSES)).all():
+            runner_host, _, pid = (job.runner or '').partition(':')
+            if runner_host == host and not _process_alive(int(pid or 0)):
+                stale.append(job)
+        for job in stale:
+            job.status = 'failed'
+            job.error = 'Interrupted by a server restart'
+            job.finished_at = datetime.utcnow()
+        db.commit()
+        return len(stale)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _process_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CronSchedule:
+    """
+    A five-field cron expression (minute hour day-of-month month day-of-week)
+    supporting ``*``, numbers, ranges ``a-b``, lists ``a,b`` and steps
+    ``*/n`` / ``a-b/n``. Day of week is 0-6 with 0 = Sunday (7 is accepted
+    too). As in cron, when both day fields are restricted either may match.
+    """
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        parsed = [self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Invalid step in {field!r}")
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(v) for v in part.split('-', 1))
+            else:
+                start = end = int(part)
+            if start < low or end > high or start > end:
+                raise ValueError(f"Value out of range in {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, moment: datetime) -> bool:
+        if moment.minute not in self.minutes or moment.hour not in self.hours or moment.month not in self.months:
+            return False
+        day_ok = moment.day in self.days
+        # Python: Monday = 0; cron: Sunday = 0
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+
+def parse_schedules(spec: str) -> List[Tuple[str, CronSchedule]]:
+    """Parse ``"backup=0 2 * * *; sync_local=*/30 * * * *"`` into (job kind, schedule) pairs."""
+    schedules = []
+    for entry in (spec or '').split(';'):
+        entry = entry.strip()
+        if not entry:
+            continue
+        kind, _, expression = entry.partition('=')
+        schedules.append((kind.strip(), CronSchedule(expression.strip())))
+    return schedules
+
+
+class JobScheduler:
+    """
+    Start jobs on cron schedules from a background thread, without an
+    external cron. Every process may run a scheduler: each run is recorded
+    with a unique schedule key, so only the first process to claim a minute
+    starts it. A run is skipped while a job of the same kind is still active.
+    """
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        schedules: List[Tuple[str, CronSchedule]],
+        handlers: Dict[str, JobHandler],
+        params_factory: Callable[[str], Dict],
+        session_factory: Callable[[], Session],
+    ):
+        self.runner = runner
+        self.schedules = schedules
+        self.handlers = handlers
+        self.params_factory = params_factory
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if not self.schedules or (self._thread is not None and self._thread.is_alive()):
+            return
+        unknown = [kind for kind, _ in self.schedules if kind not in self.handlers]
+        if unknown:
+            raise ValueError(f"Unknown job kinds in schedule: {', '.join(unknown)}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Job scheduler started",
+                    schedules=[f"{kind}={schedule.expression}" for kind, schedule in self.schedules])
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(5)
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            now = datetime.now()
+            next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+            if self._stop.wait((next_minute - now).total_seconds()):
+                return
+            try:
+                self.tick(next_minute)
+            except Exception as e:
+                logger.error("Scheduler tick failed", error=str(e))
+
+    def tick(self, minute: datetime) -> List[Job]:
+        """Start the jobs due at ``minute`` (local time)."""
+        started = []
+        for kind, schedule in self.schedules:
+            if not schedule.matches(minute):
+                continue
+            db = self.session_factory()
+            try:
+                active = db.query(Job.id).filter(Job.kind == kind, Job.status.in_(ACTIVE_STATUSES)).first()
+                if active is not None:
+                    logger.info("Scheduled job skipped, previous run still active", kind=kind, job_id=active.id)
+                    continue
+                params = self.params_factory(kind)
+                started.append(self.runner.submit(
+                    db, kind, self.handlers[kind],
+                    params=params,
+                    public_params={'scheduled': schedule.expression},
+                    schedule_key=f"{kind}@{minute:%Y-%m-%dT%H:%M}",
+                ))
+            except IntegrityError:
+                # Another process claimed this run
+                db.rollback()
+            finally:
+                db.close()
+        return started
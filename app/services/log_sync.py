@@ -0,0 +1,257 @@
+"""Append-only delta shipping of application log files to a sync destination."""
+
+import gzip
+import hashlib
+import os
+import tempfile
+from typing import Callable, Dict, Optional
+
+import structlog
+from sqlalchemy.orm import Session
+
+from app.models.log_sync_state import LogSyncState
+
+logger = structlog.get_logger()
+
+HEAD_BYTES = 4096
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def head_hash(path: str, length: int) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(min(length, HEAD_BYTES))).hexdigest()
+
+
+def content_head_hash(path: str) -> str:
+    """head_hash of a rotated file's content; ``.gz`` files are hashed decompressed."""
+    if path.endswith('.gz'):
+        try:
+            with gzip.open(path, 'rb') as f:
+                return hashlib.sha256(f.read(HEAD_BYTES)).hexdigest()
+        except (OSError, EOFError):
+            pass
+    return head_hash(path, HEAD_BYTES)
+
+
+def is_active_log(name: str) -> bool:
+    return name.endswith('.log')
+
+
+def is_rotated_log(name: str) -> bool:
+    # logrotate style: app.log.1, app.log.2.gz, app.log-20260101
+    return not is_active_log(name) and ('.log.' in name or '.log-' in name)
+
+
+class LogSyncStateStore:
+    """Per-destination shipping state of log files, in the log_sync_state table."""
+
+    def __init__(self, db: Session, destination: str):
+        self.db = db
+        self.destination = destination
+
+    def get(self, path: str) -> Optional[LogSyncState]:
+        return self.db.query(LogSyncState).filter(
+            LogSyncState.destination == self.destination,
+            LogSyncState.path == path,
+        ).first()
+
+    def find_active_by_inode(self, inode: int) -> Optional[LogSyncState]:
+        return self.db.query(LogSyncState).filter(
+            LogSyncState.destination == self.destination,
+            LogSyncState.inode == inode,
+            LogSyncState.rotated.is_(False),
+        ).first()
+
+    def find_rotated(self, inode: int, content_hash: str) -> Optional[LogSyncState]:
+        """A rotated file already shipped: same inode, and same head unless recorded without one."""
+        return self.db.query(LogSyncState).filter(
+            LogSyncState.destination == self.destination,
+            LogSyncState.inode == inode,
+            LogSyncState.rotated.is_(True),
+            LogSyncState.head_hash.in_([content_hash, '']),
+        ).first()
+
+    def find_rotated_content(self, content_hash: str) -> Optional[LogSyncState]:
+        return self.db.query(LogSyncState).filter(
+            LogSyncState.destination == self.destination,
+            LogSyncState.head_hash == content_hash,
+            LogSyncState.rotated.is_(True),
+        ).first()
+
+    def add(self, path: str, inode: int) -> LogSyncState:
+        row = LogSyncState(destination=self.destination, path=path, inode=inode, offset=0,
+                           head_hash='', segment_seq=0, rotated=False)
+        self.db.add(row)
+        return row
+
+    def commit(self) -> None:
+        self.db.commit()
+
+
+class LogShipper:
+    """
+    Ship log files as deltas instead of full copies.
+
+    For an active ``*.log`` file only the bytes appended since the last run
+    (up to the last complete line) are sent, as a gzip segment named
+    ``<stem>/<stem>-<seq>.log.gz``. The file's inode and a hash of its head
+    are recorded with the offset: when the inode changes (rotation) or the
+    head no longer matches (truncation), the stream restarts at offset 0
+    with the next segment number.
+
+    Rotated files (``app.log.1``, ``app.log-20260101``, ...) are handled
+    first. If one is the file an active stream was following (same inode),
+    only its unsent tail is shipped as that stream's last segment;
+    otherwise it is uploaded once, compressed, as
+    ``rotated/<name>@<inode>-<head hash>.gz``, so a name reused by a later
+    rotation never overwrites an earlier upload. Either
+    way it is never sent again. Rotated files are recognised by inode and
+    head hash, not by name: numbered rotation reuses ``app.log.1`` for a
+    different file every time. A ``.gz`` whose decompressed head matches
+    a file already shipped is the compressed copy of that file and is
+    skipped as well.
+
+    ``upload(local_path, relative_remote_path)`` does the transfer; state is
+    committed after every upload so an interrupted run does not resend
+    anything.
+    """
+
+    def __init__(self, store: LogSyncStateStore, upload: Callable[[str, str], None]):
+        self.store = store
+        self.upload = upload
+
+    def ship(self, log_dir: str) -> Dict:
+        result = {'segments': [], 'rotated': [], 'bytes_read': 0, 'bytes_sent': 0, 'errors': []}
+        names = sorted(os.listdir(log_dir))
+        with tempfile.TemporaryDirectory(prefix='dms-logs-') as work_dir:
+            for name in [n for n in names if is_rotated_log(n)]:
+                self._run(self._ship_rotated, log_dir, name, work_dir, result)
+            for name in [n for n in names if is_active_log(n)]:
+                self._run(self._ship_active, log_dir, name, work_dir, result)
+        return result
+
+    def _run(self, handler, log_dir: str, name: str, work_dir: str, result: Dict) -> None:
+        path = os.path.join(log_dir, name)
+        if not os.path.isfile(path):
+            return
+        try:
+            handler(path, name, work_dir, result)
+        except Exception as e:
+            self.store.db.rollback()
+            logger.warning("Log shipping failed", file=name, error=str(e))
+            result['errors'].append({'file': name, 'error': str(e)})
+
+    def _ship_active(self, path: str, name: str, work_dir: str, result: Dict) -> None:
+        st = os.stat(path)
+        row = self.store.get(name)
+        if row is None:
+            row = self.store.add(name, st.st_ino)
+        elif (row.inode != st.st_ino or st.st_size < row.offset
+              or (row.offset and head_hash(path, row.offset) != row.head_hash)):
+            # Rotated or truncated since the last run: follow the new file
+            # from its start; the old tail was shipped from the rotated copy
+            row.inode = st.st_ino
+            row.offset = 0
+            row.head_hash = ''
+
+        self._ship_delta(row, path, name, row.offset, st.st_size, work_dir, result, complete_lines=True)
+
+    def _ship_rotated(self, path: str, name: str, work_dir: str, result: Dict) -> None:
+        st = os.stat(path)
+        content_hash = content_head_hash(path)
+        if self.store.find_rotated(st.st_ino, content_hash) is not None:
+            return
+        if name.endswith('.gz') and self.store.find_rotated_content(content_hash) is not None:
+            return
+
+        stream = None if name.endswith('.gz') else self.store.find_active_by_inode(st.st_ino)
+        if stream is not None and stream.offset <= st.st_size and (
+                not stream.offset or head_hash(path, stream.offset) == stream.head_hash):
+            # The active log we were following was renamed: send its tail only
+            self._ship_delta(stream, path, stream.path, stream.offset, st.st_size, work_dir, result,
+                             complete_lines=False)
+            # Whatever replaces it under the old name starts a new stream
+            stream.inode = -1
+        else:
+            # Unique per file: numbered rotation hands the same name to a new file every time
+            stem = name[:-len('.gz')] if name.endswith('.gz') else name
+            self._upload_whole(path, name, f"rotated/{stem}@{st.st_ino}-{content_hash[:8]}.gz", work_dir, result)
+
+        # Keyed by inode: the name alone is reused by the next rotation
+        key = f"{name}@{st.st_ino}"
+        done = self.store.get(key) or self.store.add(key, st.st_ino)
+        done.inode = st.st_ino
+        done.offset = st.st_size
+        done.head_hash = content_hash
+        done.rotated = True
+        self.store.commit()
+        result['rotated'].append(name)
+
+    def _ship_delta(self, row: LogSyncState, path: str, name: str, start: int, end: int,
+                    work_dir: str, result: Dict, complete_lines: bool) -> None:
+        if end <= start:
+            self.store.commit()
+            return
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data_end = end
+            if complete_lines:
+                # Hold back a partially written last line until it is complete
+                data_end = self._last_line_end(f, start, end)
+                if data_end <= start:
+                    self.store.commit()
+                    return
+            stem = name[:-len('.log')] if name.endswith('.log') else name
+            seq = row.segment_seq + 1
+            segment = os.path.join(work_dir, f"{stem}-{seq:06d}.log.gz")
+            f.seek(start)
+            self._gzip_range(f, data_end - start, segment)
+
+        self.upload(segment, f"{stem}/{os.path.basename(segment)}")
+        result['bytes_read'] += data_end - start
+        result['bytes_sent'] += os.path.getsize(segment)
+        result['segments'].append({'file': name, 'segment': seq, 'from': start, 'to': data_end})
+        os.remove(segment)
+
+        row.offset = data_end
+        row.segment_seq = seq
+        row.head_hash = head_hash(path, data_end)
+        self.store.commit()
+
+    def _upload_whole(self, path: str, name: str, remote_path: str, work_dir: str, result: Dict) -> None:
+        size = os.path.getsize(path)
+        if name.endswith('.gz'):
+            self.upload(path, remote_path)
+            result['bytes_sent'] += size
+        else:
+            target = os.path.join(work_dir, f"{name}.gz")
+            with open(path, 'rb') as f:
+                self._gzip_range(f, size, target)
+            self.upload(target, remote_path)
+            result['bytes_sent'] += os.path.getsize(target)
+            os.remove(target)
+        result['bytes_read'] += size
+
+    @staticmethod
+    def _last_line_end(f, start: int, end: int) -> int:
+        """Offset just past the last newline in [start, end), scanning backwards."""
+        position = end
+        while position > start:
+            size = min(COPY_CHUNK_SIZE, position - start)
+            f.seek(position - size)
+            index = f.read(size).rfind(b'\n')
+            if index != -1:
+                return position - size + index + 1
+            position -= size
+        return start
+
+    @staticmethod
+    def _gzip_range(f, length: int, target: str) -> None:
+        with open(target, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as gz:
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(COPY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                gz.write(chunk)
+                remaining -= len(chunk)
@@ -0,0 +1,49 @@
+"""Keyset (cursor) pagination helpers for newest-first listings."""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Encode the (timestamp, id) of the last row of a page as an opaque token."""
+    payload = json.dumps([timestamp.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a token from encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def paginate_desc(query: Query, timestamp_column, id_column, cursor: str | None, limit: int) -> Query:
+    """
+    Order newest first by (timestamp, id) and continue after ``cursor``.
+    Seeks on the index instead of skipping rows with OFFSET.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            timestamp_column < timestamp,
+            and_(timestamp_column == timestamp, id_column < row_id),
+        ))
+    return query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit)
+
+
+def next_cursor(rows: list, limit: int, timestamp_attr: str) -> str | None:
+    """Cursor for the page after ``rows``, or None when this was the last page."""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, timestamp_attr), last.id)
@@ -2,22 +2,27 @@ import os
 from datetime import datetime
 from io import BytesIO
 from copy import copy
-import re
 
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib import colors
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from PyPDF2 import PdfReader, PdfWriter
-from html.parser import HTMLParser
-from html import unescape
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, DictionaryObject, FloatObject, NameObject
 
 from app.config import get_settings
+from app.services.html_flowables import HTMLFlowableConverter
+from app.services.template_cache import template_cache
+
+settings = get_settings()
+
+# Resource name of the shared letterhead XObject on every templated page
+TEMPLATE_XOBJECT_NAME = '/DmsTemplate'
 
 # Register Unicode fonts for special characters support
 try:
@@ -112,16 +117,20 @@ class PDFGeneratorService:
         doc.build(elements, onFirstPage=add_footer, onLaterPages=add_footer)
         content_buffer.seek(0)
 
-        # Merge each content page with the template page
-        template_pdf = PdfReader(template_path)
+        # Merge each content page with the (cached, already parsed) template page
         content_pdf = PdfReader(content_buffer)
         output = PdfWriter()
 
-        template_page = template_pdf.pages[0]
-        for page in content_pdf.pages:
-            merged_page = copy(template_page)
-            merged_page.merge_page(page)
-            output.add_page(merged_page)
+        with template_cache.open(template_path) as template_pdf:
+            template_page = template_pdf.pages[0]
+            if settings.template_merge_mode == "copy":
+                # Legacy mode: every page carries its own copy of the template
+                for page in content_pdf.pages:
+                    merged_page = copy(template_page)
+                    merged_page.merge_page(page)
+                    output.add_page(merged_page)
+            else:
+                PDFGeneratorService._stamp_template_xobject(output, template_page, content_pdf.pages)
 
         result_buffer = BytesIO()
         output.write(result_buffer)
@@ -129,6 +138,67 @@ class PDFGeneratorService:
 
         return result_buffer.getvalue()
     
+    @staticmethod
+    def _stamp_template_xobject(output: PdfWriter, template_page, content_pages) -> None:
+        """
+        Embed the template page once as a shared Form XObject and draw it
+        underneath every content page, instead of copying its content stream
+        into each page. Output size and merge time stay flat per page.
+        """
+        contents = template_page.get('/Contents')
+        contents = contents.get_object() if contents is not None else None
+        if contents is None:
+            data = b''
+        elif isinstance(contents, ArrayObject):
+            data = b'\n'.join(stream.get_object().get_data() for stream in contents)
+        else:
+            data = contents.get_data()
+
+        resources = template_page.get('/Resources')
+        resources = resources.get_object().clone(output) if resources is not None else DictionaryObject()
+
+        form = DecodedStreamObject()
+        form.set_data(data)
+        form = form.flate_encode()
+        # flate_encode() returns a fresh stream, so set the form dictionary afterwards
+        form.update({
+            NameObject('/Type'): NameObject('/XObject'),
+            NameObject('/Subtype'): NameObject('/Form'),
+            NameObject('/BBox'): ArrayObject([FloatObject(v) for v in template_page.mediabox]),
+            NameObject('/Resources'): resources,
+        })
+        # PyPDF2 3.0 has no public API to register a standalone indirect object
+        form_ref = output._add_object(form)
+
+        prefix = DecodedStreamObject()
+        prefix.set_data(f'q {TEMPLATE_XOBJECT_NAME} Do Q\n'.encode())
+        prefix_ref = output._add_object(prefix)
+
+        for content_page in content_pages:
+            page = output.add_page(content_page)
+
+            page_resources = page.get('/Resources')
+            if page_resources is None:
+                page_resources = DictionaryObject()
+                page[NameObject('/Resources')] = page_resources
+            page_resources = page_resources.get_object()
+            xobjects = page_resources.get('/XObject')
+            if xobjects is None:
+                xobjects = DictionaryObject()
+                page_resources[NameObject('/XObject')] = xobjects
+            xobjects.get_object()[NameObject(TEMPLATE_XOBJECT_NAME)] = form_ref
+
+            page_contents = page.get('/Contents')
+            if page_contents is None:
+                existing = []
+            elif isinstance(page_contents.get_object(), ArrayObject):
+                existing = list(page_contents.get_object())
+            else:
+                existing = [page_contents]
+            page[NameObject('/Contents')] = ArrayObject([prefix_ref] + existing)
+            # Same page geometry as merge_page, which keeps the template's box
+            page[NameObject('/MediaBox')] = template_page.mediabox
+
     @staticmethod
     def _generate_simple_pdf(
         document_number: str,
@@ -252,153 +322,14 @@ class PDFGeneratorService:
     
     @staticmethod
     def _parse_html(html_content: str, styles) -> list:
-        """Parse HTML and convert to ReportLab flowables."""
-        from bs4 import BeautifulSoup
-        import re
-
-        elements = []
-        
-        # Clean HTML to remove problematic styles while preserving content
-        # Remove only span tags with complex style attributes that cause ReportLab issues
-        html_content = re.sub(r'<span\s+[^>]*style\s*=\s*["\'][^"\']*font-family[^"\']*["\'][^>]*>([^<]*)</span>', r'\1', html_content)
-        html_content = re.sub(r'<span\s+[^>]*>([^<]*)</span>', r'\1', html_content)
-        
-        # Parse HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Define content styles with Times New Roman
-        body_style = ParagraphStyle(
-            'CKBody',
-            parent=styles['BodyText'],
-            fontSize=12,
-            fontName='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Roman',
-            alignment=TA_JUSTIFY,
-            spaceBefore=6,
-            spaceAfter=6,
-            leading=14,
+        """Parse HTML and convert to ReportLab flowables in a single streaming pass."""
+        return HTMLFlowableConverter.convert(
+            html_content,
+            styles,
+            font_name='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Roman',
+            bold_font_name='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Bold',
         )
-        
-        heading_styles = {
-            'h1': ParagraphStyle('CKH1', parent=body_style, fontSize=18, fontName='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Bold', spaceBefore=12, spaceAfter=6),
-            'h2': ParagraphStyle('CKH2', parent=body_style, fontSize=16, fontName='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Bold', spaceBefore=12, spaceAfter=6),
-            'h3': ParagraphStyle('CKH3', parent=body_style, fontSize=14, fontName='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Bold', spaceBefore=12, spaceAfter=6),
-        }
-        
-        # Track processed elements to avoid duplication
-        processed_elements = set()
-        
-        # Process each element
-        for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'ul', 'ol', 'table', 'figure', 'hr', 'br']):
-            if element.name == 'table':
-                # Handle tables
-                table_data = []
-                for row in element.find_all('tr'):
-                    row_data = []
-                    for cell in row.find_all(['td', 'th']):
-                        cell_html = cell.decode_contents().strip() or '&nbsp;'
-                        cell_html = cell_html.replace('<strong>', '<b>').replace('</strong>', '</b>')
-                        cell_html = cell_html.replace('<em>', '<i>').replace('</em>', '</i>')
-                        row_data.append(Paragraph(cell_html, ParagraphStyle('TableCell', parent=body_style, fontSize=10, fontName='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Roman')))
-                        # Mark all descendants as processed
-                        for desc in cell.descendants:
-                            processed_elements.add(id(desc))
-                    if row_data:
-                        table_data.append(row_data)
-                
-                if table_data:
-                    # Create table
-                    t = Table(table_data)
-                    t.setStyle(TableStyle([
-                        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e8e8e8')),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Times-Bold'),
-                        ('FONTNAME', (0, 1), (-1, -1), 'Times-Roman'),
-                        ('FONTSIZE', (0, 0), (-1, -1), 11),
-                        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                        ('TOPPADDING', (0, 0), (-1, -1), 6),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                        ('LEFTPADDING', (0, 0), (-1, -1), 8),
-                        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-                    ]))
-                    elements.append(t)
-                    elements.append(Spacer(1, 0.15 * inch))
-                    processed_elements.add(id(element))
-                    
-            elif element.name in ['h1', 'h2', 'h3']:
-                # Handle headings
-                text = element.get_text(strip=True)
-                if text:
-                    elements.append(Paragraph(text, heading_styles[element.name]))
-                    
-            elif element.name in ['ul', 'ol']:
-                # Handle lists
-                for li in element.find_all('li', recursive=False):
-                    text = li.get_text(strip=True)
-                    if text:
-                        list_style = ParagraphStyle('ListItem', parent=body_style, leftIndent=20, bulletIndent=10)
-                        bullet = '•' if element.name == 'ul' else f'{li.parent.find_all("li").index(li) + 1}.'
-                        elements.append(Paragraph(f"{bullet} {text}", list_style))
-                        
-            elif element.name == 'p':
-                # Skip if already processed (e.g., inside a table)
-                if id(element) in processed_elements:
-                    continue
-                    
-                # Handle paragraphs with inline formatting
-                html_text = str(element)
-                
-                # Skip if contains block elements like tables
-                if element.find(['table', 'ul', 'ol']):
-                    continue
-                text_content = element.get_text(strip=True)
-                if not text_content:
-                    continue
-                
-                # Get inner HTML
-                text = element.decode_contents()
-                
-                # Clean and convert HTML to ReportLab markup
-                text = text.replace('<strong>', '<b>').replace('</strong>', '</b>')
-                text = text.replace('<em>', '<i>').replace('</em>', '</i>')
-                text = text.replace('<u>', '<u>').replace('</u>', '</u>')
-                
-                # Handle alignment - check both style attribute and inline styles
-                para_style = body_style
-                style_attr = element.get('style', '') or ''
-                align_attr = element.get('align', '') or ''
-                
-                # Check for alignment in style attribute or align attribute
-                if 'text-align:center' in style_attr or 'text-align: center' in style_attr or align_attr == 'center':
-                    para_style = ParagraphStyle('Center', parent=body_style, alignment=TA_CENTER)
-                elif 'text-align:right' in style_attr or 'text-align: right' in style_attr or align_attr == 'right':
-                    para_style = ParagraphStyle('Right', parent=body_style, alignment=TA_RIGHT)
-                elif 'text-align:justify' in style_attr or 'text-align: justify' in style_attr or align_attr == 'justify':
-                    para_style = ParagraphStyle('Justify', parent=body_style, alignment=TA_JUSTIFY)
-                elif 'text-align:left' in style_attr or 'text-align: left' in style_attr or align_attr == 'left':
-                    para_style = ParagraphStyle('Left', parent=body_style, alignment=TA_LEFT)
-                
-                if text.strip():
-                    try:
-                        elements.append(Paragraph(text, para_style))
-                    except Exception as e:
-                        # Fallback to plain text if HTML parsing fails
-                        plain_text = element.get_text()
-                        if plain_text.strip():
-                            elements.append(Paragraph(plain_text, para_style))
 
-            elif element.name == 'br':
-                # Handle line breaks
-                elements.append(Spacer(1, 0.1 * inch))
-
-            if element.name in ['figure', 'hr']:
-                classes = ' '.join(element.get('class', []))
-                style = element.get('style', '') or ''
-                if 'page-break' in classes or 'page-break-after' in style:
-                    elements.append(PageBreak())
-        
-        return elements
-    
     @staticmethod
     def save_pdf(pdf_bytes: bytes, file_path: str) -> None:
         """Save PDF bytes to file."""
@@ -0,0 +1,166 @@
+"""Process-pool render engine that keeps PDF generation off the event loop."""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from typing import Dict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import structlog
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+
+class RenderQueueFullError(Exception):
+    """Raised when every render slot (running + queued) is taken."""
+
+
+class RenderTimeoutError(Exception):
+    """Raised when a render does not finish within the configured timeout."""
+
+
+def _init_worker() -> None:
+    """Warm a worker process: importing the generator registers the DejaVu fonts."""
+    from app.services import pdf_generator  # noqa: F401
+
+
+def _render(kwargs: dict) -> tuple:
+    """
+    Render a document inside a worker (or a thread in inline mode).
+    Returns (pid, pdf_bytes, template cache stats of that process).
+    """
+    from app.services.pdf_generator import PDFGeneratorService
+    from app.services.template_cache import template_cache
+
+    pdf_bytes = PDFGeneratorService.generate_document_pdf(**kwargs)
+    return os.getpid(), pdf_bytes, template_cache.stats()
+
+
+class RenderEngine:
+    """
+    Run PDF renders in a pool of warm worker processes.
+
+    At most ``pool_size + queue_size`` renders are admitted at once; further
+    requests fail fast with RenderQueueFullError instead of piling up. A slot is
+    only released when the worker has actually finished, so a render that timed
+    out still counts against the queue until it completes.
+
+    With ``pool_size`` 0, or before ``start()`` is called (e.g. in tests), renders
+    run on a thread pool of the current process with the same limits. The slot is
+    released by the thread pool's own future there too, not by the asyncio
+    future that a timeout cancels while the thread keeps rendering.
+    """
+
+    def __init__(self, pool_size: int, timeout: float, queue_size: int):
+        self.pool_size = max(int(pool_size), 0)
+        self.timeout = float(timeout)
+        self.queue_size = max(int(queue_size), 0)
+        self._slots = threading.BoundedSemaphore(max(self.pool_size, 1) + self.queue_size)
+        self._executor: ProcessPoolExecutor | None = None
+        # Inline mode: one thread per slot, created on first use
+        self._threads: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # Latest template cache stats reported by each worker, keyed by pid
+        self._cache_stats: Dict[int, Dict] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """Start the worker pool and spawn every worker up front."""
+        if self.pool_size <= 0 or self._executor is not None:
+            return
+        with self._lock:
+            self._executor = self._create_executor()
+        # One trivial task per worker forces all processes to spawn and run
+        # their initializer now rather than on the first real request.
+        for future in [self._executor.submit(os.getpid) for _ in range(self.pool_size)]:
+            future.result()
+        logger.info("Render engine started", pool_size=self.pool_size, queue_size=self.queue_size)
+
+    def shutdown(self) -> None:
+        """Stop the worker pool, cancelling renders that have not started yet."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            threads, self._threads = self._threads, None
+        if threads is not None:
+            threads.shutdown(wait=True, cancel_futures=True)
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+            logger.info("Render engine stopped")
+
+    def _inline_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    max_workers=max(self.pool_size, 1) + self.queue_size, thread_name_prefix="render"
+                )
+            return self._threads
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn rather than fork: the parent runs an event loop and other threads
+        return ProcessPoolExecutor(
+            max_workers=self.pool_size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        """Replace a broken pool (e.g. a worker was OOM-killed)."""
+        with self._lock:
+            # Concurrent renders see the same crash; only the first one restarts
+            if self._executor is not broken:
+                return
+            self._executor = self._create_executor()
+            self._cache_stats.clear()
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.warning("Render engine restarted after a worker crash")
+
+    async def render(self, **kwargs) -> bytes:
+        """
+        Render a document and return the PDF bytes.
+        Accepts the keyword arguments of PDFGeneratorService.generate_document_pdf.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise RenderQueueFullError("Render queue is full")
+
+        executor = self._executor
+        try:
+            future = (executor or self._inline_executor()).submit(_render, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            pid, pdf_bytes, cache_stats = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise RenderTimeoutError(f"Render exceeded {self.timeout:g}s")
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+
+        self._cache_stats[pid] = cache_stats
+        return pdf_bytes
+
+    def cache_stats(self) -> Dict:
+        """Template cache counters summed over the processes that rendered."""
+        per_process = list(self._cache_stats.values())
+        totals = {'processes': len(per_process)}
+        for key in ('entries', 'hits', 'misses', 'evictions'):
+            totals[key] = sum(stats[key] for stats in per_process)
+        return totals
+
+
+render_engine = RenderEngine(
+    pool_size=settings.render_pool_size,
+    timeout=settings.render_timeout_seconds,
+    queue_size=settings.render_queue_size,
+)
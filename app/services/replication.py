@@ -0,0 +1,307 @@
+"""Outbox-based replication of newly stored files to remote targets."""
+
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+import structlog
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.session import SessionLocal
+from app.models.replication_outbox import ReplicationOutbox
+from app.services.file_index import FileEntry
+from app.services.sync import NextcloudSync, RemoteSync, SyncService
+from app.services.sync_state import SyncStateStore
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+TARGET_NAMES = ('smb', 'nextcloud', 'local')
+
+
+def configured_targets() -> List[str]:
+    if not settings.replication_enabled:
+        return []
+    names = [name.strip().lower() for name in settings.replication_targets.split(',')]
+    return [name for name in names if name in TARGET_NAMES]
+
+
+class LocalTarget:
+    """Copy files into a local (or mounted) directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @property
+    def destination(self) -> str:
+        return f"local:{os.path.abspath(self.root)}"
+
+    def open(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+
+    def close(self) -> None:
+        pass
+
+    def deliver(self, file_path: str, relative_path: str) -> None:
+        target = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Copy next to the target and rename, so a reader never sees half a file
+        tmp_path = f"{target}.part"
+        shutil.copy2(file_path, tmp_path)
+        os.replace(tmp_path, target)
+
+
+class RemoteTarget:
+    """Upload files with an SMB or Nextcloud sync backend, over one connection per batch."""
+
+    def __init__(self, sync: RemoteSync):
+        self.sync = sync
+
+    @property
+    def destination(self) -> str:
+        return self.sync.destination
+
+    def open(self) -> None:
+        self.sync._connect()
+
+    def close(self) -> None:
+        self.sync._disconnect()
+
+    def deliver(self, file_path: str, relative_path: str) -> None:
+        remote_path = self.sync._remote_path(relative_path)
+        remote_dir = '/'.join(remote_path.split('/')[:-1])
+        if remote_dir not in self.sync.known_dirs:
+            self.sync._ensure_dir(remote_dir)
+            self.sync.known_dirs.add(remote_dir)
+        try:
+            self.sync._upload_file(file_path, remote_path)
+        except Exception:
+            # The directory may have been removed remotely; check it again next time
+            self.sync.known_dirs.discard(remote_dir)
+            raise
+
+
+def build_target(name: str):
+    if name == 'smb':
+        return RemoteTarget(SyncService(
+            smb_host=settings.smb_host,
+            smb_port=settings.smb_port,
+            smb_username=settings.smb_username,
+            smb_password=settings.smb_password,
+            smb_share=settings.smb_share,
+            smb_path=settings.smb_path,
+        ))
+    if name == 'nextcloud':
+        return RemoteTarget(NextcloudSync(
+            url=settings.nextcloud_url,
+            username=settings.nextcloud_username,
+            password=settings.nextcloud_password,
+            base_path=settings.nextcloud_path,
+        ))
+    if name == 'local':
+        return LocalTarget(settings.replication_local_dir)
+    raise ValueError(f"Unknown replication target: {name}")
+
+
+class ReplicationService:
+    @staticmethod
+    def enqueue(db: Session, file_path: str, targets: List[str] | None = None) -> List[ReplicationOutbox]:
+        """
+        Queue a stored file for every configured replication target.
+        Not committed here: the outbox rows are written by the caller's
+        commit, together with the record that references the file.
+        """
+        targets = configured_targets() if targets is None else targets
+        relative_path = os.path.relpath(file_path, settings.storage_dir).replace(os.sep, '/')
+        rows = [
+            ReplicationOutbox(target=target, file_path=file_path, relative_path=relative_path)
+            for target in targets
+        ]
+        db.add_all(rows)
+        return rows
+
+
+class Replicator:
+    """
+    Drain the replication outbox from a background thread.
+
+    Due rows are taken in batches of ``batch_size``, grouped by target and
+    delivered over a single connection per target. A row is claimed before
+    it is delivered by moving its ``next_attempt_at`` ``lease_seconds``
+    ahead, conditional on the value just read, so replicators in several
+    processes never take the same row; a row whose replicator died becomes
+    due again when the lease runs out. A delivered row is
+    deleted and the file is recorded in that destination's sync state, so
+    the next full sync does not upload it again. A failed row is retried
+    with exponential backoff. ``notify()`` wakes the thread right after a
+    commit so new files are usually replicated within a second or two.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval_ms: int = 2000,
+        batch_size: int = 50,
+        retry_backoff_seconds: float = 5.0,
+        max_backoff_seconds: float = 600.0,
+        lease_seconds: float = 300.0,
+        target_factory: Callable[[str], object] = build_target,
+    ):
+        self.session_factory = session_factory
+        self.interval = max(interval_ms, 1) / 1000
+        self.batch_size = max(batch_size, 1)
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.target_factory = target_factory
+        self._targets: Dict[str, object] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.delivered = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replicator", daemon=True)
+        self._thread.start()
+        logger.info("Replicator started", targets=configured_targets())
+
+    def stop(self, timeout: float = 30.0) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Replicator stopped", delivered=self.delivered, failed=self.failed)
+
+    def notify(self) -> None:
+        """Called after committing new outbox rows."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.error("Replication batch failed", error=str(e))
+                processed = 0
+            if processed < self.batch_size:
+                # Caught up: sleep until the next interval or a notify()
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+    def _target(self, name: str):
+        if name not in self._targets:
+            self._targets[name] = self.target_factory(name)
+        return self._targets[name]
+
+    def run_once(self) -> int:
+        """Deliver one batch of due outbox rows. Returns how many rows were processed."""
+        db = self.session_factory()
+        try:
+            rows = self._claim(db)
+            groups: Dict[str, List[ReplicationOutbox]] = {}
+            for row in rows:
+                groups.setdefault(row.target, []).append(row)
+            for name, group in groups.items():
+                self._deliver_group(db, name, group)
+            return len(rows)
+        finally:
+            db.close()
+
+    def _claim(self, db: Session) -> List[ReplicationOutbox]:
+        """Take up to ``batch_size`` due rows, skipping those another replicator claimed first."""
+        now = datetime.utcnow()
+        due = (
+            db.query(ReplicationOutbox.id, ReplicationOutbox.next_attempt_at)
+            .filter(ReplicationOutbox.next_attempt_at <= now)
+            .order_by(ReplicationOutbox.next_attempt_at, ReplicationOutbox.id)
+            .limit(self.batch_size)
+            .all()
+        )
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        claimed = []
+        for row_id, due_at in due:
+            result = db.execute(
+                update(ReplicationOutbox)
+                .where(ReplicationOutbox.id == row_id, ReplicationOutbox.next_attempt_at == due_at)
+                .values(next_attempt_at=lease_until)
+            )
+            if result.rowcount == 1:
+                claimed.append(row_id)
+        db.commit()
+        if not claimed:
+            return []
+        return (
+            db.query(ReplicationOutbox)
+            .filter(ReplicationOutbox.id.in_(claimed))
+            .order_by(ReplicationOutbox.id)
+            .all()
+        )
+
+    def _deliver_group(self, db: Session, name: str, rows: List[ReplicationOutbox]) -> None:
+        delivered: List[FileEntry] = []
+        try:
+            target = self._target(name)
+            target.open()
+        except Exception as e:
+            for row in rows:
+                self._failed(row, e)
+            db.commit()
+            return
+
+        try:
+            for row in rows:
+                if not os.path.exists(row.file_path):
+                    logger.warning("Replication source is gone, dropping", file=row.file_path, target=name)
+                    db.delete(row)
+                    continue
+                try:
+                    target.deliver(row.file_path, row.relative_path)
+                except Exception as e:
+                    self._failed(row, e)
+                    continue
+                st = os.stat(row.file_path)
+                delivered.append(FileEntry(row.relative_path, row.file_path, st.st_size, st.st_mtime_ns))
+                db.delete(row)
+                self.delivered += 1
+        finally:
+            try:
+                target.close()
+            except Exception:
+                pass
+
+        # Also commits the deleted and rescheduled rows
+        SyncStateStore(db, target.destination).record(delivered)
+        db.commit()
+
+    def _failed(self, row: ReplicationOutbox, error: Exception) -> None:
+        row.attempts += 1
+        delay = min(self.retry_backoff_seconds * (2 ** (row.attempts - 1)), self.max_backoff_seconds)
+        row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        row.last_error = str(error)
+        self.failed += 1
+        logger.warning("Replication failed, will retry", file=row.relative_path, target=row.target,
+                       attempts=row.attempts, retry_in=delay, error=str(error))
+
+
+replicator = Replicator(
+    SessionLocal,
+    interval_ms=settings.replication_interval_ms,
+    batch_size=settings.replication_batch_size,
+    retry_backoff_seconds=settings.replication_retry_backoff_seconds,
+    max_backoff_seconds=settings.replication_max_backoff_seconds,
+    lease_seconds=settings.replication_lease_seconds,
+)
@@ -0,0 +1,65 @@
+"""Bring database file references back in line with restored storage."""
+
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.document import Document
+from app.models.document_template import DocumentTemplate
+
+settings = get_settings()
+
+# Rows per bulk UPDATE
+RELINK_BATCH_SIZE = 500
+
+
+class RestoreService:
+    @staticmethod
+    def _relink(db: Session, model, rows, candidates) -> Dict:
+        result = {'checked': 0, 'relinked': 0, 'missing': []}
+        changes: List[Dict] = []
+        for row in rows:
+            result['checked'] += 1
+            if os.path.exists(row.file_path):
+                continue
+            found = next((path for path in candidates(row) if os.path.isfile(path)), None)
+            if found is None:
+                result['missing'].append(row.file_path)
+                continue
+            changes.append({'id': row.id, 'file_path': found})
+            if len(changes) >= RELINK_BATCH_SIZE:
+                db.execute(update(model), changes)
+                result['relinked'] += len(changes)
+                changes = []
+        if changes:
+            db.execute(update(model), changes)
+            result['relinked'] += len(changes)
+        db.commit()
+        return result
+
+    @staticmethod
+    def relink_files(db: Session, storage_dir: Optional[str] = None) -> Dict:
+        """
+        Point documents and templates whose ``file_path`` no longer exists at
+        their file under ``storage_dir``, where a restore put it (a restore
+        onto a new server or mount point changes the absolute paths).
+        References that cannot be found are reported, not changed.
+        """
+        storage_dir = os.path.abspath(storage_dir or settings.storage_dir)
+        documents = RestoreService._relink(
+            db, Document,
+            db.query(Document.id, Document.file_path, Document.file_name).order_by(Document.id),
+            lambda row: [
+                os.path.join(storage_dir, row.file_name),
+                os.path.join(storage_dir, os.path.basename(row.file_path)),
+            ],
+        )
+        templates = RestoreService._relink(
+            db, DocumentTemplate,
+            db.query(DocumentTemplate.id, DocumentTemplate.file_path).order_by(DocumentTemplate.id),
+            lambda row: [os.path.join(storage_dir, 'templates', os.path.basename(row.file_path))],
+        )
+        return {'documents': documents, 'templates': templates}
@@ -0,0 +1,234 @@
+"""Full-text document search over number, title and rendered body text."""
+
+import re
+from html import unescape
+from html.parser import HTMLParser
+from typing import List
+
+import structlog
+from PyPDF2 import PdfReader
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session
+
+from app.models.document import Document
+from app.models.document_search import DocumentSearchIndex
+
+logger = structlog.get_logger()
+
+# Column weights for ranking: a hit in the document number or title matters
+# more than one somewhere in the body
+NUMBER_WEIGHT = 10.0
+TITLE_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+# LIKE wildcards (and the escape character itself) in user input
+LIKE_ESCAPE_RE = re.compile(r"[!%_]")
+
+
+class _TextExtractor(HTMLParser):
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'hr'}
+    SKIP_TAGS = {'script', 'style', 'head', 'title'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip = max(self._skip - 1, 0)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Plain text of an HTML fragment, one line per block."""
+    if not html:
+        return ''
+    if '<' not in html:
+        return unescape(html).strip()
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    lines = (' '.join(line.split()) for line in ''.join(extractor.parts).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def search_terms(query: str) -> List[str]:
+    return TERM_RE.findall(query or '')
+
+
+class SearchService:
+    @staticmethod
+    def index_document(db: Session, document: Document, body_text: str) -> DocumentSearchIndex:
+        """
+        Add or refresh the search entry of a document.
+        Not committed here: it is written by the caller's commit, together
+        with the document itself.
+        """
+        entry = DocumentSearchIndex(
+            document_id=document.id,
+            document_number=document.document_number,
+            title=document.title,
+            body=body_text or '',
+        )
+        return db.merge(entry)
+
+    @staticmethod
+    def search(
+        db: Session,
+        query: str | None,
+        user_id: int | None = None,
+        skip: int = 0,
+        limit: int = 50,
+        document_number: str | None = None,
+        title: str | None = None,
+    ) -> List[int]:
+        """
+        Document ids matching every term of ``query`` (as a prefix), best
+        match first. Uses FTS5 on SQLite and a FULLTEXT index on MySQL, and
+        falls back to LIKE on other databases. ``title`` keeps documents whose
+        title has every one of its terms (as a prefix), through the same
+        full-text index; ``document_number`` keeps numbers starting with it.
+        Both are applied in the same query, before ranking and paging.
+        """
+        terms = search_terms(query)
+        title_terms = search_terms(title)
+        if not terms and not title_terms:
+            return []
+
+        filters = {'user_id': user_id, 'document_number': document_number}
+        dialect = db.get_bind().dialect.name
+        if dialect == 'sqlite':
+            return SearchService._search_sqlite(db, terms, title_terms, filters, skip, limit)
+        if dialect in ('mysql', 'mariadb'):
+            return SearchService._search_mysql(db, terms, title_terms, filters, skip, limit)
+        return SearchService._search_like(db, terms, title_terms, filters, skip, limit)
+
+    @staticmethod
+    def _filter_sql(documents: str, filters: dict, params: dict) -> str:
+        """``AND`` conditions on the ``documents`` table (as named in the query) for the set filters."""
+        sql = ''
+        if filters['user_id']:
+            sql += f" AND {documents}.requested_by_id = :user_id"
+            params['user_id'] = filters['user_id']
+        if filters['document_number']:
+            # A prefix pattern, so the index on document_number can be used
+            sql += f" AND {documents}.document_number LIKE :document_number ESCAPE '!'"
+            params['document_number'] = LIKE_ESCAPE_RE.sub(r'!\g<0>', filters['document_number']) + '%'
+        return sql
+
+    @staticmethod
+    def _search_sqlite(
+        db: Session, terms: List[str], title_terms: List[str], filters: dict, skip: int, limit: int
+    ) -> List[int]:
+        # Quoted prefix terms are ANDed; quoting keeps FTS5 operators in user
+        # input from being interpreted
+        def phrases(words):
+            return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+        match = [phrases(terms)] if terms else []
+        if title_terms:
+            match.append(f"title : ({phrases(title_terms)})")
+        # FTS5 only accepts the table name (not an alias) in MATCH and bm25()
+        sql = (
+            "SELECT document_search_fts.rowid FROM document_search_fts "
+            "JOIN documents ON documents.id = document_search_fts.rowid "
+            "WHERE document_search_fts MATCH :match"
+        )
+        params = {'match': ' AND '.join(match), 'limit': limit, 'skip': skip}
+        sql += SearchService._filter_sql('documents', filters, params)
+        sql += (
+            f" ORDER BY bm25(document_search_fts, {NUMBER_WEIGHT}, {TITLE_WEIGHT}, {BODY_WEIGHT}),"
+            " documents.id DESC LIMIT :limit OFFSET :skip"
+        )
+        return [row[0] for row in db.execute(text(sql), params)]
+
+    @staticmethod
+    def _search_mysql(
+        db: Session, terms: List[str], title_terms: List[str], filters: dict, skip: int, limit: int
+    ) -> List[int]:
+        params = {'limit': limit, 'skip': skip}
+        matches = []
+        if terms:
+            matches.append("MATCH(s.document_number, s.title, s.body) AGAINST (:against IN BOOLEAN MODE)")
+            params['against'] = ' '.join(f'+{term}*' for term in terms)
+        if title_terms:
+            matches.append("MATCH(s.title) AGAINST (:title_against IN BOOLEAN MODE)")
+            params['title_against'] = ' '.join(f'+{term}*' for term in title_terms)
+        sql = (
+            f"SELECT s.document_id, {matches[0]} AS score "
+            "FROM document_search s JOIN documents d ON d.id = s.document_id "
+            f"WHERE {' AND '.join(matches)}"
+        )
+        sql += SearchService._filter_sql('d', filters, params)
+        sql += " ORDER BY score DESC, s.document_id DESC LIMIT :limit OFFSET :skip"
+        return [row[0] for row in db.execute(text(sql), params)]
+
+    @staticmethod
+    def _search_like(
+        db: Session, terms: List[str], title_terms: List[str], filters: dict, skip: int, limit: int
+    ) -> List[int]:
+        query = db.query(DocumentSearchIndex.document_id).join(
+            Document, Document.id == DocumentSearchIndex.document_id
+        )
+        for term in terms:
+            pattern = f"%{term}%"
+            query = query.filter(or_(
+                DocumentSearchIndex.document_number.ilike(pattern),
+                DocumentSearchIndex.title.ilike(pattern),
+                DocumentSearchIndex.body.ilike(pattern),
+            ))
+        for term in title_terms:
+            query = query.filter(DocumentSearchIndex.title.ilike(f"%{term}%"))
+        if filters['user_id']:
+            query = query.filter(Document.requested_by_id == filters['user_id'])
+        if filters['document_number']:
+            query = query.filter(Document.document_number.startswith(filters['document_number'], autoescape=True))
+        query = query.order_by(DocumentSearchIndex.document_id.desc())
+        return [row[0] for row in query.offset(skip).limit(limit)]
+
+    @staticmethod
+    def extract_pdf_text(file_path: str) -> str:
+        reader = PdfReader(file_path)
+        return '\n'.join(page.extract_text() or '' for page in reader.pages).strip()
+
+    @staticmethod
+    def reindex_missing(db: Session, batch_size: int = 100) -> int:
+        """
+        Index documents that have no search entry yet (e.g. created before
+        search existed), using the text of their stored PDF.
+        """
+        indexed = 0
+        while True:
+            documents = (
+                db.query(Document)
+                .outerjoin(DocumentSearchIndex, DocumentSearchIndex.document_id == Document.id)
+                .filter(DocumentSearchIndex.document_id.is_(None))
+                .order_by(Document.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not documents:
+                return indexed
+            for document in documents:
+                body = ''
+                try:
+                    body = SearchService.extract_pdf_text(document.file_path)
+                except Exception as e:
+                    # Still index number and title, so the row is not retried forever
+                    logger.warning("Could not extract PDF text", document_id=document.id, error=str(e))
+                SearchService.index_document(db, document, body)
+                indexed += 1
+            db.commit()
@@ -1,12 +1,28 @@
 """SMB/NAS and Nextcloud sync service for syncing documents and logs."""
 
+import copy
 import os
+import queue
+import re
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, List, Tuple
 import mimetypes
 
+import structlog
+
+from app.config import get_settings
+from app.models.sync_state import SyncState
+from app.services.file_copy import copy_file
+from app.services.file_index import FileEntry, file_sha256, scan_tree
+from app.services.log_sync import LogShipper, LogSyncStateStore
+from app.services.nextcloud_chunked import ChunkedUploader
+from app.services.sync_state import SyncPlan, SyncStateStore
+from app.services.throttle import BandwidthSchedule, Throttle, ThrottledReader
+
 try:
     from smb.SMBConnection import SMBConnection
     from smb.smb_structs import OperationFailure
@@ -21,12 +37,504 @@ except ImportError:
     HAS_WEBDAV = False
 
 
-class SyncService:
+settings = get_settings()
+logger = structlog.get_logger()
+
+# Synced files are recorded in the state store in batches of this size, so an
+# interrupted run keeps the progress it made
+STATE_RECORD_BATCH = 200
+# Called with (files done, files total) as a sync progresses
+ProgressCallback = Callable[[int, int], None]
+# Log aggregated upload progress every this many files
+PROGRESS_LOG_EVERY = 100
+
+
+class RemoteSync:
+    """
+    Incremental document sync shared by the SMB and Nextcloud backends.
+
+    Each run scans the source tree, compares it with the destination's
+    recorded state (when a SyncStateStore is given) and uploads only new or
+    changed files. Uploads run on a pool of ``workers`` threads, each with
+    its own connection, and a failed file is retried with exponential
+    backoff on a fresh connection. Subclasses provide the connection and the
+    per-file upload.
+
+    Uploads are paced by ``bandwidth`` (a BandwidthSchedule spec such as
+    ``"08:00-18:00=2M; unlimited"``), shared by all connections of a run.
+
+    State of files removed locally is dropped, unless a run would drop more
+    than ``max_forget_fraction`` of it: an empty or unmounted source looks
+    exactly like that, and without the state nothing could be restored.
+    Such a run keeps the state and reports failure.
+    """
+
+    workers: int = settings.sync_workers
+    retry_attempts: int = settings.sync_retry_attempts
+    retry_backoff_seconds: float = settings.sync_retry_backoff_seconds
+    max_forget_fraction: float = settings.sync_max_forget_fraction
+    bandwidth: str = settings.sync_bandwidth_limit
+
+    @property
+    def destination(self) -> str:
+        """Key of this destination in the sync state table."""
+        raise NotImplementedError
+
+    def _connect(self) -> bool:
+        raise NotImplementedError
+
+    def _disconnect(self) -> None:
+        pass
+
+    def _remote_path(self, relative_path: str) -> str:
+        raise NotImplementedError
+
+    def _ensure_dir(self, remote_dir: str) -> None:
+        raise NotImplementedError
+
+    def _upload_file(self, local_path: str, remote_path: str) -> None:
+        raise NotImplementedError
+
+    def _download_file(self, remote_path: str, local_path: str) -> None:
+        raise NotImplementedError
+
+    def _list_subdirs(self, remote_dir: str) -> set:
+        """Names of the directories directly under ``remote_dir``."""
+        raise NotImplementedError
+
+    def _make_dir(self, remote_dir: str) -> None:
+        raise NotImplementedError
+
+    @property
+    def known_dirs(self) -> set:
+        """Remote directories known to exist, kept for the lifetime of the instance."""
+        if '_known_dirs' not in self.__dict__:
+            self._known_dirs = set()
+        return self._known_dirs
+
+    @property
+    def throttle(self) -> Optional[Throttle]:
+        """Bandwidth limiter of this destination, or None when uploads are unlimited."""
+        if '_throttle' not in self.__dict__:
+            schedule = BandwidthSchedule.parse(self.bandwidth)
+            self._throttle = Throttle(schedule) if schedule.limited else None
+        return self._throttle
+
+    def _throttled(self, fileobj):
+        throttle = self.throttle
+        return ThrottledReader(fileobj, throttle) if throttle else fileobj
+
+    @staticmethod
+    def plan_directories(remote_paths: List[str]) -> List[str]:
+        """
+        Every directory the given remote files live in, including all
+        ancestors, ordered so that parents come before their children.
+        """
+        dirs = set()
+        for remote_path in remote_paths:
+            parts = [p for p in remote_path.split('/')[:-1] if p]
+            for depth in range(1, len(parts) + 1):
+                dirs.add('/' + '/'.join(parts[:depth]))
+        return sorted(dirs, key=lambda d: (d.count('/'), d))
+
+    def _prepare_directories(self, worker: "RemoteSync", remote_paths: List[str]) -> None:
+        """
+        Create the remote directory tree for a run before any upload starts.
+        Each parent that already existed is listed once and missing
+        directories are created, so the cost is one round-trip per directory
+        instead of one probe per path component per file. Directories that
+        cannot be prepared here are left to the per-file fallback.
+        """
+        known = self.known_dirs
+        listings: Dict[str, set] = {}
+        for remote_dir in self.plan_directories(remote_paths):
+            if remote_dir in known:
+                continue
+            parent, name = remote_dir.rsplit('/', 1)
+            parent = parent or '/'
+            try:
+                if parent not in listings:
+                    listings[parent] = worker._list_subdirs(parent)
+                if name not in listings[parent]:
+                    worker._make_dir(remote_dir)
+                    # Just created, so it has no subdirectories yet
+                    listings[remote_dir] = set()
+                known.add(remote_dir)
+            except Exception as e:
+                logger.warning("Could not prepare remote directory", directory=remote_dir, error=str(e))
+
+    def _file_log(self, entry: FileEntry, remote_path: str) -> Dict:
+        return {
+            'name': os.path.basename(entry.relative_path),
+            'path': entry.relative_path,
+            'size': entry.size
+        }
+
+    def _open_worker(self) -> "RemoteSync":
+        """A copy of this destination with its own connection."""
+        # Created before copying so every connection shares the same limit
+        self.throttle
+        worker = copy.copy(self)
+        worker._connect()
+        return worker
+
+    def _with_retry(self, workers: "queue.Queue[RemoteSync]", relative_path: str,
+                    transfer: Callable[["RemoteSync"], None]) -> int:
+        """
+        Run ``transfer(worker)`` on a connection borrowed from the pool,
+        retrying with exponential backoff. Returns the retries used; raises
+        the last error once the attempts are exhausted.
+        """
+        worker = workers.get()
+        try:
+            attempts = max(self.retry_attempts, 1)
+            for attempt in range(attempts):
+                try:
+                    if attempt:
+                        # The connection may be what failed: start over on a new one
+                        worker._disconnect()
+                        worker._connect()
+                    transfer(worker)
+                    return attempt
+                except Exception as e:
+                    if attempt + 1 >= attempts:
+                        raise
+                    delay = self.retry_backoff_seconds * (2 ** attempt)
+                    logger.warning("Sync transfer failed, retrying", file=relative_path,
+                                   attempt=attempt + 1, delay=delay, error=str(e))
+                    time.sleep(delay)
+        finally:
+            workers.put(worker)
+
+    def _upload_with_retry(self, workers: "queue.Queue[RemoteSync]", entry: FileEntry) -> Tuple[str, int]:
+        """Upload one file on a pooled connection. Returns (remote_path, retries used)."""
+        remote_path = self._remote_path(entry.relative_path)
+        remote_dir = '/'.join(remote_path.split('/')[:-1])
+
+        def upload(worker: "RemoteSync") -> None:
+            if remote_dir not in self.known_dirs:
+                worker._ensure_dir(remote_dir)
+                self.known_dirs.add(remote_dir)
+            worker._upload_file(entry.path, remote_path)
+
+        return remote_path, self._with_retry(workers, entry.relative_path, upload)
+
+    def _open_pool(self, count: int) -> Tuple["queue.Queue[RemoteSync]", List["RemoteSync"]]:
+        """
+        Open ``count`` connections up front: a bad configuration fails the
+        run immediately instead of once per file.
+        """
+        pool: "queue.Queue[RemoteSync]" = queue.Queue()
+        opened: List[RemoteSync] = []
+        try:
+            for _ in range(count):
+                worker = self._open_worker()
+                opened.append(worker)
+                pool.put(worker)
+        except Exception:
+            self._close_pool(opened)
+            raise
+        return pool, opened
+
+    @staticmethod
+    def _close_pool(opened: List["RemoteSync"]) -> None:
+        for worker in opened:
+            try:
+                worker._disconnect()
+            except Exception:
+                pass
+
+    def plan_documents(self, source_dir: str, state_store: Optional[SyncStateStore] = None,
+                       full: bool = False) -> SyncPlan:
+        """Diff the source tree against the recorded state, without touching the destination."""
+        entries = scan_tree(source_dir)
+        if state_store is None:
+            return SyncPlan.everything(entries)
+        return state_store.plan(entries, full=full)
+
+    def sync_documents(self, source_dir: str, state_store: Optional[SyncStateStore] = None,
+                       dry_run: bool = False, full: bool = False,
+                       progress: Optional[ProgressCallback] = None) -> Dict:
+        """
+        Upload new and changed documents.
+        With ``dry_run`` only the plan is returned; ``full`` uploads every
+        file regardless of the recorded state.
+        """
+        if not os.path.exists(source_dir):
+            return {'success': False, 'message': f'Source directory not found: {source_dir}'}
+        
+        plan = self.plan_documents(source_dir, state_store, full=full)
+        if dry_run:
+            return {
+                'success': True,
+                'message': f"Dry run: {len(plan.upload)} files would be synced",
+                'plan': plan.summary(include_files=True)
+            }
+        
+        sync_log = {
+            'timestamp': datetime.now().isoformat(),
+            'files_synced': 0,
+            'files_failed': 0,
+            'files_skipped': plan.unchanged + len(plan.touched),
+            'bytes_synced': 0,
+            'retries': 0,
+            'workers': 0,
+            'plan': plan.summary(),
+            'files': [],
+            'errors': []
+        }
+        started = time.monotonic()
+        
+        if plan.upload:
+            self._upload_parallel(plan, state_store, sync_log, progress)
+        
+        held = 0
+        if state_store is not None:
+            state_store.record([entry for entry, _ in plan.touched], plan.hashes)
+            if len(plan.removed) > self.max_forget_fraction * plan.recorded:
+                held = len(plan.removed)
+                sync_log['removals_held'] = held
+                logger.warning("Most synced files are missing locally, keeping their sync state",
+                               destination=self.destination, missing=held, recorded=plan.recorded,
+                               source=source_dir)
+            else:
+                state_store.forget(plan.removed)
+        
+        elapsed = time.monotonic() - started
+        sync_log['duration_seconds'] = round(elapsed, 3)
+        sync_log['bytes_per_second'] = int(sync_log['bytes_synced'] / elapsed) if elapsed > 0 else 0
+        if self.throttle:
+            sync_log['throttle'] = self.throttle.stats()
+        
+        if held:
+            return {
+                'success': False,
+                'message': (f"{held} of {plan.recorded} synced files are missing from {source_dir}; "
+                            f"their sync state was kept. Check that the storage is mounted."),
+                'log': sync_log
+            }
+        return {
+            'success': True,
+            'message': f"Synced {sync_log['files_synced']} files, {sync_log['files_skipped']} unchanged",
+            'log': sync_log
+        }
+
+    def _upload_parallel(self, plan: SyncPlan, state_store: Optional[SyncStateStore], sync_log: Dict,
+                         progress: Optional[ProgressCallback] = None) -> None:
+        worker_count = max(1, min(self.workers, len(plan.upload)))
+        pool, opened = self._open_pool(worker_count)
+        try:
+            sync_log['workers'] = worker_count
+            
+            self._prepare_directories(
+                opened[0], [self._remote_path(entry.relative_path) for entry, _ in plan.upload]
+            )
+            
+            # Results are handled on this thread: the state store's session
+            # is not shared with the upload threads
+            synced: List[FileEntry] = []
+            with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="sync-upload") as executor:
+                futures = {
+                    executor.submit(self._upload_with_retry, pool, entry): entry
+                    for entry, _ in plan.upload
+                }
+                for done, future in enumerate(as_completed(futures), start=1):
+                    entry = futures[future]
+                    try:
+                        remote_path, retries = future.result()
+                        sync_log['files_synced'] += 1
+                        sync_log['bytes_synced'] += entry.size
+                        sync_log['retries'] += retries
+                        sync_log['files'].append(self._file_log(entry, remote_path))
+                        synced.append(entry)
+                    except Exception as e:
+                        sync_log['retries'] += max(self.retry_attempts, 1) - 1
+                        sync_log['files_failed'] += 1
+                        sync_log['errors'].append({
+                            'file': entry.relative_path,
+                            'error': str(e)
+                        })
+                    
+                    if state_store is not None and len(synced) >= STATE_RECORD_BATCH:
+                        state_store.record(synced, plan.hashes)
+                        synced = []
+                    if progress:
+                        progress(done, len(futures))
+                    if done % PROGRESS_LOG_EVERY == 0:
+                        logger.info("Sync progress", destination=self.destination, done=done,
+                                    total=len(futures), failed=sync_log['files_failed'],
+                                    bytes=sync_log['bytes_synced'])
+            
+            if state_store is not None:
+                state_store.record(synced, plan.hashes)
+        finally:
+            self._close_pool(opened)
+
+
+    def sync_logs(self, log_dir: str, state_store: LogSyncStateStore) -> Dict:
+        """
+        Ship application logs under ``<base>/logs``: only bytes appended
+        since the last run, as gzip segments, and each rotated file once.
+        """
+        if not os.path.isdir(log_dir):
+            return {'success': False, 'message': f'Log directory not found: {log_dir}'}
+        
+        self._connect()
+        try:
+            def upload(local_path: str, relative_path: str) -> None:
+                remote_path = self._remote_path(f"logs/{relative_path}")
+                remote_dir = '/'.join(remote_path.split('/')[:-1])
+                if remote_dir not in self.known_dirs:
+                    self._ensure_dir(remote_dir)
+                    self.known_dirs.add(remote_dir)
+                self._upload_file(local_path, remote_path)
+            
+            log = LogShipper(state_store, upload).ship(log_dir)
+        finally:
+            self._disconnect()
+        
+        return {
+            'success': not log['errors'],
+            'message': f"Shipped {len(log['segments'])} log segments and {len(log['rotated'])} rotated logs",
+            'log': log
+        }
+
+    def restore_documents(self, target_dir: str, state_store: SyncStateStore, overwrite: bool = False,
+                          progress: Optional[ProgressCallback] = None) -> Dict:
+        """
+        Pull the files recorded in this destination's sync state back into
+        ``target_dir``, over the same pool of connections as uploads.
+
+        Each download goes to a hidden temporary file, is checked against
+        the recorded size and SHA-256 and only then renamed into place with
+        its recorded mtime. A file already on disk with the recorded size
+        and mtime (or content) counts as restored, so an interrupted restore
+        picks up where it stopped. A local file that differs from the
+        recorded state is left alone and reported, unless ``overwrite``.
+        """
+        state = state_store.load()
+        if not state:
+            return {'success': False, 'message': f'No sync state recorded for {self.destination}'}
+        
+        restore_log = {
+            'timestamp': datetime.now().isoformat(),
+            'files_restored': 0,
+            'files_present': 0,
+            'files_failed': 0,
+            'bytes_restored': 0,
+            'retries': 0,
+            'workers': 0,
+            'conflicts': [],
+            'errors': []
+        }
+        started = time.monotonic()
+        
+        target_root = os.path.abspath(target_dir)
+        pending: List[Tuple[SyncState, str]] = []
+        for relative_path in sorted(state):
+            row = state[relative_path]
+            local_path = os.path.normpath(os.path.join(target_root, relative_path))
+            if not local_path.startswith(target_root + os.sep):
+                restore_log['files_failed'] += 1
+                restore_log['errors'].append({'file': relative_path, 'error': 'Path outside the target directory'})
+                continue
+            status = self._local_status(row, local_path)
+            if status == 'present':
+                restore_log['files_present'] += 1
+            elif status == 'differs' and not overwrite:
+                restore_log['conflicts'].append(relative_path)
+            else:
+                pending.append((row, local_path))
+        
+        if pending:
+            worker_count = max(1, min(self.workers, len(pending)))
+            pool, opened = self._open_pool(worker_count)
+            restore_log['workers'] = worker_count
+            try:
+                with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="sync-restore") as executor:
+                    futures = {
+                        executor.submit(self._with_retry, pool, row.path,
+                                        lambda worker, row=row, local_path=local_path:
+                                        self._download_verified(worker, row, local_path)): row
+                        for row, local_path in pending
+                    }
+                    for done, future in enumerate(as_completed(futures), start=1):
+                        row = futures[future]
+                        try:
+                            restore_log['retries'] += future.result()
+                            restore_log['files_restored'] += 1
+                            restore_log['bytes_restored'] += row.size
+                        except Exception as e:
+                            restore_log['files_failed'] += 1
+                            restore_log['errors'].append({'file': row.path, 'error': str(e)})
+                        if progress:
+                            progress(done, len(futures))
+                        if done % PROGRESS_LOG_EVERY == 0:
+                            logger.info("Restore progress", destination=self.destination, done=done,
+                                        total=len(futures), failed=restore_log['files_failed'])
+            finally:
+                self._close_pool(opened)
+        
+        elapsed = time.monotonic() - started
+        restore_log['duration_seconds'] = round(elapsed, 3)
+        restore_log['bytes_per_second'] = int(restore_log['bytes_restored'] / elapsed) if elapsed > 0 else 0
+        logger.info("Restore finished", destination=self.destination, restored=restore_log['files_restored'],
+                    present=restore_log['files_present'], failed=restore_log['files_failed'],
+                    conflicts=len(restore_log['conflicts']))
+        
+        return {
+            'success': restore_log['files_failed'] == 0,
+            'message': f"Restored {restore_log['files_restored']} files, "
+                       f"{restore_log['files_present']} already present, "
+                       f"{len(restore_log['conflicts'])} conflicts, {restore_log['files_failed']} failed",
+            'log': restore_log
+        }
+
+    @staticmethod
+    def _local_status(row: SyncState, local_path: str) -> str:
+        try:
+            st = os.stat(local_path)
+        except FileNotFoundError:
+            return 'missing'
+        if st.st_size == row.size and st.st_mtime_ns == row.mtime_ns:
+            return 'present'
+        if st.st_size == row.size and row.content_hash and file_sha256(local_path) == row.content_hash:
+            os.utime(local_path, ns=(row.mtime_ns, row.mtime_ns))
+            return 'present'
+        return 'differs'
+
+    def _download_verified(self, worker: "RemoteSync", row: SyncState, local_path: str) -> None:
+        directory, name = os.path.split(local_path)
+        os.makedirs(directory, exist_ok=True)
+        # Hidden, so a sync running meanwhile does not pick it up
+        tmp_path = os.path.join(directory, f".{name}.restore")
+        try:
+            worker._download_file(self._remote_path(row.path), tmp_path)
+            size = os.path.getsize(tmp_path)
+            if size != row.size:
+                raise ValueError(f"Size mismatch: expected {row.size} bytes, got {size}")
+            if row.content_hash and file_sha256(tmp_path) != row.content_hash:
+                raise ValueError("Checksum mismatch")
+            os.utime(tmp_path, ns=(row.mtime_ns, row.mtime_ns))
+            os.replace(tmp_path, local_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class SyncService(RemoteSync):
     """Handle sync to SMB/NAS shares."""
     
+    bandwidth: str = settings.smb_bandwidth_limit or settings.sync_bandwidth_limit
+    
     def __init__(self, smb_host: str, smb_port: int, smb_username: str, 
-                 smb_password: str, smb_share: str, smb_path: str):
+                 smb_password: str, smb_share: str, smb_path: str, workers: Optional[int] = None,
+                 bandwidth: Optional[str] = None):
         """Initialize SMB connection parameters."""
+        if workers:
+            self.workers = workers
+        if bandwidth:
+            self.bandwidth = bandwidth
         self.smb_host = str(smb_host).strip() if smb_host else ""
         self.smb_port = int(smb_port) if smb_port else 445
         self.smb_username = str(smb_username).strip() if smb_username else ""
@@ -76,66 +584,32 @@ class SyncService:
             except:
                 pass
     
-    def sync_documents(self, source_dir: str) -> Dict:
-        """Sync documents to SMB share."""
-        if not self._connect():
-            return {'success': False, 'message': 'Failed to connect to SMB'}
-        
-        try:
-            sync_log = {
-                'timestamp': datetime.now().isoformat(),
-                'files_synced': 0,
-                'files_failed': 0,
-                'files': [],
-                'errors': []
-            }
-            
-            if not os.path.exists(source_dir):
-                return {'success': False, 'message': f'Source directory not found: {source_dir}'}
-            
-            for root, dirs, files in os.walk(source_dir):
-                for file in files:
-                    if file.startswith('.'):
-                        continue
-                    
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, source_dir)
-                    smb_target = f"{self.smb_path}/{relative_path}".replace('\\', '/')
-                    smb_dir = '/'.join(smb_target.split('/')[:-1])
-                    
-                    try:
-                        # Create directory structure on SMB
-                        self._create_smb_dir(smb_dir)
-                        
-                        # Upload file
-                        with open(file_path, 'rb') as f:
-                            self.connection.storeFile(
-                                self.smb_share,
-                                smb_target,
-                                f
-                            )
-                        
-                        sync_log['files_synced'] += 1
-                        sync_log['files'].append({
-                            'name': file,
-                            'path': relative_path,
-                            'size': os.path.getsize(file_path)
-                        })
-                    except Exception as e:
-                        sync_log['files_failed'] += 1
-                        sync_log['errors'].append({
-                            'file': relative_path,
-                            'error': str(e)
-                        })
-            
-            return {
-                'success': True,
-                'message': f"Synced {sync_log['files_synced']} files",
-                'log': sync_log
-            }
-        
-        finally:
-            self._disconnect()
+    @property
+    def destination(self) -> str:
+        return f"smb://{self.smb_host}/{self.smb_share}/{self.smb_path.strip('/')}"
+    
+    def _remote_path(self, relative_path: str) -> str:
+        return f"{self.smb_path}/{relative_path}".replace('\\', '/')
+    
+    def _ensure_dir(self, remote_dir: str) -> None:
+        self._create_smb_dir(remote_dir)
+    
+    def _upload_file(self, local_path: str, remote_path: str) -> None:
+        with open(local_path, 'rb') as f:
+            self.connection.storeFile(self.smb_share, remote_path, self._throttled(f))
+    
+    def _download_file(self, remote_path: str, local_path: str) -> None:
+        with open(local_path, 'wb') as f:
+            self.connection.retrieveFile(self.smb_share, remote_path, f)
+    
+    def _list_subdirs(self, remote_dir: str) -> set:
+        return {
+            item.filename for item in self.connection.listPath(self.smb_share, remote_dir)
+            if item.isDirectory and item.filename not in ('.', '..')
+        }
+    
+    def _make_dir(self, remote_dir: str) -> None:
+        self.connection.createDirectory(self.smb_share, remote_dir)
     
     def _create_smb_dir(self, smb_path: str) -> None:
         """Create directory structure on SMB share."""
@@ -155,40 +629,6 @@ class SyncService:
             except Exception as e:
                 raise Exception(f"Failed to create SMB directory {current_path}: {str(e)}")
     
-    def sync_logs(self, log_file: str) -> Dict:
-        """Sync log file to SMB share."""
-        if not self._connect():
-            return {'success': False, 'message': 'Failed to connect to SMB'}
-        
-        try:
-            if not os.path.exists(log_file):
-                return {'success': False, 'message': f'Log file not found: {log_file}'}
-            
-            # Create logs directory on SMB
-            logs_smb_path = f"{self.smb_path}/logs"
-            self._create_smb_dir(logs_smb_path)
-            
-            # Copy log with timestamp
-            log_filename = os.path.basename(log_file)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            target_name = f"{log_filename.replace('.log', '')}_{timestamp}.log"
-            smb_target = f"{logs_smb_path}/{target_name}"
-            
-            with open(log_file, 'rb') as f:
-                self.connection.storeFile(self.smb_share, smb_target, f)
-            
-            return {
-                'success': True,
-                'message': f"Log synced: {target_name}",
-                'file': {
-                    'name': target_name,
-                    'size': os.path.getsize(log_file)
-                }
-            }
-        
-        finally:
-            self._disconnect()
-    
     def verify_connection(self) -> Dict:
         """Test SMB connection."""
         try:
@@ -229,16 +669,34 @@ class SyncService:
 class LocalBackupSync:
     """Local backup sync without SMB (file copy)."""
     
+    # Snapshot directories are named after their start time
+    SNAPSHOT_NAME_FORMAT = '%Y%m%d_%H%M%S'
+    SNAPSHOT_NAME_PATTERN = re.compile(r'^\d{8}_\d{6}(_\d+)?$')
+    
+    @staticmethod
+    def _unchanged(entry: FileEntry, path: str) -> bool:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return st.st_size == entry.size and st.st_mtime_ns == entry.mtime_ns
+    
     @staticmethod
-    def sync_to_local(source_dir: str, target_dir: str) -> Dict:
-        """Sync documents to local directory."""
+    def sync_to_local(source_dir: str, target_dir: str, progress: Optional[ProgressCallback] = None) -> Dict:
+        """
+        Mirror ``source_dir`` into ``target_dir``. Like rsync, files whose
+        size and mtime already match the copy in the target are skipped.
+        """
         try:
             os.makedirs(target_dir, exist_ok=True)
             
             sync_log = {
                 'timestamp': datetime.now().isoformat(),
                 'files_synced': 0,
+                'files_skipped': 0,
                 'files_failed': 0,
+                'bytes_copied': 0,
+                'copy_methods': {},
                 'files': [],
                 'errors': []
             }
@@ -246,51 +704,201 @@ class LocalBackupSync:
             if not os.path.exists(source_dir):
                 return {'success': False, 'message': f'Source directory not found: {source_dir}'}
             
-            for root, dirs, files in os.walk(source_dir):
-                for file in files:
-                    if file.startswith('.'):
-                        continue
-                    
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, source_dir)
-                    target_path = os.path.join(target_dir, relative_path)
-                    
-                    try:
+            entries = scan_tree(source_dir)
+            for done, relative_path in enumerate(sorted(entries), start=1):
+                entry = entries[relative_path]
+                target_path = os.path.join(target_dir, relative_path)
+                
+                try:
+                    if LocalBackupSync._unchanged(entry, target_path):
+                        sync_log['files_skipped'] += 1
+                    else:
                         os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                        shutil.copy2(file_path, target_path)
-                        
-                        sync_log['files_synced'] += 1
+                        LocalBackupSync._count_copy(sync_log, copy_file(entry.path, target_path), entry)
                         sync_log['files'].append({
-                            'name': file,
+                            'name': os.path.basename(relative_path),
                             'path': relative_path,
-                            'size': os.path.getsize(file_path)
-                        })
-                    except Exception as e:
-                        sync_log['files_failed'] += 1
-                        sync_log['errors'].append({
-                            'file': relative_path,
-                            'error': str(e)
+                            'size': entry.size
                         })
+                except Exception as e:
+                    sync_log['files_failed'] += 1
+                    sync_log['errors'].append({
+                        'file': relative_path,
+                        'error': str(e)
+                    })
+                if progress:
+                    progress(done, len(entries))
             
             return {
                 'success': True,
-                'message': f"Synced {sync_log['files_synced']} files to {target_dir}",
+                'message': f"Synced {sync_log['files_synced']} files to {target_dir} "
+                           f"({sync_log['files_skipped']} unchanged)",
+                'log': sync_log
+            }
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
+    @staticmethod
+    def _count_copy(sync_log: Dict, method: str, entry: FileEntry) -> None:
+        sync_log['files_synced'] += 1
+        sync_log['bytes_copied'] += entry.size
+        sync_log['copy_methods'][method] = sync_log['copy_methods'].get(method, 0) + 1
+    
+    @staticmethod
+    def list_snapshots(target_dir: str) -> List[str]:
+        """Names of the complete snapshots in ``target_dir``, oldest first."""
+        if not os.path.isdir(target_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(target_dir)
+            if LocalBackupSync.SNAPSHOT_NAME_PATTERN.match(name) and os.path.isdir(os.path.join(target_dir, name))
+        )
+    
+    @staticmethod
+    def snapshot_to_local(source_dir: str, target_dir: str, progress: Optional[ProgressCallback] = None,
+                          keep: int = 0) -> Dict:
+        """
+        Write a point-in-time snapshot of ``source_dir`` to a new
+        ``target_dir/<YYYYmmdd_HHMMSS>`` directory. Files unchanged since
+        the previous snapshot (same size and mtime) are hardlinked to it
+        instead of copied, so an unchanged document costs a directory
+        entry, not its size. Changed files are copied with a reflink or
+        copy_file_range where the filesystem supports it.
+        
+        The snapshot is written as ``<name>.partial`` and renamed when
+        complete, so an interrupted run is never used as the base of the
+        next one. ``latest`` points at the newest snapshot; with ``keep``
+        set, only that many snapshots are kept.
+        """
+        started = time.monotonic()
+        try:
+            if not os.path.exists(source_dir):
+                return {'success': False, 'message': f'Source directory not found: {source_dir}'}
+            os.makedirs(target_dir, exist_ok=True)
+            
+            # Leftovers of interrupted runs
+            for stale in os.listdir(target_dir):
+                if stale.endswith('.partial') and LocalBackupSync.SNAPSHOT_NAME_PATTERN.match(stale[:-8]):
+                    shutil.rmtree(os.path.join(target_dir, stale), ignore_errors=True)
+            
+            snapshots = LocalBackupSync.list_snapshots(target_dir)
+            previous = snapshots[-1] if snapshots else None
+            name = datetime.now().strftime(LocalBackupSync.SNAPSHOT_NAME_FORMAT)
+            suffix = 0
+            while os.path.exists(os.path.join(target_dir, name)):
+                suffix += 1
+                name = f"{datetime.now().strftime(LocalBackupSync.SNAPSHOT_NAME_FORMAT)}_{suffix}"
+            final_dir = os.path.join(target_dir, name)
+            work_dir = f"{final_dir}.partial"
+            previous_dir = os.path.join(target_dir, previous) if previous else None
+            
+            sync_log = {
+                'timestamp': datetime.now().isoformat(),
+                'snapshot': name,
+                'previous_snapshot': previous,
+                'files_synced': 0,
+                'files_linked': 0,
+                'files_failed': 0,
+                'bytes_copied': 0,
+                'bytes_linked': 0,
+                'copy_methods': {},
+                'errors': []
+            }
+            
+            entries = scan_tree(source_dir)
+            made_dirs = set()
+            for done, relative_path in enumerate(sorted(entries), start=1):
+                entry = entries[relative_path]
+                target_path = os.path.join(work_dir, relative_path)
+                parent = os.path.dirname(target_path)
+                try:
+                    if parent not in made_dirs:
+                        os.makedirs(parent, exist_ok=True)
+                        made_dirs.add(parent)
+                    base_path = os.path.join(previous_dir, relative_path) if previous_dir else None
+                    if base_path and LocalBackupSync._unchanged(entry, base_path) \
+                            and LocalBackupSync._hardlink(base_path, target_path):
+                        sync_log['files_linked'] += 1
+                        sync_log['bytes_linked'] += entry.size
+                    else:
+                        LocalBackupSync._count_copy(sync_log, copy_file(entry.path, target_path), entry)
+                except Exception as e:
+                    sync_log['files_failed'] += 1
+                    sync_log['errors'].append({'file': relative_path, 'error': str(e)})
+                if progress:
+                    progress(done, len(entries))
+            
+            os.makedirs(work_dir, exist_ok=True)
+            os.rename(work_dir, final_dir)
+            LocalBackupSync._point_latest(target_dir, name)
+            sync_log['pruned'] = LocalBackupSync.prune_snapshots(target_dir, keep)
+            sync_log['duration_seconds'] = round(time.monotonic() - started, 3)
+            
+            logger.info("Local snapshot created", snapshot=name, previous=previous,
+                        copied=sync_log['files_synced'], linked=sync_log['files_linked'],
+                        failed=sync_log['files_failed'])
+            return {
+                'success': sync_log['files_failed'] == 0,
+                'message': f"Snapshot {name}: {sync_log['files_synced']} files copied, "
+                           f"{sync_log['files_linked']} unchanged files linked",
                 'log': sync_log
             }
         except Exception as e:
             return {'success': False, 'message': str(e)}
+    
+    @staticmethod
+    def _hardlink(existing: str, new_path: str) -> bool:
+        try:
+            os.link(existing, new_path)
+            return True
+        except OSError:
+            # No hardlinks on this filesystem, or the link count limit was hit
+            return False
+    
+    @staticmethod
+    def _point_latest(target_dir: str, name: str) -> None:
+        link = os.path.join(target_dir, 'latest')
+        tmp_link = f"{link}.tmp"
+        try:
+            if os.path.lexists(tmp_link):
+                os.remove(tmp_link)
+            os.symlink(name, tmp_link)
+            os.replace(tmp_link, link)
+        except OSError as e:
+            logger.warning("Could not update latest snapshot link", error=str(e))
+    
+    @staticmethod
+    def prune_snapshots(target_dir: str, keep: int) -> List[str]:
+        """Delete all but the newest ``keep`` snapshots (0 keeps everything)."""
+        if keep <= 0:
+            return []
+        pruned = LocalBackupSync.list_snapshots(target_dir)[:-keep]
+        for name in pruned:
+            # Files shared with newer snapshots survive through their other links
+            shutil.rmtree(os.path.join(target_dir, name))
+        return pruned
 
 
-class NextcloudSync:
+class NextcloudSync(RemoteSync):
     """Nextcloud/WebDAV sync service."""
     
-    def __init__(self, url: str, username: str, password: str, base_path: str = "/DMS"):
+    chunked_threshold: int = settings.nextcloud_chunked_threshold_mb * 1024 * 1024
+    chunk_size: int = settings.nextcloud_chunk_size_mb * 1024 * 1024
+    bandwidth: str = settings.nextcloud_bandwidth_limit or settings.sync_bandwidth_limit
+    
+    def __init__(self, url: str, username: str, password: str, base_path: str = "/DMS",
+                 workers: Optional[int] = None, bandwidth: Optional[str] = None):
         """Initialize Nextcloud connection parameters."""
+        if workers:
+            self.workers = workers
+        if bandwidth:
+            self.bandwidth = bandwidth
         self.url = str(url).strip().rstrip('/') if url else ""
         self.username = str(username).strip() if username else ""
         self.password = str(password).strip() if password else ""
         self.base_path = str(base_path).strip() if base_path else "/DMS"
         self.client = None
+        self.chunked = None
     
     def _connect(self) -> bool:
         """Establish WebDAV connection to Nextcloud."""
@@ -317,6 +925,8 @@ class NextcloudSync:
             }
             
             self.client = WebDAVClient(options)
+            self.chunked = ChunkedUploader(self.url, self.username, self.password, chunk_size=self.chunk_size,
+                                           throttle=self.throttle)
             
             # Test connection by checking if root exists
             if not self.client.check('/'):
@@ -342,97 +952,46 @@ class NextcloudSync:
                 # Directory might already exist
                 pass
     
-    def sync_documents(self, source_dir: str) -> Dict:
-        """Sync documents to Nextcloud."""
-        if not self._connect():
-            return {'success': False, 'message': 'Failed to connect to Nextcloud'}
-        
-        try:
-            sync_log = {
-                'timestamp': datetime.now().isoformat(),
-                'files_synced': 0,
-                'files_failed': 0,
-                'files': [],
-                'errors': []
-            }
-            
-            if not os.path.exists(source_dir):
-                return {'success': False, 'message': f'Source directory not found: {source_dir}'}
-            
-            # Create base directory on Nextcloud
-            self._create_remote_dir(self.base_path)
-            
-            for root, dirs, files in os.walk(source_dir):
-                for file in files:
-                    if file.startswith('.'):
-                        continue
-                    
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, source_dir)
-                    remote_path = f"{self.base_path}/{relative_path}".replace('\\', '/')
-                    remote_dir = '/'.join(remote_path.split('/')[:-1])
-                    
-                    try:
-                        # Create directory structure
-                        self._create_remote_dir(remote_dir)
-                        
-                        # Upload file
-                        self.client.upload_sync(remote_path=remote_path, local_path=file_path)
-                        
-                        sync_log['files_synced'] += 1
-                        sync_log['files'].append({
-                            'name': file,
-                            'path': relative_path,
-                            'size': os.path.getsize(file_path),
-                            'remote_path': remote_path
-                        })
-                    except Exception as e:
-                        sync_log['files_failed'] += 1
-                        sync_log['errors'].append({
-                            'file': relative_path,
-                            'error': str(e)
-                        })
-            
-            return {
-                'success': True,
-                'message': f"Synced {sync_log['files_synced']} files to Nextcloud",
-                'log': sync_log
-            }
-        
-        except Exception as e:
-            return {'success': False, 'message': str(e)}
+    @property
+    def destination(self) -> str:
+        return f"webdav:{self.url}/remote.php/dav/files/{self.username}/{self.base_path.strip('/')}"
     
-    def sync_logs(self, log_file: str) -> Dict:
-        """Sync log file to Nextcloud."""
-        if not self._connect():
-            return {'success': False, 'message': 'Failed to connect to Nextcloud'}
-        
+    def _remote_path(self, relative_path: str) -> str:
+        return f"{self.base_path}/{relative_path}".replace('\\', '/')
+    
+    def _ensure_dir(self, remote_dir: str) -> None:
+        self._create_remote_dir(remote_dir)
+    
+    def _upload_file(self, local_path: str, remote_path: str) -> None:
+        if os.path.getsize(local_path) >= self.chunked_threshold:
+            # Large files go up in resumable chunks instead of one PUT
+            self.chunked.upload(local_path, remote_path)
+        elif self.throttle:
+            with open(local_path, 'rb') as f:
+                self.client.upload_to(buff=self._throttled(f), remote_path=remote_path)
+        else:
+            self.client.upload_sync(remote_path=remote_path, local_path=local_path)
+    
+    def _download_file(self, remote_path: str, local_path: str) -> None:
+        self.client.download_sync(remote_path=remote_path, local_path=local_path)
+    
+    def _list_subdirs(self, remote_dir: str) -> set:
+        # webdav3 lists directories with a trailing slash
+        return {name.rstrip('/') for name in self.client.list(remote_dir) if name.endswith('/')}
+    
+    def _make_dir(self, remote_dir: str) -> None:
+        self.client.mkdir(remote_dir)
+    
+    def _file_log(self, entry: FileEntry, remote_path: str) -> Dict:
+        return {**super()._file_log(entry, remote_path), 'remote_path': remote_path}
+    
+    def sync_documents(self, source_dir: str, state_store: Optional[SyncStateStore] = None,
+                       dry_run: bool = False, full: bool = False,
+                       progress: Optional[ProgressCallback] = None) -> Dict:
+        """Sync documents to Nextcloud."""
         try:
-            if not os.path.exists(log_file):
-                return {'success': False, 'message': f'Log file not found: {log_file}'}
-            
-            # Create logs directory
-            logs_remote_path = f"{self.base_path}/logs"
-            self._create_remote_dir(logs_remote_path)
-            
-            # Copy log with timestamp
-            log_filename = os.path.basename(log_file)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            target_name = f"{log_filename.replace('.log', '')}_{timestamp}.log"
-            remote_path = f"{logs_remote_path}/{target_name}"
-            
-            self.client.upload_sync(remote_path=remote_path, local_path=log_file)
-            
-            return {
-                'success': True,
-                'message': f"Log synced to Nextcloud: {target_name}",
-                'file': {
-                    'name': target_name,
-                    'size': os.path.getsize(log_file),
-                    'remote_path': remote_path
-                }
-            }
-        
+            return super().sync_documents(source_dir, state_store=state_store, dry_run=dry_run, full=full,
+                                          progress=progress)
         except Exception as e:
             return {'success': False, 'message': str(e)}
     
@@ -0,0 +1,162 @@
+"""Persistent per-destination sync state and the upload plan derived from it."""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.sync_state import SyncState
+from app.services.file_index import FileEntry, file_sha256
+
+# Rows per IN (...) lookup when recording or forgetting state
+BATCH_SIZE = 500
+
+
+class SyncPlan:
+    """
+    Result of comparing local files with the recorded sync state:
+    ``upload`` holds (entry, reason) pairs for new and changed files,
+    ``touched`` holds files whose mtime changed but whose content did not
+    (only their state needs refreshing), ``removed`` lists recorded paths
+    that no longer exist locally, out of ``recorded`` paths in the state.
+    """
+
+    def __init__(self):
+        self.upload: List[Tuple[FileEntry, str]] = []
+        self.touched: List[Tuple[FileEntry, str]] = []
+        self.removed: List[str] = []
+        self.recorded = 0
+        self.unchanged = 0
+        # Hashes computed while planning, reused when recording
+        self.hashes: Dict[str, str] = {}
+
+    @classmethod
+    def everything(cls, entries: Dict[str, FileEntry]) -> "SyncPlan":
+        """A plan that uploads every file, used when no state is tracked."""
+        plan = cls()
+        plan.upload = [(entries[path], 'new') for path in sorted(entries)]
+        return plan
+
+    @property
+    def upload_bytes(self) -> int:
+        return sum(entry.size for entry, _ in self.upload)
+
+    def summary(self, include_files: bool = False) -> Dict:
+        result = {
+            'to_upload': len(self.upload),
+            'new': sum(1 for _, reason in self.upload if reason == 'new'),
+            'changed': sum(1 for _, reason in self.upload if reason != 'new'),
+            'unchanged': self.unchanged + len(self.touched),
+            'removed_locally': len(self.removed),
+            'upload_bytes': self.upload_bytes,
+        }
+        if include_files:
+            result['files'] = [
+                {'path': entry.relative_path, 'size': entry.size, 'reason': reason}
+                for entry, reason in self.upload
+            ]
+            result['removed'] = list(self.removed)
+        return result
+
+
+class SyncStateStore:
+    """
+    Sync state of one destination (e.g. ``smb://nas/share/DMS``), stored in
+    the sync_state table. A file is considered unchanged when size and mtime
+    match the recorded values; when only the mtime differs, its SHA-256 is
+    compared before deciding to upload it again.
+    """
+
+    def __init__(self, db: Session, destination: str):
+        self.db = db
+        self.destination = destination
+
+    def load(self) -> Dict[str, SyncState]:
+        rows = self.db.query(SyncState).filter(SyncState.destination == self.destination).all()
+        return {row.path: row for row in rows}
+
+    def plan(self, entries: Dict[str, FileEntry], full: bool = False) -> SyncPlan:
+        """Work out which files need uploading. ``full`` uploads everything."""
+        plan = SyncPlan()
+        state = self.load()
+
+        for relative_path in sorted(entries):
+            entry = entries[relative_path]
+            recorded = state.get(relative_path)
+            if full:
+                plan.upload.append((entry, 'full'))
+            elif recorded is None:
+                plan.upload.append((entry, 'new'))
+            elif recorded.size != entry.size:
+                plan.upload.append((entry, 'size'))
+            elif recorded.mtime_ns == entry.mtime_ns:
+                plan.unchanged += 1
+            else:
+                content_hash = file_sha256(entry.path)
+                plan.hashes[relative_path] = content_hash
+                if content_hash == recorded.content_hash:
+                    plan.touched.append((entry, 'mtime'))
+                else:
+                    plan.upload.append((entry, 'content'))
+
+        plan.removed = sorted(path for path in state if path not in entries)
+        plan.recorded = len(state)
+        return plan
+
+    def record(self, entries: Iterable[FileEntry], hashes: Dict[str, str] | None = None) -> int:
+        """
+        Store the state of successfully synced files and commit. Another
+        process may record the same new path concurrently (a replicator and
+        a sync run, say); the batch that loses that race is written again
+        as updates of the rows it collided with.
+        """
+        hashes = hashes or {}
+        entries = list(entries)
+        if not entries:
+            return 0
+        now = datetime.utcnow()
+        for start in range(0, len(entries), BATCH_SIZE):
+            batch = entries[start:start + BATCH_SIZE]
+            try:
+                with self.db.begin_nested():
+                    self._record_batch(batch, hashes, now)
+            except IntegrityError:
+                with self.db.begin_nested():
+                    self._record_batch(batch, hashes, now)
+        self.db.commit()
+        return len(entries)
+
+    def _record_batch(self, batch: List[FileEntry], hashes: Dict[str, str], now: datetime) -> None:
+        existing = {
+            row.path: row for row in self.db.query(SyncState).filter(
+                SyncState.destination == self.destination,
+                SyncState.path.in_([entry.relative_path for entry in batch]),
+            )
+        }
+        for entry in batch:
+            content_hash = hashes.get(entry.relative_path) or file_sha256(entry.path)
+            row = existing.get(entry.relative_path)
+            if row is None:
+                row = SyncState(destination=self.destination, path=entry.relative_path)
+                self.db.add(row)
+            row.size = entry.size
+            row.mtime_ns = entry.mtime_ns
+            row.content_hash = content_hash
+            row.synced_at = now
+
+    def forget(self, paths: Iterable[str]) -> int:
+        """Drop state for files that were removed locally, so a re-created file is uploaded again."""
+        paths = list(paths)
+        if not paths:
+            return 0
+        deleted = 0
+        for start in range(0, len(paths), BATCH_SIZE):
+            batch = paths[start:start + BATCH_SIZE]
+            deleted += (
+                self.db.query(SyncState)
+                .filter(SyncState.destination == self.destination, SyncState.path.in_(batch))
+                .delete(synchronize_session=False)
+            )
+        self.db.commit()
+        return deleted
@@ -0,0 +1,101 @@
+"""In-process cache of parsed letterhead templates."""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Dict, Iterator
+
+from PyPDF2 import PdfReader
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class _CacheEntry:
+    def __init__(self, version: tuple, reader: PdfReader):
+        self.version = version
+        self.reader = reader
+        # PdfReader reads lazily from its stream, so concurrent renders in the
+        # same process must not walk one reader at the same time.
+        self.lock = threading.Lock()
+
+
+class TemplateCache:
+    """
+    LRU cache of parsed template PDFs.
+
+    Entries are keyed by template file path (every upload gets a unique UUID
+    file name, so the path identifies the template) and validated against the
+    file's mtime and size on every lookup. A re-uploaded or modified file is
+    therefore re-parsed even in processes that never saw the invalidation.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max(int(max_entries), 1)
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _version(template_path: str) -> tuple:
+        stat = os.stat(template_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _get_entry(self, template_path: str) -> _CacheEntry:
+        key = os.path.abspath(template_path)
+        version = self._version(key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Parse outside the cache lock so other templates stay available
+        with open(key, 'rb') as f:
+            reader = PdfReader(BytesIO(f.read()))
+        entry = _CacheEntry(version, reader)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    @contextmanager
+    def open(self, template_path: str) -> Iterator[PdfReader]:
+        """Yield the parsed template, holding it exclusively while in use."""
+        entry = self._get_entry(template_path)
+        with entry.lock:
+            yield entry.reader
+
+    def invalidate(self, template_path: str) -> None:
+        """Drop a template, e.g. after it was deleted or replaced."""
+        with self._lock:
+            self._entries.pop(os.path.abspath(template_path), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+template_cache = TemplateCache(max_entries=settings.template_cache_size)
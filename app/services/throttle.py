@@ -0,0 +1,173 @@
+"""Bandwidth limiting for sync uploads: a token bucket with time-of-day windows."""
+
+import re
+import threading
+import time
+from datetime import datetime
+from typing import BinaryIO, Callable, List, Optional, Tuple
+
+# Re-read the schedule at most this often while uploading
+SCHEDULE_CHECK_SECONDS = 1.0
+RATE_UNITS = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2, 'G': 1024 ** 3, 'GB': 1024 ** 3}
+WINDOW_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$')
+
+
+def parse_rate(text: str) -> int:
+    """``"2M"``, ``"512K"``, ``"1000"`` -> bytes per second; ``0``/``unlimited`` -> 0 (no limit)."""
+    text = text.strip().upper()
+    if text in ('', '0', 'UNLIMITED', 'OFF', 'NONE'):
+        return 0
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([KMG]?B?)(?:/S)?', text)
+    if not match:
+        raise ValueError(f"Invalid bandwidth rate: {text!r}")
+    return int(float(match.group(1)) * RATE_UNITS[match.group(2)])
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. ``consume(n)`` reserves ``n`` bytes and
+    sleeps until they are covered by the refill rate, so several upload
+    threads sharing one bucket share its rate. Tokens may go negative
+    (a reservation); the caller that overdraws waits for the debt, later
+    callers queue behind it. Up to one second of traffic can burst.
+    """
+
+    def __init__(self, rate: int, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self.rate = max(rate, 0)
+        self.tokens = float(self.rate)
+        self.updated = clock()
+
+    def set_rate(self, rate: int) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = max(rate, 0)
+            # A new window starts without debt or a stored-up burst
+            self.tokens = min(max(self.tokens, 0.0), float(self.rate))
+
+    def _refill(self) -> None:
+        now = self.clock()
+        if self.rate:
+            self.tokens = min(self.tokens + (now - self.updated) * self.rate, float(self.rate))
+        self.updated = now
+
+    def consume(self, amount: int) -> float:
+        """Take ``amount`` bytes, sleeping as needed. Returns the seconds waited."""
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            self._refill()
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+
+class BandwidthSchedule:
+    """
+    Upload rate by time of day, e.g. ``"08:00-18:00=2M; 18:00-22:00=8M; unlimited"``:
+    capped to 2 MB/s during office hours, 8 MB/s in the evening and
+    unlimited otherwise. Windows are local time, may wrap midnight
+    (``22:00-06:00``) and the first matching one wins; an entry without a
+    window sets the rate outside all windows.
+    """
+
+    def __init__(self, windows: List[Tuple[int, int, int]], default: int = 0, spec: str = ''):
+        self.windows = windows
+        self.default = default
+        self.spec = spec
+
+    @classmethod
+    def parse(cls, spec: Optional[str]) -> "BandwidthSchedule":
+        windows = []
+        default = 0
+        for entry in re.split(r'[;,]', spec or ''):
+            entry = entry.strip()
+            if not entry:
+                continue
+            window, sep, rate = entry.partition('=')
+            if not sep:
+                default = parse_rate(window)
+                continue
+            match = WINDOW_PATTERN.match(window.strip())
+            if not match:
+                raise ValueError(f"Invalid bandwidth window: {window!r}")
+            start_h, start_m, end_h, end_m = (int(v) for v in match.groups())
+            if start_h > 24 or end_h > 24 or start_m > 59 or end_m > 59:
+                raise ValueError(f"Invalid bandwidth window: {window!r}")
+            windows.append((start_h * 60 + start_m, end_h * 60 + end_m, parse_rate(rate)))
+        return cls(windows, default, spec=(spec or '').strip())
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.default) or any(rate for _, _, rate in self.windows)
+
+    def rate_at(self, moment: datetime) -> int:
+        minute = moment.hour * 60 + moment.minute
+        for start, end, rate in self.windows:
+            inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+            if inside:
+                return rate
+        return self.default
+
+
+class Throttle:
+    """
+    A token bucket whose rate follows a BandwidthSchedule. One instance is
+    shared by all connections of a sync run; it also counts the bytes that
+    went through it and the time spent waiting.
+    """
+
+    def __init__(self, schedule: BandwidthSchedule, now: Callable[[], datetime] = datetime.now,
+                 bucket: Optional[TokenBucket] = None):
+        self.schedule = schedule
+        self.now = now
+        self.bucket = bucket or TokenBucket(schedule.rate_at(now()))
+        self._checked = self.bucket.clock()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.waited = 0.0
+
+    @property
+    def rate(self) -> int:
+        return self.bucket.rate
+
+    def consume(self, amount: int) -> None:
+        clock = self.bucket.clock()
+        if clock - self._checked >= SCHEDULE_CHECK_SECONDS:
+            self._checked = clock
+            rate = self.schedule.rate_at(self.now())
+            if rate != self.bucket.rate:
+                self.bucket.set_rate(rate)
+        waited = self.bucket.consume(amount)
+        with self._lock:
+            self.bytes += amount
+            self.waited += waited
+
+    def stats(self) -> dict:
+        return {
+            'schedule': self.schedule.spec,
+            'current_limit_bytes_per_second': self.rate,
+            'throttled_seconds': round(self.waited, 3),
+        }
+
+
+class ThrottledReader:
+    """File wrapper whose reads are paced by a Throttle; other attributes pass through."""
+
+    def __init__(self, fileobj: BinaryIO, throttle: Throttle):
+        self._file = fileobj
+        self._throttle = throttle
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        if data:
+            self._throttle.consume(len(data))
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
@@ -0,0 +1,88 @@
+"""
+Benchmark the streaming HTML-to-flowables converter against the previous
+BeautifulSoup implementation (legacy_bs4_converter.py) on CKEditor-like input from 1 KB to 5 MB.
+
+Usage:
+    python benchmarks/html_to_flowables.py [--shape sections|long-list|nested]
+        [--sizes 1K,10K,100K,1M,5M] [--legacy-max 5M]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.styles import getSampleStyleSheet  # noqa: E402
+
+from app.services.pdf_generator import PDFGeneratorService  # noqa: E402
+from benchmarks.legacy_bs4_converter import parse_html_bs4  # noqa: E402
+
+# One "section" of typical CKEditor output: nested lists, inline formatting and a table
+SECTION = (
+    '<h2>Section heading</h2>'
+    '<p style="text-align:justify">Lorem <strong>ipsum</strong> dolor sit <em>amet</em>, '
+    '<span style="font-family:Arial">consectetur</span> adipiscing elit &amp; more.</p>'
+    '<ul><li>First <strong>point</strong></li><li>Second point'
+    '<ol><li>Nested one</li><li>Nested <u>two</u></li></ol></li></ul>'
+    '<figure class="table"><table><tbody>'
+    '<tr><th>Item</th><th>Amount</th></tr>'
+    '<tr><td><p>Widget</p></td><td>&#8377; 1,200</td></tr>'
+    '</tbody></table></figure>'
+    '<blockquote><div><div><p>Deeply <b>nested</b> paragraph.</p></div></div></blockquote>'
+)
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    factor = {'K': 1024, 'M': 1024 * 1024}.get(text[-1], 1)
+    return int(float(text.rstrip('KM')) * factor)
+
+
+def make_html(shape: str, size: int) -> str:
+    if shape == 'long-list':
+        # One ordered list that grows with the input (e.g. a long line-item list)
+        item = '<li>Line item with <strong>bold</strong> text</li>'
+        return '<ol>' + item * max(size // len(item), 1) + '</ol>'
+    if shape == 'nested':
+        # Content wrapped in many levels of containers, as pasted from Word
+        depth = 50
+        wrapped = '<div><blockquote>' * depth + SECTION + '</blockquote></div>' * depth
+        return wrapped * max(size // len(wrapped), 1)
+    return SECTION * max(size // len(SECTION), 1)
+
+
+def timed(func, html: str, styles) -> tuple:
+    start = time.perf_counter()
+    elements = func(html, styles)
+    return time.perf_counter() - start, len(elements)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--shape', default='sections', choices=['sections', 'long-list', 'nested'])
+    parser.add_argument('--sizes', default='1K,10K,100K,1M,5M')
+    parser.add_argument('--legacy-max', default='5M', help='skip the BeautifulSoup path above this size')
+    args = parser.parse_args()
+
+    styles = getSampleStyleSheet()
+    legacy_max = parse_size(args.legacy_max)
+    # Warm up imports and ReportLab caches so the first row is not skewed
+    timed(PDFGeneratorService._parse_html, SECTION, styles)
+    timed(parse_html_bs4, SECTION, styles)
+
+    print(f"{'input':>8} {'streaming s':>12} {'flowables':>10} {'bs4 s':>10} {'flowables':>10} {'speed-up':>9}")
+    for label in args.sizes.split(','):
+        html = make_html(args.shape, parse_size(label))
+        new_time, new_count = timed(PDFGeneratorService._parse_html, html, styles)
+        if len(html) <= legacy_max:
+            old_time, old_count = timed(parse_html_bs4, html, styles)
+            legacy = f"{old_time:>10.3f} {old_count:>10} {old_time / new_time:>8.1f}x"
+        else:
+            legacy = f"{'skipped':>10} {'-':>10} {'-':>9}"
+        print(f"{label:>8} {new_time:>12.3f} {new_count:>10} {legacy}")
+
+
+if __name__ == '__main__':
+    main()
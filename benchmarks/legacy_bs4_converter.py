@@ -0,0 +1,163 @@
+"""
+The BeautifulSoup HTML-to-flowables converter the PDF service used before
+the streaming ``HTMLFlowableConverter``, kept only as the baseline that
+``html_to_flowables.py`` measures against.
+"""
+
+import re
+
+from bs4 import BeautifulSoup
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import PageBreak, Paragraph, Spacer, Table, TableStyle
+
+from app.services.pdf_generator import UNICODE_FONT_AVAILABLE
+
+
+def parse_html_bs4(html_content: str, styles) -> list:
+    """Convert HTML to ReportLab flowables the way the service did before the streaming converter."""
+
+    elements = []
+
+    # Clean HTML to remove problematic styles while preserving content
+    # Remove only span tags with complex style attributes that cause ReportLab issues
+    html_content = re.sub(r'<span\s+[^>]*style\s*=\s*["\'][^"\']*font-family[^"\']*["\'][^>]*>([^<]*)</span>', r'\1', html_content)
+    html_content = re.sub(r'<span\s+[^>]*>([^<]*)</span>', r'\1', html_content)
+
+    # Parse HTML
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    # Define content styles with Times New Roman
+    body_style = ParagraphStyle(
+        'CKBody',
+        parent=styles['BodyText'],
+        fontSize=12,
+        fontName='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Roman',
+        alignment=TA_JUSTIFY,
+        spaceBefore=6,
+        spaceAfter=6,
+        leading=14,
+    )
+
+    heading_styles = {
+        'h1': ParagraphStyle('CKH1', parent=body_style, fontSize=18, fontName='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Bold', spaceBefore=12, spaceAfter=6),
+        'h2': ParagraphStyle('CKH2', parent=body_style, fontSize=16, fontName='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Bold', spaceBefore=12, spaceAfter=6),
+        'h3': ParagraphStyle('CKH3', parent=body_style, fontSize=14, fontName='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Bold', spaceBefore=12, spaceAfter=6),
+    }
+
+    # Track processed elements to avoid duplication
+    processed_elements = set()
+
+    # Process each element
+    for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'ul', 'ol', 'table', 'figure', 'hr', 'br']):
+        if element.name == 'table':
+            # Handle tables
+            table_data = []
+            for row in element.find_all('tr'):
+                row_data = []
+                for cell in row.find_all(['td', 'th']):
+                    cell_html = cell.decode_contents().strip() or '&nbsp;'
+                    cell_html = cell_html.replace('<strong>', '<b>').replace('</strong>', '</b>')
+                    cell_html = cell_html.replace('<em>', '<i>').replace('</em>', '</i>')
+                    row_data.append(Paragraph(cell_html, ParagraphStyle('TableCell', parent=body_style, fontSize=10, fontName='DejaVuSans' if UNICODE_FONT_AVAILABLE else 'Times-Roman')))
+                    # Mark all descendants as processed
+                    for desc in cell.descendants:
+                        processed_elements.add(id(desc))
+                if row_data:
+                    table_data.append(row_data)
+
+            if table_data:
+                # Create table
+                t = Table(table_data)
+                t.setStyle(TableStyle([
+                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e8e8e8')),
+                    ('FONTNAME', (0, 0), (-1, 0), 'Times-Bold'),
+                    ('FONTNAME', (0, 1), (-1, -1), 'Times-Roman'),
+                    ('FONTSIZE', (0, 0), (-1, -1), 11),
+                    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                    ('TOPPADDING', (0, 0), (-1, -1), 6),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+                    ('LEFTPADDING', (0, 0), (-1, -1), 8),
+                    ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+                ]))
+                elements.append(t)
+                elements.append(Spacer(1, 0.15 * inch))
+                processed_elements.add(id(element))
+
+        elif element.name in ['h1', 'h2', 'h3']:
+            # Handle headings
+            text = element.get_text(strip=True)
+            if text:
+                elements.append(Paragraph(text, heading_styles[element.name]))
+
+        elif element.name in ['ul', 'ol']:
+            # Handle lists
+            for li in element.find_all('li', recursive=False):
+                text = li.get_text(strip=True)
+                if text:
+                    list_style = ParagraphStyle('ListItem', parent=body_style, leftIndent=20, bulletIndent=10)
+                    bullet = '•' if element.name == 'ul' else f'{li.parent.find_all("li").index(li) + 1}.'
+                    elements.append(Paragraph(f"{bullet} {text}", list_style))
+
+        elif element.name == 'p':
+            # Skip if already processed (e.g., inside a table)
+            if id(element) in processed_elements:
+                continue
+
+            # Handle paragraphs with inline formatting
+            html_text = str(element)
+
+            # Skip if contains block elements like tables
+            if element.find(['table', 'ul', 'ol']):
+                continue
+            text_content = element.get_text(strip=True)
+            if not text_content:
+                continue
+
+            # Get inner HTML
+            text = element.decode_contents()
+
+            # Clean and convert HTML to ReportLab markup
+            text = text.replace('<strong>', '<b>').replace('</strong>', '</b>')
+            text = text.replace('<em>', '<i>').replace('</em>', '</i>')
+            text = text.replace('<u>', '<u>').replace('</u>', '</u>')
+
+            # Handle alignment - check both style attribute and inline styles
+            para_style = body_style
+            style_attr = element.get('style', '') or ''
+            align_attr = element.get('align', '') or ''
+
+            # Check for alignment in style attribute or align attribute
+            if 'text-align:center' in style_attr or 'text-align: center' in style_attr or align_attr == 'center':
+                para_style = ParagraphStyle('Center', parent=body_style, alignment=TA_CENTER)
+            elif 'text-align:right' in style_attr or 'text-align: right' in style_attr or align_attr == 'right':
+                para_style = ParagraphStyle('Right', parent=body_style, alignment=TA_RIGHT)
+            elif 'text-align:justify' in style_attr or 'text-align: justify' in style_attr or align_attr == 'justify':
+                para_style = ParagraphStyle('Justify', parent=body_style, alignment=TA_JUSTIFY)
+            elif 'text-align:left' in style_attr or 'text-align: left' in style_attr or align_attr == 'left':
+                para_style = ParagraphStyle('Left', parent=body_style, alignment=TA_LEFT)
+
+            if text.strip():
+                try:
+                    elements.append(Paragraph(text, para_style))
+                except Exception as e:
+                    # Fallback to plain text if HTML parsing fails
+                    plain_text = element.get_text()
+                    if plain_text.strip():
+                        elements.append(Paragraph(plain_text, para_style))
+
+        elif element.name == 'br':
+            # Handle line breaks
+            elements.append(Spacer(1, 0.1 * inch))
+
+        if element.name in ['figure', 'hr']:
+            classes = ' '.join(element.get('class', []))
+            style = element.get('style', '') or ''
+            if 'page-break' in classes or 'page-break-after' in style:
+                elements.append(PageBreak())
+
+    return elements
@@ -15,9 +15,13 @@ from app.config import get_settings
 from app.logging_config import configure_logging
 from app.database.session import engine, SessionLocal
 from app.database.base import Base
-from app.routers import auth, documents, users, audit, templates, backup, sync
+from app.routers import auth, documents, users, audit, templates, backup, sync, jobs
 from app.auth.security import get_password_hash
 from app.models.user import User
+from app.services.audit_writer import audit_writer
+from app.services.job_handlers import job_runner, job_scheduler
+from app.services.render_engine import render_engine
+from app.services.replication import replicator
 from sqlalchemy.orm import Session
 
 settings = get_settings()
@@ -67,13 +71,33 @@ async def lifespan(app: FastAPI):
             db.add(admin_user)
             db.commit()
             logger.info("Default admin user created", username=settings.admin_username)
+        # Jobs of a previous run of this server cannot finish any more
+        interrupted = job_runner.recover_interrupted(db)
+        if interrupted:
+            logger.warning("Marked interrupted jobs as failed", count=interrupted)
     finally:
         db.close()
     
+    # Start the PDF render worker pool and the buffered audit writer
+    render_engine.start()
+    if settings.audit_buffer_enabled:
+        audit_writer.start()
+    # Push new documents and templates to the configured remote targets
+    if settings.replication_enabled:
+        replicator.start()
+    # Scheduled sync and backup runs (JOB_SCHEDULES)
+    job_scheduler.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down application")
+    render_engine.shutdown()
+    job_scheduler.stop()
+    job_runner.shutdown(wait=False)
+    replicator.stop()
+    # Flush queued audit events before the process exits
+    audit_writer.stop()
 
 
 # Configure logging
@@ -124,6 +148,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -134,6 +159,7 @@ app.include_router(audit.router)
 app.include_router(templates.router)
 app.include_router(backup.router)
 app.include_router(sync.router)
+app.include_router(jobs.router)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -378,7 +378,7 @@ document.getElementById('search-btn').addEventListener('click', async () => {
     listDiv.innerHTML = '<div class="loading">Searching...</div>';
     
     try {
-        const documents = await apiCall(`/documents/search?title=${encodeURIComponent(query)}`);
+        const documents = await apiCall(`/documents/search?q=${encodeURIComponent(query)}`);
         
         if (documents.length === 0) {
             listDiv.innerHTML = '<div class="empty-state"><h3>No documents found</h3><p>Try a different search term.</p></div>';
@@ -882,6 +882,25 @@ async function loadAuditLogs(page = 0) {
     }
 }
 
+// Background jobs: poll until finished and return the job's result
+async function waitForJob(jobId, msgDiv, label) {
+    while (true) {
+        const job = await apiCall(`/admin/jobs/${jobId}`);
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            if (job.error) {
+                throw new Error(job.error);
+            }
+            return job.result || {};
+        }
+        let progress = '';
+        if (job.progress_total > 0) {
+            progress = ` ${job.progress_done}/${job.progress_total}`;
+        }
+        msgDiv.textContent = `${label}${progress}${job.message ? ' - ' + job.message : ''}`;
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 // Backup Functions
 async function backupNow() {
     const msgDiv = document.getElementById('backup-message');
@@ -889,9 +908,10 @@ async function backupNow() {
         msgDiv.className = 'message loading';
         msgDiv.textContent = 'Creating backup...';
         
-        const response = await apiCall('/admin/backup/create', {
+        const job = await apiCall('/admin/backup/create', {
             method: 'POST'
         });
+        const response = await waitForJob(job.job_id, msgDiv, 'Creating backup...');
         
         msgDiv.className = 'message success';
         msgDiv.textContent = `✓ Backup created: ${response.backup_file}`;
@@ -914,12 +934,18 @@ async function viewBackups() {
         
         let html = '<div class="card"><h3>Available Backups</h3>';
         html += '<table style="width: 100%; border-collapse: collapse;">';
-        html += '<tr style="background: #f5f5f5;"><th style="padding: 10px; text-align: left; border-bottom: 1px solid #ddd;">File</th><th style="padding: 10px; text-align: left; border-bottom: 1px solid #ddd;">Size</th><th style="padding: 10px; text-align: left; border-bottom: 1px solid #ddd;">Date</th><th style="padding: 10px; text-align: center; border-bottom: 1px solid #ddd;">Actions</th></tr>';
+        html += '<tr style="background: #f5f5f5;"><th style="padding: 10px; text-align: left; border-bottom: 1px solid #ddd;">File</th><th style="padding: 10px; text-align: left; border-bottom: 1px solid #ddd;">Type</th><th style="padding: 10px; text-align: left; border-bottom: 1px solid #ddd;">Size</th><th style="padding: 10px; text-align: left; border-bottom: 1px solid #ddd;">Date</th><th style="padding: 10px; text-align: center; border-bottom: 1px solid #ddd;">Actions</th></tr>';
         
         response.backups.forEach(backup => {
             const size = (backup.size / (1024*1024)).toFixed(2);
+            // Incremental backups only restore together with their chain
+            let type = backup.type;
+            if (backup.type === 'incremental') {
+                type += ` (chain of ${backup.chain.length}${backup.restorable ? '' : ', incomplete'})`;
+            }
             html += `<tr style="border-bottom: 1px solid #eee;">
                 <td style="padding: 10px;">${backup.name}</td>
+                <td style="padding: 10px;">${type}</td>
                 <td style="padding: 10px;">${size} MB</td>
                 <td style="padding: 10px;">${backup.date}</td>
                 <td style="padding: 10px; text-align: center;">
@@ -973,13 +999,14 @@ async function restoreBackup(backupName) {
         msgDiv.className = 'message loading';
         msgDiv.textContent = 'Restoring from backup...';
         
-        const response = await apiCall('/admin/backup/restore', {
+        const job = await apiCall('/admin/backup/restore', {
             method: 'POST',
             body: JSON.stringify({ backup_file: backupName })
         });
+        const response = await waitForJob(job.job_id, msgDiv, 'Restoring from backup...');
         
         msgDiv.className = 'message success';
-        msgDiv.textContent = `✓ Restore successful. Reloading...`;
+        msgDiv.textContent = `✓ Restored ${response.files_restored} files. Reloading...`;
         setTimeout(() => {
             location.reload();
         }, 2000);
@@ -1045,7 +1072,7 @@ async function syncToSMB() {
         
         const syncType = document.querySelector('input[name="sync-type"]:checked').value;
         
-        const response = await apiCall('/admin/sync/smb', {
+        const job = await apiCall('/admin/sync/smb', {
             method: 'POST',
             body: JSON.stringify({
                 config: config,
@@ -1054,6 +1081,7 @@ async function syncToSMB() {
                 }
             })
         });
+        const response = await waitForJob(job.job_id, msgDiv, 'Syncing to SMB/NAS...');
         
         if (response.success) {
             msgDiv.className = 'message success';
@@ -1086,15 +1114,17 @@ async function syncToLocal() {
         
         const syncType = document.querySelector('input[name="local-sync-type"]:checked').value;
         
-        const response = await apiCall('/admin/sync/local', {
+        const job = await apiCall('/admin/sync/local', {
             method: 'POST',
             body: JSON.stringify({
                 request: {
                     sync_type: syncType,
-                    target: targetPath
+                    target: targetPath,
+                    snapshot: document.getElementById('local-sync-snapshot').checked
                 }
             })
         });
+        const response = await waitForJob(job.job_id, msgDiv, 'Syncing to local directory...');
         
         if (response.success) {
             msgDiv.className = 'message success';
@@ -1158,7 +1188,7 @@ async function syncToNextcloud() {
         
         const syncType = document.querySelector('input[name="nextcloud-sync-type"]:checked').value;
         
-        const response = await apiCall('/admin/sync/nextcloud', {
+        const job = await apiCall('/admin/sync/nextcloud', {
             method: 'POST',
             body: JSON.stringify({
                 config: config,
@@ -1167,6 +1197,7 @@ async function syncToNextcloud() {
                 }
             })
         });
+        const response = await waitForJob(job.job_id, msgDiv, 'Syncing to Nextcloud...');
         
         if (response.success) {
             msgDiv.className = 'message success';
@@ -0,0 +1,256 @@
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlparse
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - register every table on Base.metadata
+from app.auth.security import create_access_token, get_password_hash
+from app.config import get_settings
+from app.database.base import Base
+from app.database.session import get_db
+from app.models.user import User
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """A throwaway file-backed SQLite database with all tables created."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'dms.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(sqlite_engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)
+
+
+@pytest.fixture
+def count_queries(sqlite_engine):
+    """
+    Count SQL statements run inside a block, to catch N+1 regressions:
+
+        with count_queries() as queries:
+            client.get(...)
+        assert len(queries) <= 2
+    """
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(sqlite_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(sqlite_engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
+
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    path = tmp_path / "uploads"
+    path.mkdir()
+    monkeypatch.setattr(get_settings(), "storage_dir", str(path))
+    return path
+
+
+@pytest.fixture
+def api_client(session_factory, storage_dir):
+    """
+    TestClient bound to the SQLite database. Used without a context manager so
+    the MySQL start-up lifespan (and its background services) does not run.
+    """
+    from main import app
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def admin_user(session_factory):
+    with session_factory() as db:
+        user = User(
+            username="admin",
+            email="admin@example.com",
+            hashed_password=get_password_hash("admin123"),
+            role="admin",
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        return user
+
+
+@pytest.fixture
+def admin_headers(admin_user):
+    token = create_access_token({"sub": admin_user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class WebDAVStandIn(BaseHTTPRequestHandler):
+    """
+    A small in-memory WebDAV server with the parts of the Nextcloud API the
+    sync code uses: HEAD/GET/PUT/MKCOL/PROPFIND/MOVE, including chunked
+    upload sessions assembled by MOVE of ``<session>/.file``.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def dav(self):
+        return self.server.dav
+
+    def _path(self, url=None):
+        return unquote(urlparse(url or self.path).path).rstrip('/') or '/'
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _reply(self, status, body=b'', content_type='text/plain'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _record(self):
+        self.dav.requests.append((self.command, self._path()))
+
+    def do_HEAD(self):
+        self._record()
+        path = self._path()
+        self._reply(200 if path in self.dav.files or path in self.dav.dirs else 404)
+
+    def do_GET(self):
+        self._record()
+        path = self._path()
+        if path not in self.dav.files:
+            return self._reply(404)
+        self._reply(200, self.dav.files[path], 'application/octet-stream')
+
+    def do_PUT(self):
+        self._record()
+        data = self._body()
+        path = self._path()
+        if self.dav.fail_puts:
+            self.dav.fail_puts -= 1
+            return self._reply(503)
+        if path.rsplit('/', 1)[0] not in self.dav.dirs:
+            return self._reply(409)
+        self.dav.files[path] = data
+        self._reply(201)
+
+    def do_MKCOL(self):
+        self._record()
+        self._body()
+        path = self._path()
+        if path in self.dav.dirs:
+            return self._reply(405)
+        if path.rsplit('/', 1)[0] not in self.dav.dirs:
+            return self._reply(409)
+        self.dav.dirs.add(path)
+        self._reply(201)
+
+    def do_PROPFIND(self):
+        self._record()
+        self._body()
+        path = self._path()
+        if path not in self.dav.dirs and path not in self.dav.files:
+            return self._reply(404)
+        items = [(path, path in self.dav.dirs, self.dav.files.get(path, b''))]
+        if path in self.dav.dirs and self.headers.get('Depth', '1') != '0':
+            prefix = path.rstrip('/') + '/'
+            for d in sorted(self.dav.dirs):
+                if d.startswith(prefix) and '/' not in d[len(prefix):]:
+                    items.append((d, True, b''))
+            for f, data in sorted(self.dav.files.items()):
+                if f.startswith(prefix) and '/' not in f[len(prefix):]:
+                    items.append((f, False, data))
+        responses = []
+        for item, is_dir, data in items:
+            href = quote(item) + ('/' if is_dir else '')
+            prop = '<d:resourcetype><d:collection/></d:resourcetype>' if is_dir else (
+                f'<d:resourcetype/><d:getcontentlength>{len(data)}</d:getcontentlength>'
+            )
+            responses.append(
+                f'<d:response><d:href>{href}</d:href><d:propstat><d:prop>{prop}</d:prop>'
+                f'<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>'
+            )
+        body = '<?xml version="1.0"?><d:multistatus xmlns:d="DAV:">' + ''.join(responses) + '</d:multistatus>'
+        self._reply(207, body.encode(), 'application/xml')
+
+    def do_MOVE(self):
+        self._record()
+        self._body()
+        path = self._path()
+        destination = self._path(self.headers['Destination'])
+        if path.endswith('/.file'):
+            # Chunked upload: assemble the session's chunks in name order
+            session = path[:-len('/.file')]
+            prefix = session + '/'
+            names = sorted(f for f in self.dav.files if f.startswith(prefix))
+            data = b''.join(self.dav.files.pop(name) for name in names)
+            expected = self.headers.get('OC-Total-Length')
+            if expected is not None and int(expected) != len(data):
+                return self._reply(400)
+            self.dav.dirs.discard(session)
+        elif path in self.dav.files:
+            data = self.dav.files.pop(path)
+        else:
+            return self._reply(404)
+        self.dav.files[destination] = data
+        self._reply(201)
+
+
+class WebDAVState:
+    def __init__(self):
+        self.files = {}
+        self.dirs = {'/'}
+        self.requests = []
+        # Fail this many PUTs with 503, e.g. to simulate a dropped upload
+        self.fail_puts = 0
+
+    def makedirs(self, path):
+        parts = [p for p in path.split('/') if p]
+        for depth in range(1, len(parts) + 1):
+            self.dirs.add('/' + '/'.join(parts[:depth]))
+
+
+@pytest.fixture
+def webdav_server():
+    """In-memory WebDAV stand-in for Nextcloud; yields (base_url, state)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WebDAVStandIn)
+    server.dav = WebDAVState()
+    server.dav.makedirs('/remote.php/dav/files/dms')
+    server.dav.makedirs('/remote.php/dav/uploads/dms')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", server.dav
+    server.shutdown()
+    server.server_close()
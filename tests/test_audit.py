@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+from app.models.audit_log import AuditLog
+from app.models.user import User
+
+
+def seed_logs(session_factory, admin_user, count=120):
+    base = datetime(2026, 1, 1)
+    with session_factory() as db:
+        other = User(username="clerk", email="clerk@example.com", hashed_password="x")
+        db.add(other)
+        db.flush()
+        for i in range(count):
+            db.add(AuditLog(
+                user_id=admin_user.id if i % 2 else other.id,
+                action="DOCUMENT_VIEWED",
+                # Groups of three share a timestamp to exercise the id tie-breaker
+                timestamp=base + timedelta(minutes=i // 3),
+            ))
+        db.commit()
+        return other.id
+
+
+def collect_pages(api_client, headers, url, limit):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = api_client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        ids.extend(row["id"] for row in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids
+
+
+def test_cursor_pagination_visits_every_row_once(api_client, admin_headers, admin_user, session_factory):
+    seed_logs(session_factory, admin_user)
+    with session_factory() as db:
+        expected = [
+            row.id for row in
+            db.query(AuditLog).order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
+        ]
+
+    assert collect_pages(api_client, admin_headers, "/api/audit/", limit=25) == expected
+
+
+def test_user_filter_with_cursor(api_client, admin_headers, admin_user, session_factory):
+    other_id = seed_logs(session_factory, admin_user)
+    ids = collect_pages(api_client, admin_headers, f"/api/audit/user/{other_id}", limit=7)
+    assert len(ids) == 60
+    assert len(set(ids)) == 60
+
+
+def test_invalid_cursor_is_rejected(api_client, admin_headers):
+    response = api_client.get("/api/audit/", params={"cursor": "not-a-cursor"}, headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_audit_list_loads_users_without_n_plus_one(api_client, admin_headers, admin_user, session_factory,
+                                                    count_queries):
+    seed_logs(session_factory, admin_user, count=40)
+
+    with count_queries() as queries:
+        response = api_client.get("/api/audit/", params={"limit": 40}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert all(row["user"] is not None for row in response.json())
+    assert len(queries) <= 2
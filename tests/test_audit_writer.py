@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from app.models.audit_log import AuditLog
+from app.models.user import User
+from app.services.audit_writer import QUARANTINE_FILE, AuditWriter
+
+
+class BrokenSession:
+    def execute(self, *args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_user(session_factory):
+    with session_factory() as db:
+        user = User(username="clerk", email="clerk@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+def audit_count(session_factory):
+    with session_factory() as db:
+        return db.query(AuditLog).count()
+
+
+def test_events_are_bulk_inserted_and_flushed_on_stop(session_factory, tmp_path):
+    user_id = make_user(session_factory)
+    writer = AuditWriter(session_factory, flush_interval_ms=50, batch_size=100, spill_dir=str(tmp_path))
+    writer.start()
+    for i in range(250):
+        writer.enqueue(user_id, "DOCUMENT_VIEWED", details=f"view {i}")
+    writer.stop()
+
+    assert audit_count(session_factory) == 250
+    assert writer.written == 250
+    assert not os.path.exists(writer.spill_path)
+
+
+def test_failed_flush_spills_and_replays_on_next_start(session_factory, tmp_path):
+    user_id = make_user(session_factory)
+
+    broken = AuditWriter(BrokenSession, flush_interval_ms=20, batch_size=10, spill_dir=str(tmp_path))
+    broken.start()
+    for _ in range(25):
+        broken.enqueue(user_id, "DOCUMENT_DOWNLOADED")
+    broken.stop()
+    assert broken.spilled == 25
+    assert audit_count(session_factory) == 0
+
+    writer = AuditWriter(session_factory, flush_interval_ms=20, batch_size=10, spill_dir=str(tmp_path))
+    writer.start()
+    writer.stop()
+    assert audit_count(session_factory) == 25
+    assert not os.path.exists(writer.spill_path)
+
+
+def test_full_queue_spills_instead_of_blocking(session_factory, tmp_path):
+    user_id = make_user(session_factory)
+    writer = AuditWriter(session_factory, max_queue=5, spill_dir=str(tmp_path))
+
+    # Not started: nothing drains the queue, so the overflow goes to disk
+    for _ in range(8):
+        writer.enqueue(user_id, "USER_LOGIN")
+    assert writer.spilled == 3
+
+    writer.start()
+    writer.stop()
+    assert audit_count(session_factory) == 8
+
+
+def spill_events(writer, user_id, actions):
+    writer._spill([
+        {'user_id': user_id, 'action': action, 'document_id': None, 'details': None,
+         'timestamp': datetime.utcnow()}
+        for action in actions
+    ])
+
+
+def test_rejected_spilled_events_are_quarantined(session_factory, tmp_path):
+    user_id = make_user(session_factory)
+    writer = AuditWriter(session_factory, batch_size=10, spill_dir=str(tmp_path))
+    # action is NOT NULL: the database refuses that one event however often it is retried
+    spill_events(writer, user_id, ["USER_LOGIN", None, "USER_LOGOUT"])
+
+    writer._replay_spill()
+
+    assert audit_count(session_factory) == 2
+    assert not os.path.exists(writer.spill_path)
+    with open(tmp_path / QUARANTINE_FILE) as f:
+        assert [json.loads(line)['action'] for line in f] == [None]
+
+    # Nothing is retried on the next replay
+    writer._replay_spill()
+    assert audit_count(session_factory) == 2
+
+
+def test_unreachable_database_keeps_the_spill_for_later(session_factory, tmp_path):
+    user_id = make_user(session_factory)
+    broken = AuditWriter(BrokenSession, batch_size=10, spill_dir=str(tmp_path))
+    spill_events(broken, user_id, ["USER_LOGIN"] * 3)
+
+    broken._replay_spill()
+    assert not os.path.exists(tmp_path / QUARANTINE_FILE)
+
+    writer = AuditWriter(session_factory, batch_size=10, spill_dir=str(tmp_path))
+    spill_events(writer, user_id, ["USER_LOGOUT"])
+    writer._replay_spill()
+    with session_factory() as db:
+        assert [row.action for row in db.query(AuditLog).order_by(AuditLog.id)] == ["USER_LOGIN"] * 3 + ["USER_LOGOUT"]
+
+
+def test_spilling_does_not_wait_for_a_slow_replay(session_factory, tmp_path):
+    user_id = make_user(session_factory)
+    inserting, release = threading.Event(), threading.Event()
+
+    def slow_session():
+        db = session_factory()
+        execute = db.execute
+
+        def slow_execute(*args, **kwargs):
+            inserting.set()
+            release.wait(10)
+            return execute(*args, **kwargs)
+
+        db.execute = slow_execute
+        return db
+
+    writer = AuditWriter(slow_session, max_queue=1, batch_size=10, spill_dir=str(tmp_path))
+    spill_events(writer, user_id, ["USER_LOGIN"])
+    replay = threading.Thread(target=writer._replay_spill)
+    replay.start()
+    assert inserting.wait(10)
+
+    started = time.monotonic()
+    for _ in range(3):
+        writer.enqueue(user_id, "DOCUMENT_VIEWED")  # queue holds one, the rest spill
+    assert time.monotonic() - started < 1
+
+    release.set()
+    replay.join(10)
+    writer._replay_spill()
+    assert audit_count(session_factory) == 3
@@ -0,0 +1,264 @@
+import io
+import json
+import os
+import threading
+import zipfile
+
+import pytest
+
+from app.services.backup import MANIFEST_NAME, BackupError, BackupService, BackupStream
+from app.services.file_index import file_sha256
+from app.services.job_handlers import job_runner
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def members(result):
+    with zipfile.ZipFile(result['path']) as zipf:
+        return sorted(name for name in zipf.namelist() if name != MANIFEST_NAME)
+
+
+def test_incremental_backups_store_only_changes(storage_dir):
+    write(storage_dir / "DOC-1.pdf", b"one")
+    write(storage_dir / "templates/letter.docx", b"template")
+
+    first = BackupService.create_backup()
+    assert first['type'] == 'full'
+    assert members(first) == ["DOC-1.pdf", "templates/letter.docx"]
+
+    write(storage_dir / "DOC-2.pdf", b"two")
+    st = os.stat(storage_dir / "DOC-1.pdf")
+    os.utime(storage_dir / "DOC-1.pdf", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # touched, same content
+    second = BackupService.create_backup()
+
+    assert (second['type'], second['parent']) == ('incremental', first['backup_file'])
+    assert members(second) == ["DOC-2.pdf"]
+    assert (second['files'], second['files_stored']) == (3, 1)
+    # Backups never include themselves
+    assert not any(name.startswith("backups/") for name in members(second))
+
+    listed = BackupService.list_backups()
+    assert [item['name'] for item in listed] == [second['backup_file'], first['backup_file']]
+    assert listed[0]['chain'] == [first['backup_file'], second['backup_file']]
+    assert listed[0]['restorable']
+    assert listed[0]['chain_bytes'] == listed[0]['size'] + listed[1]['size']
+
+    third = BackupService.create_backup(full=True)
+    assert third['type'] == 'full' and third['files_stored'] == 3
+
+
+def test_restore_walks_the_chain(storage_dir):
+    write(storage_dir / "DOC-1.pdf", b"one")
+    BackupService.create_backup()
+    write(storage_dir / "DOC-2.pdf", b"two")
+    write(storage_dir / "DOC-1.pdf", b"one, edited")
+    second = BackupService.create_backup()
+
+    os.remove(storage_dir / "DOC-1.pdf")
+    os.remove(storage_dir / "DOC-2.pdf")
+    result = BackupService.restore_backup(second['backup_file'])
+
+    assert result['files_restored'] == 2
+    assert (storage_dir / "DOC-1.pdf").read_bytes() == b"one, edited"
+    assert (storage_dir / "DOC-2.pdf").read_bytes() == b"two"
+
+
+def test_restore_refuses_a_broken_chain(storage_dir):
+    write(storage_dir / "DOC-1.pdf", b"one")
+    first = BackupService.create_backup()
+    write(storage_dir / "DOC-2.pdf", b"two")
+    second = BackupService.create_backup()
+    os.remove(first['path'])
+
+    assert not BackupService.list_backups()[0]['restorable']
+    with pytest.raises(BackupError):
+        BackupService.restore_backup(second['backup_file'])
+    # With its parent gone the next backup starts a new chain
+    assert BackupService.create_backup()['type'] == 'full'
+
+
+def test_legacy_archives_restore_storage_relative_paths(storage_dir):
+    backup_dir = storage_dir / "backups"
+    backup_dir.mkdir()
+    with zipfile.ZipFile(backup_dir / "DMS_Backup_20250101_000000.zip", "w") as zipf:
+        zipf.writestr("DOC-1.pdf", b"old pdf")
+        zipf.writestr("templates/letter.docx", b"old template")
+
+    result = BackupService.restore_backup("DMS_Backup_20250101_000000.zip")
+
+    assert result['files_restored'] == 2
+    assert (storage_dir / "DOC-1.pdf").read_bytes() == b"old pdf"
+    assert (storage_dir / "templates/letter.docx").read_bytes() == b"old template"
+    assert BackupService.list_backups()[0]['type'] == 'legacy'
+
+
+def test_restore_endpoint(api_client, admin_headers, storage_dir):
+    write(storage_dir / "DOC-1.pdf", b"one")
+    name = BackupService.create_backup()['backup_file']
+    os.remove(storage_dir / "DOC-1.pdf")
+
+    response = api_client.post("/api/admin/backup/restore", json={"backup_file": name}, headers=admin_headers)
+
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    job_runner.wait(job_id, timeout=30)
+    job = api_client.get(f"/api/admin/jobs/{job_id}", headers=admin_headers).json()
+    assert job["status"] == "succeeded" and job["result"]["files_restored"] == 1
+    assert (storage_dir / "DOC-1.pdf").read_bytes() == b"one"
+    assert api_client.post("/api/admin/backup/restore", json={"backup_file": "../x.zip"},
+                           headers=admin_headers).status_code == 400
+
+
+def test_only_compressible_files_are_deflated(storage_dir, monkeypatch):
+    import app.services.backup as backup_module
+    # Stream the big log through the writer instead of prefetching it
+    monkeypatch.setattr(backup_module, "PREFETCH_MAX_BYTES", 1024)
+    write(storage_dir / "DOC-1.pdf", b"%PDF-1.7 " * 200)
+    write(storage_dir / "random.bin", os.urandom(4096))
+    write(storage_dir / "logs/app.log", b"INFO request handled\n" * 500)
+
+    result = BackupService.create_backup()
+
+    with zipfile.ZipFile(result['path']) as zipf:
+        kinds = {info.filename: info.compress_type for info in zipf.infolist()}
+        assert zipf.read("logs/app.log") == b"INFO request handled\n" * 500
+    assert kinds["DOC-1.pdf"] == zipfile.ZIP_STORED
+    assert kinds["random.bin"] == zipfile.ZIP_STORED
+    assert kinds["logs/app.log"] == zipfile.ZIP_DEFLATED
+    assert result['files_compressed'] == 1
+    assert set(result['timings']) == {'scan_seconds', 'plan_seconds', 'write_seconds', 'finalize_seconds'}
+    manifest = BackupService.read_manifest(result['path'])
+    assert manifest['files']['logs/app.log']['sha256'] == file_sha256(str(storage_dir / "logs/app.log"))
+
+
+def test_small_files_are_deflated_on_the_worker_pool(storage_dir, monkeypatch):
+    import app.services.backup as backup_module
+    threads = []
+    raw_deflate = backup_module.raw_deflate
+
+    def recording_deflate(data):
+        threads.append(threading.current_thread().name)
+        return raw_deflate(data)
+
+    monkeypatch.setattr(backup_module, "raw_deflate", recording_deflate)
+    for i in range(8):
+        write(storage_dir / f"notes/{i}.txt", f"note {i}\n".encode() * 300)
+
+    result = BackupService.create_backup()
+
+    assert len(threads) == 8 and threading.main_thread().name not in threads
+    with zipfile.ZipFile(result['path']) as zipf:
+        assert zipf.testzip() is None
+        assert {info.compress_type for info in zipf.infolist() if info.filename.startswith("notes/")} == {
+            zipfile.ZIP_DEFLATED}
+        assert zipf.read("notes/3.txt") == b"note 3\n" * 300
+
+
+def test_tar_zst_backups_restore(storage_dir):
+    pytest.importorskip("zstandard")
+    write(storage_dir / "DOC-1.pdf", b"one")
+    first = BackupService.create_backup(fmt='tar.zst')
+    write(storage_dir / "DOC-2.pdf", b"two")
+    second = BackupService.create_backup(fmt='tar.zst')
+
+    assert second['backup_file'].endswith('.tar.zst') and second['files_stored'] == 1
+    assert BackupService.list_backups()[0]['chain'] == [first['backup_file'], second['backup_file']]
+    os.remove(storage_dir / "DOC-1.pdf")
+    BackupService.restore_backup(second['backup_file'])
+    assert (storage_dir / "DOC-1.pdf").read_bytes() == b"one"
+
+
+def test_streamed_backup_is_a_complete_archive(storage_dir, api_client, admin_headers):
+    write(storage_dir / "DOC-1.pdf", b"one")
+    write(storage_dir / "logs/app.log", b"log line\n" * 1000)
+    BackupService.create_backup()
+
+    response = api_client.get("/api/admin/backup/stream", headers=admin_headers)
+
+    assert response.status_code == 200
+    name = response.headers["content-disposition"].split('"')[1]
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zipf:
+        assert zipf.read("DOC-1.pdf") == b"one"
+        # Deflated ahead on the worker pool, written without seeking back
+        assert zipf.getinfo("logs/app.log").compress_type == zipfile.ZIP_DEFLATED
+        assert zipf.read("logs/app.log") == b"log line\n" * 1000
+        manifest = json.loads(zipf.read(MANIFEST_NAME))
+    assert manifest['type'] == 'full' and set(manifest['files']) == {"DOC-1.pdf", "logs/app.log"}
+    # Not kept on the server unless asked for
+    assert name not in os.listdir(storage_dir / "backups")
+
+
+def test_streamed_backup_can_be_saved(storage_dir):
+    write(storage_dir / "DOC-1.pdf", b"one")
+    stream = BackupStream(save=True).start()
+    data = b"".join(stream)
+
+    assert (storage_dir / "backups" / stream.name).read_bytes() == data
+    assert BackupService.list_backups()[0]['type'] == 'full'
+
+
+def test_cancelled_stream_stops_and_keeps_nothing(storage_dir, monkeypatch):
+    import app.services.backup as backup_module
+    monkeypatch.setattr(backup_module, "STREAM_CHUNK_SIZE", 1024)
+    monkeypatch.setattr(backup_module, "STREAM_QUEUE_CHUNKS", 2)
+    for i in range(20):
+        write(storage_dir / f"DOC-{i}.bin", os.urandom(64 * 1024))
+
+    stream = BackupStream(save=True).start()
+    assert stream.next_chunk()
+    stream.cancel()
+    stream._thread.join(timeout=10)
+
+    assert not stream._thread.is_alive()
+    assert os.listdir(storage_dir / "backups") == []
+
+
+def test_failed_close_surfaces_its_own_error(storage_dir, monkeypatch):
+    import app.services.backup as backup_module
+    write(storage_dir / "DOC-1.pdf", b"one")
+    open_writer = backup_module.open_writer
+
+    def failing_writer(*args, **kwargs):
+        writer = open_writer(*args, **kwargs)
+        real_close = writer.close
+
+        def close():
+            real_close()
+            raise OSError("disk full")
+
+        writer.close = close
+        return writer
+
+    monkeypatch.setattr(backup_module, "open_writer", failing_writer)
+    with pytest.raises(OSError, match="disk full"):
+        BackupService.create_backup()
+
+    assert os.listdir(storage_dir / "backups") == []
+
+
+def test_restore_verifies_before_replacing(storage_dir, monkeypatch):
+    import app.services.backup as backup_module
+    monkeypatch.setattr(backup_module.settings, "backup_workers", 3)
+    for i in range(10):
+        write(storage_dir / f"DOC-{i}.pdf", f"document {i}".encode())
+    result = BackupService.create_backup()
+    reports = []
+
+    restored = BackupService.restore_backup(result['backup_file'], progress=lambda *args: reports.append(args))
+
+    assert (restored['files_restored'], restored['bytes_restored']) == (10, result['total_bytes'])
+    assert reports[-1][:2] == (10, 10) and "MB/s" in reports[-1][2]
+
+    # A member that does not match the manifest never replaces the current file
+    manifest = BackupService.read_manifest(result['path'])
+    manifest['files']['DOC-3.pdf']['sha256'] = '0' * 64
+    with zipfile.ZipFile(result['path'], 'a') as zipf, pytest.warns(UserWarning, match="Duplicate name"):
+        zipf.writestr(MANIFEST_NAME, json.dumps(manifest))
+    write(storage_dir / "DOC-3.pdf", b"current")
+    with pytest.raises(BackupError, match="Checksum mismatch"):
+        BackupService.restore_backup(result['backup_file'])
+    assert (storage_dir / "DOC-3.pdf").read_bytes() == b"current"
+    assert not any(name.endswith('.restore') for name in os.listdir(storage_dir))
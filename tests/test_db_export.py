@@ -0,0 +1,170 @@
+import io
+import zipfile
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func, select
+
+import app.services.db_export as db_export
+from app.models.audit_log import AuditLog
+from app.models.document import Document
+from app.models.document_sequence import DocumentSequence
+from app.models.job import Job
+from app.models.sync_state import SyncState
+from app.models.user import User
+from app.services.backup import BackupError, BackupService
+from app.services.job_handlers import job_runner
+from app.services.db_export import EXPORT_TABLES, DatabaseExportService
+
+
+def populate(session_factory, documents=25):
+    with session_factory() as db:
+        user = User(username="alice", email="alice@example.com", hashed_password="x", role="user")
+        db.add(user)
+        db.flush()
+        for i in range(documents):
+            db.add(Document(document_number=f"DOC-{i:04d}", title=f"Doc {i}", requested_by_id=user.id,
+                            created_at=datetime(2026, 1, 2, 3, 4, 5, i), file_path=f"/old/DOC-{i}.pdf",
+                            file_name=f"DOC-{i}.pdf"))
+            db.add(AuditLog(user_id=user.id, action="create", details=f"created {i}"))
+        db.add(DocumentSequence(sequence_date=date(2026, 1, 2), last_number=documents))
+        db.commit()
+
+
+def export_all(engine):
+    outputs = {}
+
+    def open_output(table):
+        outputs[table.name] = io.BytesIO()
+        return outputs[table.name]
+
+    counts = DatabaseExportService.export_tables(engine, open_output)
+    return counts, outputs
+
+
+def test_export_and_import_round_trip_in_chunks(sqlite_engine, session_factory, monkeypatch):
+    monkeypatch.setattr(db_export, "EXPORT_CHUNK_SIZE", 7)
+    monkeypatch.setattr(db_export, "IMPORT_BATCH_SIZE", 4)
+    populate(session_factory)
+    counts, outputs = export_all(sqlite_engine)
+    assert (counts['documents'], counts['audit_logs'], counts['users']) == (25, 25, 1)
+
+    with session_factory() as db:
+        db.query(Document).filter(Document.id > 10).delete()
+        db.commit()
+    imported = DatabaseExportService.import_tables(
+        sqlite_engine, [(name, io.BytesIO(out.getvalue())) for name, out in outputs.items()])
+
+    assert imported == counts
+    with session_factory() as db:
+        assert db.scalar(select(func.count(Document.id))) == 25
+        last = db.get(Document, 25)
+        assert last.created_at == datetime(2026, 1, 2, 3, 4, 5, 24)
+        assert db.scalars(select(DocumentSequence.sequence_date)).one() == date(2026, 1, 2)
+
+
+def test_backup_carries_the_database(storage_dir, sqlite_engine, session_factory):
+    populate(session_factory, documents=3)
+    (storage_dir / "DOC-1.pdf").write_bytes(b"pdf")
+    result = BackupService.create_backup(bind=sqlite_engine)
+
+    with zipfile.ZipFile(result['path']) as zipf:
+        assert {f".database/{table.name}.jsonl.gz" for table in EXPORT_TABLES} <= set(zipf.namelist())
+    assert BackupService.read_manifest(result['path'])['database']['tables']['documents']['rows'] == 3
+    assert BackupService.list_backups()[0]['database']
+
+    with session_factory() as db:
+        db.query(AuditLog).delete()
+        db.query(Document).delete()
+        db.commit()
+    restored = BackupService.restore_backup(result['backup_file'], bind=sqlite_engine)
+
+    assert restored['database']['documents'] == 3
+    with session_factory() as db:
+        assert db.scalar(select(func.count(AuditLog.id))) == 3
+
+
+def test_broken_table_export_rolls_the_load_back(storage_dir, sqlite_engine, session_factory):
+    populate(session_factory, documents=3)
+    result = BackupService.create_backup(bind=sqlite_engine)
+    manifest = BackupService.read_manifest(result['path'])
+    tables = manifest['database']['tables']
+    tables['audit_logs']['sha256'] = '0' * 64
+
+    with session_factory() as db:
+        db.query(AuditLog).filter(AuditLog.id == 1).delete()
+        db.commit()
+    with pytest.raises(BackupError, match="audit_logs"):
+        BackupService._restore_database(sqlite_engine, result['backup_file'], manifest['database'])
+
+    with session_factory() as db:
+        assert db.scalar(select(func.count(AuditLog.id))) == 2
+        assert db.scalar(select(func.count(Document.id))) == 3
+
+
+def test_restore_keeps_jobs_and_sync_state(storage_dir, sqlite_engine, session_factory):
+    populate(session_factory, documents=1)
+    result = BackupService.create_backup(bind=sqlite_engine)
+
+    with session_factory() as db:
+        bob = User(username="bob", email="bob@example.com", hashed_password="x", role="user")
+        db.add(bob)
+        db.flush()
+        db.add_all([Job(kind="sync_local", created_by_id=1), Job(kind="sync_local", created_by_id=bob.id),
+                    SyncState(destination="local", path="DOC-0.pdf", size=3, mtime_ns=1, content_hash="h")])
+        db.commit()
+    BackupService.restore_backup(result['backup_file'], bind=sqlite_engine)
+
+    with session_factory() as db:
+        assert db.scalars(select(User.username)).all() == ["alice"]
+        # Bob is gone, so his job no longer names a creator; Alice's keeps hers
+        assert db.scalars(select(Job.created_by_id).order_by(Job.id)).all() == [1, None]
+        assert db.scalar(select(func.count(SyncState.id))) == 1
+
+
+def test_restore_endpoint_replaces_the_database_only_when_asked(api_client, admin_headers, sqlite_engine,
+                                                                session_factory):
+    populate(session_factory, documents=2)
+    name = BackupService.create_backup(bind=sqlite_engine)['backup_file']
+    with session_factory() as db:
+        db.query(AuditLog).delete()
+        db.commit()
+
+    def restore(**body):
+        response = api_client.post("/api/admin/backup/restore", json={"backup_file": name, **body},
+                                   headers=admin_headers)
+        assert response.status_code == 202
+        job_runner.wait(response.json()["job_id"], timeout=30)
+        with session_factory() as db:
+            job = db.get(Job, response.json()["job_id"])
+            assert job.status == "succeeded", job.error
+            return job.result, db.scalar(select(func.count(AuditLog.id)))
+
+    result, audit_rows = restore()
+    assert result['database'] is None
+    assert audit_rows == 0
+    result, audit_rows = restore(database=True)
+    assert result['database']['audit_logs'] == 2
+    assert audit_rows == 2
+
+
+def test_missing_table_member_rolls_the_load_back(storage_dir, sqlite_engine, session_factory, monkeypatch):
+    populate(session_factory, documents=3)
+    result = BackupService.create_backup(bind=sqlite_engine)
+    manifest = BackupService.read_manifest(result['path'])
+    read_members = BackupService._read_members
+
+    def truncated(archive_path, names):
+        # As a cut-off archive reads: the last members are simply not there
+        return read_members(archive_path, [name for name in names if "audit_logs" not in name])
+
+    monkeypatch.setattr(BackupService, "_read_members", staticmethod(truncated))
+    with session_factory() as db:
+        db.query(Document).filter(Document.id == 1).delete()
+        db.commit()
+    with pytest.raises(BackupError, match="missing database tables: audit_logs"):
+        BackupService._restore_database(sqlite_engine, result['backup_file'], manifest['database'])
+
+    with session_factory() as db:
+        assert db.scalar(select(func.count(Document.id))) == 2
+        assert db.scalar(select(func.count(AuditLog.id))) == 3
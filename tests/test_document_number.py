@@ -0,0 +1,70 @@
+import threading
+from datetime import date
+
+from app.models.document_sequence import DocumentSequence
+from app.services.document_number import DocumentNumberService, NumberBlockAllocator
+
+THREADS = 8
+PER_THREAD = 25
+
+
+def run_concurrently(worker):
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def target(index):
+        try:
+            numbers = worker(index)
+            with lock:
+                results.extend(numbers)
+        except Exception as e:  # pragma: no cover - surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, errors
+    return results
+
+
+def last_number(session_factory):
+    with session_factory() as db:
+        return db.query(DocumentSequence).one().last_number
+
+
+def test_concurrent_allocation_has_no_duplicates_or_gaps(session_factory):
+    def worker(_):
+        numbers = []
+        with session_factory() as db:
+            for _ in range(PER_THREAD):
+                numbers.append(DocumentNumberService.generate_document_number(db))
+        return numbers
+
+    numbers = run_concurrently(worker)
+
+    total = THREADS * PER_THREAD
+    prefix = f"DOC-{date.today().strftime('%Y%m%d')}-"
+    assert sorted(numbers) == [f"{prefix}{n:04d}" for n in range(1, total + 1)]
+    assert last_number(session_factory) == total
+
+
+def test_block_reservation_gaps_are_bounded(session_factory):
+    block_size, workers = 10, 4
+    # Each allocator stands in for one worker process; two threads share each
+    allocators = [NumberBlockAllocator(block_size) for _ in range(workers)]
+    today = date.today()
+
+    def worker(index):
+        allocator = allocators[index % workers]
+        with session_factory() as db:
+            return [allocator.allocate(db, today) for _ in range(PER_THREAD)]
+
+    numbers = run_concurrently(worker)
+
+    issued = len(numbers)
+    highest = last_number(session_factory)
+    assert len(set(numbers)) == issued
+    assert max(numbers) <= highest
+    assert highest - issued <= workers * (block_size - 1)
@@ -0,0 +1,141 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app.models.audit_log import AuditLog
+from app.models.document import Document
+from app.models.document_sequence import DocumentSequence
+from app.models.user import User
+from app.services.render_engine import render_engine
+
+
+def create(api_client, headers, title="Letter"):
+    return api_client.post(
+        "/api/documents/",
+        json={"title": title, "content": "<p>Hello</p>"},
+        headers=headers,
+    )
+
+
+def test_create_document_commits_number_then_document(api_client, admin_headers, sqlite_engine,
+                                                       session_factory):
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(sqlite_engine, "commit", on_commit)
+    try:
+        response = create(api_client, admin_headers)
+    finally:
+        event.remove(sqlite_engine, "commit", on_commit)
+
+    assert response.status_code == 201
+    assert response.json()["requested_by"]["username"] == "admin"
+    # The number in its own short transaction, then the document, audit row and index together
+    assert len(commits) == 2
+
+    with session_factory() as db:
+        document = db.query(Document).one()
+        assert os.path.exists(document.file_path)
+        audit = db.query(AuditLog).filter(AuditLog.action == "DOCUMENT_CREATED").one()
+        assert audit.document_id == document.id
+        assert db.query(DocumentSequence).one().last_number == 1
+
+
+def test_failed_render_does_not_burn_a_number(api_client, admin_headers, session_factory, monkeypatch):
+    async def broken_render(**kwargs):
+        raise RuntimeError("renderer crashed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(render_engine, "render", broken_render)
+        with pytest.raises(RuntimeError):
+            create(api_client, admin_headers)
+
+    with session_factory() as db:
+        assert db.query(Document).count() == 0
+        # The number was given back, as no later one had been issued
+        assert db.query(DocumentSequence).one().last_number == 0
+
+    response = create(api_client, admin_headers)
+    assert response.status_code == 201
+    assert response.json()["document_number"].endswith("-0001")
+
+
+def test_failed_render_after_a_later_number_leaves_a_gap(api_client, admin_headers, session_factory,
+                                                        monkeypatch):
+    async def render(**kwargs):
+        if kwargs["title"] == "Broken":
+            # Another create takes the next number while this one renders
+            assert create(api_client, admin_headers, title="Other").status_code == 201
+            raise RuntimeError("renderer crashed")
+        return b"%PDF-1.4"
+
+    monkeypatch.setattr(render_engine, "render", render)
+    with pytest.raises(RuntimeError):
+        create(api_client, admin_headers, title="Broken")
+
+    with session_factory() as db:
+        assert [d.document_number[-4:] for d in db.query(Document)] == ["0002"]
+        assert db.query(DocumentSequence).one().last_number == 2
+
+
+def test_concurrent_creates_do_not_stall_the_event_loop(api_client, admin_headers, session_factory, monkeypatch):
+    async def slow_render(**kwargs):
+        await asyncio.sleep(0.5)
+        return b"%PDF-1.4 " + kwargs["document_number"].encode()
+
+    monkeypatch.setattr(render_engine, "render", slow_render)
+
+    async def create_two():
+        transport = httpx.ASGITransport(app=api_client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            requests = [
+                client.post("/api/documents/", json={"title": f"Letter {i}", "content": "<p>Hi</p>"},
+                            headers=admin_headers)
+                for i in range(2)
+            ]
+            # Far below the 30 s SQLite busy timeout a stalled loop would hit
+            return await asyncio.wait_for(asyncio.gather(*requests), timeout=10)
+
+    responses = asyncio.run(create_two())
+
+    assert [response.status_code for response in responses] == [201, 201]
+    numbers = sorted(response.json()["document_number"] for response in responses)
+    assert [number[-4:] for number in numbers] == ["0001", "0002"]
+    with session_factory() as db:
+        assert db.query(DocumentSequence).one().last_number == 2
+
+
+def seed_documents(session_factory, users=10, per_user=3):
+    with session_factory() as db:
+        for u in range(users):
+            user = User(username=f"user{u}", email=f"user{u}@example.com", hashed_password="x")
+            db.add(user)
+            db.flush()
+            for d in range(per_user):
+                number = f"DOC-20260101-{u * per_user + d + 1:04d}"
+                db.add(Document(
+                    document_number=number,
+                    title=f"Report {u}-{d}",
+                    requested_by_id=user.id,
+                    file_path=f"/tmp/{number}.pdf",
+                    file_name=f"{number}.pdf",
+                ))
+        db.commit()
+
+
+def test_list_documents_loads_users_without_n_plus_one(api_client, admin_headers, session_factory, count_queries):
+    seed_documents(session_factory)
+
+    with count_queries() as queries:
+        response = api_client.get("/api/documents/", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 30
+    assert all(doc["requested_by"]["username"].startswith("user") for doc in response.json())
+    # One lookup for the authenticated user, one for the page of documents
+    assert len(queries) <= 2
@@ -0,0 +1,87 @@
+from io import BytesIO
+
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, PageBreak, SimpleDocTemplate, Spacer, Table
+
+from app.services.html_flowables import HTMLFlowableConverter
+
+
+def convert(html):
+    return HTMLFlowableConverter.convert(html, getSampleStyleSheet())
+
+
+def paragraphs(elements):
+    return [e for e in elements if isinstance(e, Paragraph)]
+
+
+def test_paragraphs_headings_and_inline_markup():
+    elements = convert(
+        '<h1>Title</h1>'
+        '<p style="text-align: center">Hello <strong>bold</strong> &amp; <em>it</em>'
+        '<span style="font-family:Arial">span</span></p>'
+    )
+    heading, para = paragraphs(elements)
+    assert heading.getPlainText() == 'Title'
+    assert 'Hello bold & itspan' == para.getPlainText()
+    assert para.style.alignment == TA_CENTER
+
+
+def test_lists_are_numbered_and_nested_once():
+    elements = convert('<ol><li>One</li><li><p>Two</p><ul><li>Inner</li></ul></li></ol>')
+    texts = [p.getPlainText() for p in paragraphs(elements)]
+    assert texts == ['1. One', '2. Two', '• Inner']
+
+
+def test_table_cells_are_not_duplicated_as_paragraphs():
+    elements = convert(
+        '<figure class="table"><table><tr><th>Item</th><th>Cost</th></tr>'
+        '<tr><td><p>Widget</p></td><td>5</td></tr></table></figure>'
+    )
+    tables = [e for e in elements if isinstance(e, Table)]
+    assert len(tables) == 1
+    assert paragraphs(elements) == []
+    assert tables[0]._cellvalues[1][0].getPlainText() == 'Widget'
+
+
+def test_page_breaks_line_breaks_and_loose_text():
+    elements = convert(
+        'Loose text<br><div class="page-break" style="page-break-after:always">'
+        '<span style="display:none">&nbsp;</span></div><p>After</p>'
+    )
+    assert [type(e) for e in elements] == [Paragraph, Spacer, PageBreak, Paragraph]
+
+
+def test_unbalanced_markup_falls_back_to_plain_text():
+    elements = convert('<p><strong>never closed</p><script>ignored()</script>')
+    assert [p.getPlainText() for p in paragraphs(elements)] == ['never closed']
+
+
+def test_links_keep_their_target():
+    elements = convert(
+        '<p>See <a href="https://example.com/?a=1&amp;b=2">the <strong>site</strong></a> '
+        'and <a name="top">this anchor</a>.</p>'
+        '<table><tr><td><a href="mailto:ops@example.com">ops</a></td></tr></table>'
+    )
+    (para,) = paragraphs(elements)
+    assert para.getPlainText() == 'See the site and this anchor.'
+    links = {frag.text: frag.link for frag in para.frags}
+    assert links['the '] == links['site'] == [(0, 'https://example.com/?a=1&b=2')]
+    assert links['See '] == links[' and this anchor.'] == []
+    table = next(e for e in elements if isinstance(e, Table))
+    assert table._cellvalues[0][0].frags[0].link == [(0, 'mailto:ops@example.com')]
+
+
+def test_nested_tables_stay_inside_their_cell():
+    elements = convert(
+        '<table><tr><td>Before<table><tr><td>A</td><td>B</td></tr><tr><td>C</td></tr></table>'
+        'after</td><td>Right</td></tr><tr><td>Last</td></tr></table>'
+    )
+    (table,) = [e for e in elements if isinstance(e, Table)]
+    assert [len(row) for row in table._cellvalues] == [2, 2]
+    before, inner, after = table._cellvalues[0][0]
+    assert (before.getPlainText(), after.getPlainText()) == ('Before', 'after')
+    assert [[cell.getPlainText() for cell in row] for row in inner._cellvalues] == [['A', 'B'], ['C', '\xa0']]
+    assert table._cellvalues[0][1].getPlainText() == 'Right'
+    assert table._cellvalues[1][0].getPlainText() == 'Last'
+    SimpleDocTemplate(BytesIO()).build(elements)
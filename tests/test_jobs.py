@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.job import Job
+from app.services.job_handlers import job_runner
+from app.services.jobs import CronSchedule, JobRunner, JobScheduler, parse_schedules
+
+
+def test_cron_fields_ranges_lists_and_steps():
+    schedule = CronSchedule("*/15 8-17 * * 1-5")
+    assert schedule.matches(datetime(2026, 10, 19, 8, 45))      # Monday
+    assert not schedule.matches(datetime(2026, 10, 19, 8, 50))
+    assert not schedule.matches(datetime(2026, 10, 19, 18, 0))
+    assert not schedule.matches(datetime(2026, 10, 18, 9, 0))   # Sunday
+
+    # Both day fields restricted: either may match, as in cron
+    schedule = CronSchedule("0 2 1 * 0,7")
+    assert schedule.matches(datetime(2026, 10, 1, 2, 0))        # 1st, a Thursday
+    assert schedule.matches(datetime(2026, 10, 18, 2, 0))       # Sunday
+    assert not schedule.matches(datetime(2026, 10, 19, 2, 0))
+
+
+def test_invalid_schedules_are_rejected():
+    with pytest.raises(ValueError):
+        CronSchedule("* * * *")
+    with pytest.raises(ValueError):
+        CronSchedule("61 * * * *")
+    assert [kind for kind, _ in parse_schedules("backup=0 2 * * *; sync_local=*/30 * * * *")] == \
+        ["backup", "sync_local"]
+
+
+def test_scheduler_starts_each_run_once_and_skips_active_kinds(session_factory):
+    calls = []
+
+    def handler(ctx, params):
+        calls.append(params)
+        ctx.report(1, 1)
+        return {'success': True, 'message': 'done'}
+
+    runner = JobRunner(max_workers=1)
+    schedules = parse_schedules("backup=0 2 * * *")
+    make = lambda: JobScheduler(runner, schedules, {'backup': handler}, lambda kind: {'kind': kind},
+                                session_factory)
+    minute = datetime(2026, 10, 17, 2, 0)
+
+    started = make().tick(minute)
+    assert len(started) == 1
+    runner.wait(started[0].id)
+    # A second process reaching the same minute finds the run already claimed
+    assert make().tick(minute) == []
+    assert make().tick(datetime(2026, 10, 17, 2, 1)) == []
+
+    with session_factory() as db:
+        job = db.query(Job).one()
+        assert (job.status, job.schedule_key, job.progress_done) == ('succeeded', 'backup@2026-10-17T02:00', 1)
+        # A run still in progress holds back the next one
+        job.status = 'running'
+        db.commit()
+    assert make().tick(datetime(2026, 10, 18, 2, 0)) == []
+    assert calls == [{'kind': 'backup'}]
+    runner.shutdown()
+
+
+def test_local_sync_runs_as_a_job(api_client, admin_headers, storage_dir, tmp_path):
+    (storage_dir / "a.pdf").write_bytes(b"pdf")
+    target = tmp_path / "mirror"
+
+    response = api_client.post("/api/admin/sync/local",
+                               json={"sync_type": "documents", "target": str(target)}, headers=admin_headers)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    job_runner.wait(job_id, timeout=30)
+
+    job = api_client.get(f"/api/admin/jobs/{job_id}", headers=admin_headers).json()
+    assert job["status"] == "succeeded"
+    assert job["kind"] == "sync_local"
+    assert job["result"]["results"]["documents"]["log"]["files_synced"] == 1
+    assert (job["progress_done"], job["progress_total"]) == (1, 1)
+    assert (target / "a.pdf").read_bytes() == b"pdf"
+
+    listed = api_client.get("/api/admin/jobs/?kind=sync_local", headers=admin_headers).json()
+    assert [item["id"] for item in listed] == [job_id]
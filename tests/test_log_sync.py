@@ -0,0 +1,161 @@
+import gzip
+import os
+
+from app.services.log_sync import LogShipper, LogSyncStateStore
+
+
+class Remote:
+    def __init__(self):
+        self.files = {}
+
+    def upload(self, local_path, relative_path):
+        with open(local_path, 'rb') as f:
+            self.files[relative_path] = f.read()
+
+    def text(self, relative_path):
+        return gzip.decompress(self.files[relative_path]).decode()
+
+
+def ship(db, log_dir, remote):
+    return LogShipper(LogSyncStateStore(db, "test://remote"), remote.upload).ship(str(log_dir))
+
+
+def rotated(remote):
+    """Content of the whole-file uploads under rotated/, by local name."""
+    return {path[len("rotated/"):path.index("@")]: remote.text(path)
+            for path in remote.files if path.startswith("rotated/")}
+
+
+def append(path, text):
+    with open(path, 'a') as f:
+        f.write(text)
+
+
+def test_only_new_complete_lines_are_shipped(tmp_path, session_factory):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    app_log = log_dir / "app.log"
+    remote = Remote()
+
+    with session_factory() as db:
+        append(app_log, "one\ntwo\npart")
+        ship(db, log_dir, remote)
+        assert remote.text("app/app-000001.log.gz") == "one\ntwo\n"
+
+        # Nothing new: nothing sent
+        assert ship(db, log_dir, remote)['segments'] == []
+
+        append(app_log, "ial\nthree\n")
+        result = ship(db, log_dir, remote)
+        assert remote.text("app/app-000002.log.gz") == "partial\nthree\n"
+        assert result['bytes_read'] == len("partial\nthree\n")
+
+
+def test_rotation_ships_the_old_tail_once_and_follows_the_new_file(tmp_path, session_factory):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    app_log = log_dir / "app.log"
+    remote = Remote()
+
+    with session_factory() as db:
+        append(app_log, "a\n")
+        ship(db, log_dir, remote)
+
+        append(app_log, "b\n")
+        os.rename(app_log, log_dir / "app.log.1")
+        append(app_log, "c\n")
+        result = ship(db, log_dir, remote)
+
+        assert remote.text("app/app-000002.log.gz") == "b\n"
+        assert remote.text("app/app-000003.log.gz") == "c\n"
+        assert result['rotated'] == ["app.log.1"]
+        assert not any(path.startswith("rotated/") for path in remote.files)
+
+        # The rotated file is never looked at again
+        assert ship(db, log_dir, remote) == {
+            'segments': [], 'rotated': [], 'bytes_read': 0, 'bytes_sent': 0, 'errors': []
+        }
+
+
+def test_numbered_rotation_twice_loses_and_repeats_nothing(tmp_path, session_factory):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    app_log = log_dir / "app.log"
+    remote = Remote()
+
+    def rotate():
+        # RotatingFileHandler / logrotate numbering: every name shifts up by one
+        if (log_dir / "app.log.1").exists():
+            os.rename(log_dir / "app.log.1", log_dir / "app.log.2")
+        os.rename(app_log, log_dir / "app.log.1")
+
+    with session_factory() as db:
+        append(app_log, "a\n")
+        ship(db, log_dir, remote)
+        append(app_log, "b\n")
+        rotate()
+        append(app_log, "c\n")
+        ship(db, log_dir, remote)
+
+        append(app_log, "d\n")
+        rotate()
+        append(app_log, "e\n")
+        result = ship(db, log_dir, remote)
+
+        shipped = "".join(remote.text(path) for path in sorted(remote.files))
+        assert shipped == "a\nb\nc\nd\ne\n"
+        assert result['rotated'] == ["app.log.1"]
+
+        # A compressed copy of a file already shipped is not sent again
+        with open(log_dir / "app.log.2", 'rb') as f:
+            (log_dir / "app.log.3.gz").write_bytes(gzip.compress(f.read()))
+        os.remove(log_dir / "app.log.2")
+        assert ship(db, log_dir, remote)['bytes_sent'] == 0
+
+
+def test_unknown_rotated_files_are_uploaded_once(tmp_path, session_factory):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    (log_dir / "app.log-20260101").write_text("old\n")
+    (log_dir / "app.log.2.gz").write_bytes(gzip.compress(b"older\n"))
+    remote = Remote()
+
+    with session_factory() as db:
+        ship(db, log_dir, remote)
+        assert rotated(remote) == {"app.log-20260101": "old\n", "app.log.2": "older\n"}
+
+        remote.files.clear()
+        ship(db, log_dir, remote)
+        assert remote.files == {}
+
+
+def test_rotated_name_reused_for_another_file_keeps_both_uploads(tmp_path, session_factory):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    (log_dir / "app.log.1").write_text("a1\na2\na3\n")
+    remote = Remote()
+
+    with session_factory() as db:
+        ship(db, log_dir, remote)
+        os.remove(log_dir / "app.log.1")
+        (log_dir / "app.log.1").write_text("b1\nb2\n")
+        ship(db, log_dir, remote)
+
+    uploads = sorted(remote.text(path) for path in remote.files)
+    assert uploads == ["a1\na2\na3\n", "b1\nb2\n"]
+    assert all(path.startswith("rotated/app.log.1@") and path.endswith(".gz") for path in remote.files)
+
+
+def test_truncated_log_restarts_from_the_beginning(tmp_path, session_factory):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    app_log = log_dir / "app.log"
+    remote = Remote()
+
+    with session_factory() as db:
+        append(app_log, "first run line\n")
+        ship(db, log_dir, remote)
+
+        app_log.write_text("new\n")
+        ship(db, log_dir, remote)
+        assert remote.text("app/app-000002.log.gz") == "new\n"
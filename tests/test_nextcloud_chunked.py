@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from app.services.nextcloud_chunked import ChunkedUploader, ChunkedUploadError
+from app.services.sync import NextcloudSync
+
+FILES = "/remote.php/dav/files/dms"
+
+
+def make_file(tmp_path, size):
+    path = tmp_path / "backup.zip"
+    path.write_bytes(os.urandom(size))
+    return path
+
+
+def puts(dav):
+    return [path for method, path in dav.requests if method == 'PUT']
+
+
+def test_chunked_upload_assembles_file(webdav_server, tmp_path):
+    url, dav = webdav_server
+    dav.makedirs(f"{FILES}/DMS")
+    source = make_file(tmp_path, 10_500)
+
+    result = ChunkedUploader(url, "dms", "secret", chunk_size=1000).upload(str(source), "/DMS/backup.zip")
+
+    assert result['chunks'] == 11
+    assert result['chunks_sent'] == 11
+    assert dav.files[f"{FILES}/DMS/backup.zip"] == source.read_bytes()
+
+
+def test_interrupted_upload_resumes_from_stored_chunks(webdav_server, tmp_path):
+    url, dav = webdav_server
+    dav.makedirs(f"{FILES}/DMS")
+    source = make_file(tmp_path, 5_000)
+    uploader = ChunkedUploader(url, "dms", "secret", chunk_size=1000)
+
+    # Chunks 1-3 arrive, then the connection "drops"
+    original = uploader._request
+    calls = []
+
+    def flaky_request(method, request_url, ok, **kwargs):
+        if method == 'PUT':
+            calls.append(request_url)
+            if len(calls) == 4:
+                raise ChunkedUploadError("connection reset")
+        return original(method, request_url, ok, **kwargs)
+
+    uploader._request = flaky_request
+    with pytest.raises(ChunkedUploadError):
+        uploader.upload(str(source), "/DMS/backup.zip")
+    assert f"{FILES}/DMS/backup.zip" not in dav.files
+
+    dav.requests.clear()
+    result = ChunkedUploader(url, "dms", "secret", chunk_size=1000).upload(str(source), "/DMS/backup.zip")
+
+    assert result['chunks_resumed'] == 3
+    assert [p.rsplit('/', 1)[-1] for p in puts(dav)] == ["00004", "00005"]
+    assert dav.files[f"{FILES}/DMS/backup.zip"] == source.read_bytes()
+
+
+def test_nextcloud_sync_uses_chunks_above_threshold(webdav_server, tmp_path, monkeypatch):
+    url, dav = webdav_server
+    source = tmp_path / "docs"
+    source.mkdir()
+    (source / "small.pdf").write_bytes(b"x" * 100)
+    (source / "large.zip").write_bytes(os.urandom(5_000))
+
+    monkeypatch.setattr(NextcloudSync, "chunked_threshold", 1_000)
+    monkeypatch.setattr(NextcloudSync, "chunk_size", 1_000)
+    sync = NextcloudSync(url, "dms", "secret", "/DMS", workers=2)
+    result = sync.sync_documents(str(source))
+
+    assert result['success'], result
+    assert result['log']['files_synced'] == 2
+    assert dav.files[f"{FILES}/DMS/large.zip"] == (source / "large.zip").read_bytes()
+    assert dav.files[f"{FILES}/DMS/small.pdf"] == b"x" * 100
+    chunk_puts = [p for p in puts(dav) if "/uploads/" in p]
+    assert len(chunk_puts) == 5
+
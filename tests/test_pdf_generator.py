@@ -0,0 +1,52 @@
+from io import BytesIO
+
+from PyPDF2 import PdfReader
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from app.services import pdf_generator
+from app.services.pdf_generator import PDFGeneratorService, TEMPLATE_XOBJECT_NAME
+
+
+def make_heavy_template(path):
+    c = canvas.Canvas(str(path), pagesize=letter)
+    for i in range(300):
+        c.line(10, i % 700, 500, (i * 7) % 700)
+    c.drawString(72, 750, "Letterhead")
+    c.save()
+    return str(path)
+
+
+def render(template_path, pages):
+    content = "".join(f"<p>Paragraph {i}</p>" for i in range(pages * 40))
+    return PDFGeneratorService.generate_document_pdf(
+        document_number="DOC-20260101-0001",
+        title="Stamped",
+        content=content,
+        requested_by="admin",
+        template_path=template_path,
+    )
+
+
+def test_xobject_stamping_shares_one_template(tmp_path):
+    template_path = make_heavy_template(tmp_path / "letterhead.pdf")
+    reader = PdfReader(BytesIO(render(template_path, pages=5)))
+
+    assert len(reader.pages) > 1
+    forms = {
+        page['/Resources']['/XObject'][TEMPLATE_XOBJECT_NAME].indirect_reference.idnum
+        for page in reader.pages
+    }
+    assert len(forms) == 1
+    assert "Paragraph 0" in reader.pages[0].extract_text()
+
+
+def test_xobject_output_is_smaller_than_copy_mode(tmp_path, monkeypatch):
+    template_path = make_heavy_template(tmp_path / "letterhead.pdf")
+
+    stamped = render(template_path, pages=5)
+    monkeypatch.setattr(pdf_generator.settings, "template_merge_mode", "copy")
+    copied = render(template_path, pages=5)
+
+    assert len(PdfReader(BytesIO(stamped)).pages) == len(PdfReader(BytesIO(copied)).pages)
+    assert len(stamped) < len(copied) / 2
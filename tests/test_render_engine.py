@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services import render_engine as render_engine_module
+from app.services.render_engine import RenderEngine, RenderQueueFullError, RenderTimeoutError
+
+
+RENDER_KWARGS = dict(
+    document_number="DOC-20260101-0001",
+    title="Test",
+    content="<p>Hello <strong>world</strong></p>",
+    requested_by="admin",
+)
+
+
+def _slow_render(kwargs):
+    time.sleep(0.5)
+    return 0, b"%PDF-slow", {'entries': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def test_process_pool_render():
+    engine = RenderEngine(pool_size=1, timeout=60, queue_size=1)
+    engine.start()
+    try:
+        pdf_bytes = asyncio.run(engine.render(**RENDER_KWARGS))
+    finally:
+        engine.shutdown()
+    assert pdf_bytes.startswith(b"%PDF")
+
+
+def test_inline_render_when_not_started():
+    engine = RenderEngine(pool_size=0, timeout=60, queue_size=0)
+    pdf_bytes = asyncio.run(engine.render(**RENDER_KWARGS))
+    assert pdf_bytes.startswith(b"%PDF")
+
+
+def test_queue_full_rejects(monkeypatch):
+    monkeypatch.setattr(render_engine_module, "_render", _slow_render)
+    engine = RenderEngine(pool_size=0, timeout=60, queue_size=0)
+
+    async def run_two():
+        return await asyncio.gather(
+            engine.render(**RENDER_KWARGS),
+            engine.render(**RENDER_KWARGS),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(run_two())
+    assert first == b"%PDF-slow"
+    assert isinstance(second, RenderQueueFullError)
+
+
+def test_render_timeout(monkeypatch):
+    monkeypatch.setattr(render_engine_module, "_render", _slow_render)
+    engine = RenderEngine(pool_size=0, timeout=0.05, queue_size=0)
+    with pytest.raises(RenderTimeoutError):
+        asyncio.run(engine.render(**RENDER_KWARGS))
+
+
+def test_timed_out_render_holds_its_slot_until_it_finishes(monkeypatch):
+    release = threading.Event()
+
+    def stuck_render(kwargs):
+        release.wait(10)
+        return 0, b"%PDF-late", {'entries': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+
+    monkeypatch.setattr(render_engine_module, "_render", stuck_render)
+    engine = RenderEngine(pool_size=0, timeout=0.05, queue_size=0)
+    with pytest.raises(RenderTimeoutError):
+        asyncio.run(engine.render(**RENDER_KWARGS))
+
+    # The worker thread is still rendering, so the only slot is still taken
+    with pytest.raises(RenderQueueFullError):
+        asyncio.run(engine.render(**RENDER_KWARGS))
+
+    release.set()
+    engine.shutdown()
+    assert engine._slots.acquire(blocking=False)
@@ -0,0 +1,123 @@
+import os
+
+from sqlalchemy.exc import IntegrityError
+
+from app.models.replication_outbox import ReplicationOutbox
+from app.models.sync_state import SyncState
+from app.services.file_index import FileEntry
+from app.services.replication import LocalTarget, ReplicationService, Replicator
+from app.services.sync_state import SyncStateStore
+
+
+class FlakyTarget(LocalTarget):
+    def __init__(self, root, failures):
+        super().__init__(root)
+        self.failures = failures
+
+    def deliver(self, file_path, relative_path):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("share unavailable")
+        super().deliver(file_path, relative_path)
+
+
+def make_replicator(session_factory, target):
+    return Replicator(session_factory, batch_size=10, retry_backoff_seconds=0, target_factory=lambda name: target)
+
+
+def test_created_document_is_queued_and_replicated(api_client, admin_headers, session_factory, storage_dir,
+                                                   tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.replication.configured_targets", lambda: ["local"])
+    response = api_client.post("/api/documents/", json={"title": "Letter", "content": "<p>Hi</p>"},
+                               headers=admin_headers)
+    assert response.status_code == 201
+    file_name = response.json()["file_name"]
+
+    with session_factory() as db:
+        row = db.query(ReplicationOutbox).one()
+        assert (row.target, row.relative_path) == ("local", file_name)
+
+    replica = tmp_path / "replica"
+    replicator = make_replicator(session_factory, LocalTarget(str(replica)))
+    assert replicator.run_once() == 1
+
+    assert (replica / file_name).read_bytes() == (storage_dir / file_name).read_bytes()
+    with session_factory() as db:
+        assert db.query(ReplicationOutbox).count() == 0
+        # Recorded as synced, so a later full sync to the same place skips it
+        assert db.query(SyncState).one().path == file_name
+
+
+def test_failed_delivery_is_retried_with_backoff(session_factory, storage_dir, tmp_path):
+    source = storage_dir / "DOC-1.pdf"
+    source.write_bytes(b"%PDF")
+    with session_factory() as db:
+        ReplicationService.enqueue(db, str(source), targets=["local"])
+        db.commit()
+
+    target = FlakyTarget(str(tmp_path / "replica"), failures=1)
+    replicator = make_replicator(session_factory, target)
+    replicator.run_once()
+    with session_factory() as db:
+        row = db.query(ReplicationOutbox).one()
+        assert row.attempts == 1
+        assert row.last_error == "share unavailable"
+
+    replicator.run_once()
+    assert (tmp_path / "replica" / "DOC-1.pdf").exists()
+    with session_factory() as db:
+        assert db.query(ReplicationOutbox).count() == 0
+
+
+def test_nothing_is_queued_without_targets(session_factory, storage_dir):
+    with session_factory() as db:
+        assert ReplicationService.enqueue(db, os.path.join(str(storage_dir), "x.pdf")) == []
+
+
+def test_concurrent_replicators_never_take_the_same_row(session_factory, storage_dir, tmp_path):
+    with session_factory() as db:
+        for i in range(3):
+            source = storage_dir / f"DOC-{i}.pdf"
+            source.write_bytes(b"%PDF")
+            ReplicationService.enqueue(db, str(source), targets=["local"])
+        db.commit()
+
+    deliveries = []
+    other = make_replicator(session_factory, LocalTarget(str(tmp_path / "replica")))
+
+    class RacingTarget(LocalTarget):
+        def deliver(self, file_path, relative_path):
+            if not deliveries:
+                # A second process polls while this batch is being delivered
+                assert other.run_once() == 0
+            deliveries.append(relative_path)
+            super().deliver(file_path, relative_path)
+
+    replicator = make_replicator(session_factory, RacingTarget(str(tmp_path / "replica")))
+    assert replicator.run_once() == 3
+    assert sorted(deliveries) == ["DOC-0.pdf", "DOC-1.pdf", "DOC-2.pdf"]
+    with session_factory() as db:
+        assert db.query(ReplicationOutbox).count() == 0
+        assert db.query(SyncState).count() == 3
+
+
+def test_sync_state_recorded_concurrently_is_updated(session_factory, tmp_path, monkeypatch):
+    source = tmp_path / "DOC-1.pdf"
+    source.write_bytes(b"%PDF")
+    entry = FileEntry("DOC-1.pdf", str(source), 4, source.stat().st_mtime_ns)
+    record_batch = SyncStateStore._record_batch
+    raced = []
+
+    def losing_record_batch(self, batch, hashes, now):
+        if not raced:
+            # Another process inserts the same path first; this insert then fails on flush
+            raced.append(True)
+            with session_factory() as other:
+                SyncStateStore(other, self.destination).record([entry], {"DOC-1.pdf": "other"})
+            raise IntegrityError("INSERT INTO sync_state", {}, Exception("UNIQUE constraint failed"))
+        record_batch(self, batch, hashes, now)
+
+    monkeypatch.setattr(SyncStateStore, "_record_batch", losing_record_batch)
+    with session_factory() as db:
+        assert SyncStateStore(db, "local:/replica").record([entry], {"DOC-1.pdf": "mine"}) == 1
+        assert [(row.path, row.content_hash) for row in db.query(SyncState)] == [("DOC-1.pdf", "mine")]
@@ -0,0 +1,102 @@
+from app.models.document import Document
+from app.models.document_search import DocumentSearchIndex
+from app.services.search import SearchService, html_to_text
+
+
+def create(api_client, headers, title, content):
+    response = api_client.post("/api/documents/", json={"title": title, "content": content}, headers=headers)
+    assert response.status_code == 201
+    return response.json()
+
+
+def search(api_client, headers, **params):
+    response = api_client.get("/api/documents/search", params=params, headers=headers)
+    assert response.status_code == 200
+    return [doc["title"] for doc in response.json()]
+
+
+def test_html_to_text():
+    assert html_to_text("<h1>Title</h1><p>Hello &amp; <b>bye</b></p><script>x()</script>") == "Title\nHello & bye"
+
+
+def test_created_documents_are_searchable_by_body(api_client, admin_headers):
+    create(api_client, admin_headers, "Offer letter", "<p>Welcome aboard, the salary is attached.</p>")
+    create(api_client, admin_headers, "Leave request", "<p>Annual leave for December.</p>")
+
+    assert search(api_client, admin_headers, q="salary") == ["Offer letter"]
+    # Prefix match on every term
+    assert search(api_client, admin_headers, q="ann decem") == ["Leave request"]
+    assert search(api_client, admin_headers, q="salary december") == []
+
+
+def test_title_matches_rank_above_body_matches(api_client, admin_headers):
+    create(api_client, admin_headers, "Minutes", "<p>Budget was discussed briefly.</p>")
+    create(api_client, admin_headers, "Budget", "<p>Figures for next year.</p>")
+
+    assert search(api_client, admin_headers, q="budget") == ["Budget", "Minutes"]
+
+
+def test_search_is_paginated(api_client, admin_headers):
+    for i in range(5):
+        create(api_client, admin_headers, f"Invoice {i}", "<p>Payment due</p>")
+
+    first = search(api_client, admin_headers, q="invoice", limit=2)
+    rest = search(api_client, admin_headers, q="invoice", skip=2, limit=10)
+    assert len(first) == 2
+    assert len(rest) == 3
+    assert not set(first) & set(rest)
+
+
+def test_filters_apply_before_ranking_and_paging(api_client, admin_headers):
+    create(api_client, admin_headers, "Minutes", "<p>Budget was discussed briefly.</p>")
+    for i in range(11):
+        create(api_client, admin_headers, f"Budget {i}", "<p>Figures for next year.</p>")
+
+    # "Minutes" ranks last for "budget", below the eleven title matches
+    assert search(api_client, admin_headers, q="budget", title="Minutes", limit=1) == ["Minutes"]
+    assert sorted(search(api_client, admin_headers, q="budget", title="Budget 1")) == ["Budget 1", "Budget 10"]
+    assert search(api_client, admin_headers, q="budget", title="Budget 1", skip=2) == []
+
+
+def test_title_filter_matches_title_words_without_a_query(api_client, admin_headers):
+    create(api_client, admin_headers, "Budget plan", "<p>Minutes</p>")
+    create(api_client, admin_headers, "Minutes", "<p>Budget plan discussed.</p>")
+
+    # Words of the title only (by prefix), not of the number or body
+    assert search(api_client, admin_headers, title="plan budg") == ["Budget plan"]
+    assert search(api_client, admin_headers, title="minute") == ["Minutes"]
+    assert search(api_client, admin_headers, title="lan") == []
+
+
+def test_document_number_filter_matches_the_start_of_the_number(api_client, admin_headers):
+    created = create(api_client, admin_headers, "Memo", "<p>Notes</p>")
+    number = created["document_number"]
+
+    assert search(api_client, admin_headers, document_number=number[:8]) == ["Memo"]
+    assert search(api_client, admin_headers, q="memo", document_number=number[:8]) == ["Memo"]
+    assert search(api_client, admin_headers, document_number=number[4:]) == []
+    assert search(api_client, admin_headers, q="memo", document_number=number[4:]) == []
+    # LIKE wildcards in the filter are matched literally
+    assert search(api_client, admin_headers, document_number="%") == []
+    assert search(api_client, admin_headers, q="memo", document_number="DOC_") == []
+
+
+def test_search_operators_in_input_are_treated_as_text(api_client, admin_headers):
+    create(api_client, admin_headers, "Contract", "<p>Terms</p>")
+    assert search(api_client, admin_headers, q='contract" (*:-') == ["Contract"]
+
+
+def test_reindex_indexes_documents_missing_from_the_index(api_client, admin_headers, session_factory):
+    created = create(api_client, admin_headers, "Memo", "<p>Quarterly figures</p>")
+    with session_factory() as db:
+        db.query(DocumentSearchIndex).delete()
+        db.commit()
+    assert search(api_client, admin_headers, q="memo") == []
+
+    response = api_client.post("/api/documents/search/reindex", headers=admin_headers)
+    assert response.json() == {"indexed": 1}
+    assert search(api_client, admin_headers, q="memo") == ["Memo"]
+
+    with session_factory() as db:
+        document = db.get(Document, created["id"])
+        assert SearchService.search(db, created["document_number"]) == [document.id]
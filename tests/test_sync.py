@@ -0,0 +1,357 @@
+import os
+import threading
+from datetime import datetime
+
+from app.models.document import Document
+from app.models.sync_state import SyncState
+from app.services.file_copy import copy_file
+from app.services.file_index import scan_tree
+from app.services.restore import RestoreService
+from app.services.sync import LocalBackupSync, RemoteSync
+from app.services.sync_state import SyncStateStore
+
+
+class RecordingSync(RemoteSync):
+    """A destination that records uploads instead of talking to a server."""
+
+    retry_backoff_seconds = 0
+
+    def __init__(self, fail=(), flaky=0, workers=1):
+        self.uploads = []
+        self.dirs = []
+        self.fail = set(fail)
+        self.workers = workers
+        self.connections = []
+        # Fail this many upload calls in total before succeeding
+        self.flaky = [flaky]
+        self.lock = threading.Lock()
+        self.remote_dirs = {"/"}
+        self.listed = []
+        self.made = []
+        # remote path -> content
+        self.stored = {}
+
+    @property
+    def destination(self):
+        return "test://remote/DMS"
+
+    def _connect(self):
+        self.connection = object()
+        self.connections.append(self.connection)
+        return True
+
+    def _remote_path(self, relative_path):
+        return f"/DMS/{relative_path}"
+
+    def _ensure_dir(self, remote_dir):
+        self.dirs.append(remote_dir)
+
+    def _list_subdirs(self, remote_dir):
+        self.listed.append(remote_dir)
+        prefix = remote_dir.rstrip('/') + '/'
+        return {d[len(prefix):] for d in self.remote_dirs if d.startswith(prefix) and '/' not in d[len(prefix):]}
+
+    def _make_dir(self, remote_dir):
+        self.made.append(remote_dir)
+        self.remote_dirs.add(remote_dir)
+
+    def _upload_file(self, local_path, remote_path):
+        if os.path.basename(local_path) in self.fail:
+            raise OSError("connection reset")
+        with self.lock:
+            if self.flaky[0]:
+                self.flaky[0] -= 1
+                raise OSError("timed out")
+        self.uploads.append(remote_path)
+        with open(local_path, 'rb') as f:
+            self.stored[remote_path] = f.read()
+
+    def _download_file(self, remote_path, local_path):
+        with open(local_path, 'wb') as f:
+            f.write(self.stored[remote_path])
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_second_run_uploads_only_new_and_changed_files(tmp_path, session_factory):
+    source = tmp_path / "docs"
+    write(source / "a.pdf", b"a")
+    write(source / "2026/b.pdf", b"b")
+    write(source / ".hidden", b"x")
+
+    with session_factory() as db:
+        store = SyncStateStore(db, "test://remote/DMS")
+        sync = RecordingSync()
+        result = sync.sync_documents(str(source), state_store=store)
+        assert result['log']['files_synced'] == 2
+        assert sorted(sync.uploads) == ["/DMS/2026/b.pdf", "/DMS/a.pdf"]
+
+        write(source / "c.pdf", b"c")
+        write(source / "a.pdf", b"aa")
+        sync = RecordingSync()
+        result = sync.sync_documents(str(source), state_store=store)
+        assert sorted(sync.uploads) == ["/DMS/a.pdf", "/DMS/c.pdf"]
+        assert result['log']['files_skipped'] == 1
+
+        sync = RecordingSync()
+        sync.sync_documents(str(source), state_store=store)
+        assert sync.uploads == []
+
+
+def test_touched_file_with_same_content_is_not_uploaded(tmp_path, session_factory):
+    source = tmp_path / "docs"
+    write(source / "a.pdf", b"same")
+    with session_factory() as db:
+        store = SyncStateStore(db, "test://remote/DMS")
+        RecordingSync().sync_documents(str(source), state_store=store)
+
+        st = os.stat(source / "a.pdf")
+        os.utime(source / "a.pdf", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        plan = store.plan(scan_tree(str(source)))
+        assert plan.upload == []
+        assert len(plan.touched) == 1
+
+
+def test_dry_run_reports_plan_without_uploading(tmp_path, session_factory):
+    source = tmp_path / "docs"
+    write(source / "a.pdf", b"a")
+    write(source / "b.pdf", b"b")
+    with session_factory() as db:
+        store = SyncStateStore(db, "test://remote/DMS")
+        sync = RecordingSync()
+        result = sync.sync_documents(str(source), state_store=store, dry_run=True)
+
+        assert sync.uploads == []
+        assert result['plan']['to_upload'] == 2
+        assert [f['path'] for f in result['plan']['files']] == ["a.pdf", "b.pdf"]
+        assert db.query(SyncState).count() == 0
+
+
+def test_failed_uploads_are_retried_next_run(tmp_path, session_factory):
+    source = tmp_path / "docs"
+    write(source / "a.pdf", b"a")
+    write(source / "b.pdf", b"b")
+    with session_factory() as db:
+        store = SyncStateStore(db, "test://remote/DMS")
+        result = RecordingSync(fail={"b.pdf"}).sync_documents(str(source), state_store=store)
+        assert result['log']['files_failed'] == 1
+
+        sync = RecordingSync()
+        sync.sync_documents(str(source), state_store=store)
+        assert sync.uploads == ["/DMS/b.pdf"]
+
+
+def test_full_sync_and_removed_files(tmp_path, session_factory):
+    source = tmp_path / "docs"
+    write(source / "a.pdf", b"a")
+    write(source / "b.pdf", b"b")
+    with session_factory() as db:
+        store = SyncStateStore(db, "test://remote/DMS")
+        RecordingSync().sync_documents(str(source), state_store=store)
+
+        os.remove(source / "b.pdf")
+        sync = RecordingSync()
+        result = sync.sync_documents(str(source), state_store=store, full=True)
+        assert sync.uploads == ["/DMS/a.pdf"]
+        assert result['log']['plan']['removed_locally'] == 1
+        assert [row.path for row in db.query(SyncState)] == ["a.pdf"]
+
+
+def test_empty_source_keeps_the_sync_state(tmp_path, session_factory):
+    source = tmp_path / "docs"
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        write(source / name, name.encode())
+    with session_factory() as db:
+        store = SyncStateStore(db, "test://remote/DMS")
+        RecordingSync().sync_documents(str(source), state_store=store)
+
+        # Storage not mounted: the directory is there but empty
+        for name in ("a.pdf", "b.pdf", "c.pdf"):
+            os.remove(source / name)
+        result = RecordingSync().sync_documents(str(source), state_store=store)
+
+        assert not result['success']
+        assert result['log']['removals_held'] == 3
+        assert sorted(store.load()) == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_uploads_run_on_a_pool_of_connections(tmp_path, session_factory):
+    source = tmp_path / "docs"
+    for i in range(40):
+        write(source / f"{i:03d}.pdf", b"x" * i)
+
+    with session_factory() as db:
+        store = SyncStateStore(db, "test://remote/DMS")
+        sync = RecordingSync(workers=4)
+        result = sync.sync_documents(str(source), state_store=store)
+
+        log = result['log']
+        assert log['files_synced'] == 40
+        assert log['workers'] == 4
+        assert log['bytes_synced'] == sum(range(40))
+        assert len(sync.connections) == 4
+        assert len(sync.uploads) == 40
+        assert db.query(SyncState).count() == 40
+
+
+def test_transient_failures_are_retried_on_a_new_connection(tmp_path, session_factory):
+    source = tmp_path / "docs"
+    write(source / "a.pdf", b"a")
+    write(source / "b.pdf", b"b")
+
+    sync = RecordingSync(flaky=2)
+    result = sync.sync_documents(str(source))
+
+    assert result['log']['files_synced'] == 2
+    assert result['log']['files_failed'] == 0
+    assert result['log']['retries'] == 2
+    # One connection for the worker plus one per retry
+    assert len(sync.connections) == 3
+
+
+def test_plan_directories_orders_parents_first():
+    paths = ["/DMS/2026/01/a.pdf", "/DMS/2026/02/b.pdf", "/DMS/c.pdf", "/DMS/2026/01/d.pdf"]
+    assert RemoteSync.plan_directories(paths) == ["/DMS", "/DMS/2026", "/DMS/2026/01", "/DMS/2026/02"]
+
+
+def test_directories_are_created_once_per_run_not_per_file(tmp_path):
+    source = tmp_path / "docs"
+    for month in ("01", "02", "03"):
+        for i in range(10):
+            write(source / "2026" / month / f"{i}.pdf", b"x")
+
+    sync = RecordingSync(workers=3)
+    sync.remote_dirs.add("/DMS")
+    result = sync.sync_documents(str(source))
+
+    assert result['log']['files_synced'] == 30
+    assert sorted(sync.made) == ["/DMS/2026", "/DMS/2026/01", "/DMS/2026/02", "/DMS/2026/03"]
+    # Only directories that already existed are listed; no per-file probing
+    assert sync.listed == ["/", "/DMS"]
+    assert sync.dirs == []
+
+    # A second run on the same instance knows the whole tree already
+    sync.listed.clear()
+    sync.made.clear()
+    sync.sync_documents(str(source))
+    assert sync.listed == [] and sync.made == []
+
+
+def test_copy_file_keeps_content_and_mtime(tmp_path):
+    source = tmp_path / "a.pdf"
+    source.write_bytes(b"x" * 100_000)
+    os.utime(source, ns=(1_700_000_000_000_000_000, 1_700_000_000_000_000_000))
+
+    method = copy_file(str(source), str(tmp_path / "b.pdf"))
+
+    assert method in ("reflink", "copy_file_range", "copy")
+    assert (tmp_path / "b.pdf").read_bytes() == source.read_bytes()
+    assert os.stat(tmp_path / "b.pdf").st_mtime_ns == 1_700_000_000_000_000_000
+
+
+def test_local_mirror_skips_unchanged_files(tmp_path):
+    source = tmp_path / "src"
+    source.mkdir()
+    (source / "a.pdf").write_bytes(b"a")
+    (source / "b.pdf").write_bytes(b"b")
+    target = tmp_path / "mirror"
+
+    assert LocalBackupSync.sync_to_local(str(source), str(target))["log"]["files_synced"] == 2
+    (source / "b.pdf").write_bytes(b"bb")
+    log = LocalBackupSync.sync_to_local(str(source), str(target))["log"]
+
+    assert (log["files_synced"], log["files_skipped"]) == (1, 1)
+    assert (target / "b.pdf").read_bytes() == b"bb"
+
+
+def test_snapshots_hardlink_unchanged_files(tmp_path, monkeypatch):
+    source = tmp_path / "src"
+    (source / "2026").mkdir(parents=True)
+    (source / "2026" / "a.pdf").write_bytes(b"a")
+    (source / "b.pdf").write_bytes(b"b")
+    target = tmp_path / "snapshots"
+    clock = [datetime(2026, 10, 17, 2, 0)]
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock[0]
+
+    monkeypatch.setattr("app.services.sync.datetime", Clock)
+
+    first = LocalBackupSync.snapshot_to_local(str(source), str(target))
+    assert first["success"] and first["log"]["files_synced"] == 2
+    (source / "b.pdf").write_bytes(b"changed")
+    clock[0] = datetime(2026, 10, 18, 2, 0)
+    second = LocalBackupSync.snapshot_to_local(str(source), str(target), keep=1)
+
+    log = second["log"]
+    assert log["snapshot"] == "20261018_020000"
+    assert (log["files_synced"], log["files_linked"], log["previous_snapshot"]) == (1, 1, "20261017_020000")
+    assert log["pruned"] == ["20261017_020000"]
+    assert LocalBackupSync.list_snapshots(str(target)) == [log["snapshot"]]
+    snapshot = target / log["snapshot"]
+    assert os.stat(snapshot / "2026" / "a.pdf").st_nlink == 1  # its first link was pruned
+    assert (snapshot / "b.pdf").read_bytes() == b"changed"
+    assert os.readlink(target / "latest") == log["snapshot"]
+
+
+def test_restore_pulls_synced_files_back_and_resumes(tmp_path, session_factory):
+    source = tmp_path / "docs"
+    write(source / "a.pdf", b"a" * 100)
+    write(source / "2026/b.pdf", b"b" * 200)
+    write(source / "c.pdf", b"c")
+    target = tmp_path / "restored"
+
+    with session_factory() as db:
+        store = SyncStateStore(db, "test://remote/DMS")
+        sync = RecordingSync(workers=2)
+        sync.sync_documents(str(source), state_store=store)
+
+        # The remote copy of c.pdf is damaged, a.pdf is already back on disk
+        sync.stored["/DMS/c.pdf"] = b"x"
+        write(target / "a.pdf", b"a" * 100)
+        result = sync.restore_documents(str(target), store)
+
+        log = result['log']
+        assert not result['success']
+        assert (log['files_restored'], log['files_present'], log['files_failed']) == (1, 1, 1)
+        assert "Checksum mismatch" in log['errors'][0]['error']
+        assert (target / "2026/b.pdf").read_bytes() == b"b" * 200
+        assert os.stat(target / "2026/b.pdf").st_mtime_ns == os.stat(source / "2026/b.pdf").st_mtime_ns
+        assert not (target / "c.pdf").exists()
+        assert [p.name for p in target.rglob(".*")] == []
+
+        # Resuming fetches only what is still missing; a local edit is a conflict
+        sync.stored["/DMS/c.pdf"] = b"c"
+        write(target / "a.pdf", b"edited")
+        log = sync.restore_documents(str(target), store)['log']
+        assert (log['files_restored'], log['files_present'], log['conflicts']) == (1, 1, ["a.pdf"])
+        assert (target / "a.pdf").read_bytes() == b"edited"
+
+        log = sync.restore_documents(str(target), store, overwrite=True)['log']
+        assert (log['files_restored'], log['files_present']) == (1, 2)
+        assert (target / "a.pdf").read_bytes() == b"a" * 100
+
+
+def test_relink_points_documents_at_restored_files(tmp_path, session_factory, admin_user):
+    storage = tmp_path / "storage"
+    write(storage / "DOC-1.pdf", b"pdf")
+    with session_factory() as db:
+        db.add_all([
+            Document(document_number="DOC-1", title="Moved", requested_by_id=admin_user.id,
+                     file_path="/old/mount/DOC-1.pdf", file_name="DOC-1.pdf"),
+            Document(document_number="DOC-2", title="Lost", requested_by_id=admin_user.id,
+                     file_path="/old/mount/DOC-2.pdf", file_name="DOC-2.pdf"),
+        ])
+        db.commit()
+
+        result = RestoreService.relink_files(db, str(storage))
+
+        assert result['documents']['relinked'] == 1
+        assert result['documents']['missing'] == ["/old/mount/DOC-2.pdf"]
+        paths = dict(db.query(Document.document_number, Document.file_path))
+        assert paths == {"DOC-1": str(storage / "DOC-1.pdf"), "DOC-2": "/old/mount/DOC-2.pdf"}
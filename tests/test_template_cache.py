@@ -0,0 +1,66 @@
+import os
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from app.services.pdf_generator import PDFGeneratorService
+from app.services.template_cache import TemplateCache, template_cache
+
+
+def make_template(path, text="Letterhead"):
+    c = canvas.Canvas(str(path), pagesize=letter)
+    c.drawString(72, 750, text)
+    c.save()
+    return str(path)
+
+
+def test_hit_miss_and_reparse_on_change(tmp_path):
+    cache = TemplateCache(max_entries=2)
+    path = make_template(tmp_path / "a.pdf")
+
+    with cache.open(path) as reader:
+        assert len(reader.pages) == 1
+    with cache.open(path):
+        pass
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+    # Re-uploading over the same path changes mtime/size and forces a re-parse
+    make_template(tmp_path / "a.pdf", text="A different, longer letterhead")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    with cache.open(path):
+        pass
+    assert cache.stats()['misses'] == 2
+
+
+def test_lru_eviction_and_invalidate(tmp_path):
+    cache = TemplateCache(max_entries=2)
+    paths = [make_template(tmp_path / f"{name}.pdf") for name in "abc"]
+
+    for path in paths:
+        with cache.open(path):
+            pass
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['evictions'] == 1
+
+    cache.invalidate(paths[2])
+    assert cache.stats()['entries'] == 1
+
+
+def test_templated_render_uses_cache(tmp_path):
+    path = make_template(tmp_path / "letterhead.pdf")
+    template_cache.clear()
+    hits_before = template_cache.stats()['hits']
+
+    for number in ("DOC-20260101-0001", "DOC-20260101-0002"):
+        pdf_bytes = PDFGeneratorService.generate_document_pdf(
+            document_number=number,
+            title="Cached",
+            content="<p>Body</p>",
+            requested_by="admin",
+            template_path=path,
+        )
+        assert pdf_bytes.startswith(b"%PDF")
+
+    assert template_cache.stats()['hits'] == hits_before + 1
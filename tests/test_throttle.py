@@ -0,0 +1,91 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from app.services.nextcloud_chunked import ChunkedUploader
+from app.services.throttle import (
+    BandwidthSchedule, Throttle, ThrottledReader, TokenBucket, parse_rate,
+)
+
+FILES = "/remote.php/dav/files/dms"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_parse_rate_units():
+    assert parse_rate("2M") == 2 * 1024 * 1024
+    assert parse_rate("512kb/s") == 512 * 1024
+    assert parse_rate("1000") == 1000
+    assert parse_rate("unlimited") == 0
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+
+
+def test_token_bucket_paces_to_rate_after_the_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(1000, clock=clock, sleep=clock.sleep)
+
+    assert bucket.consume(1000) == 0          # one second of burst
+    assert bucket.consume(500) == pytest.approx(0.5)
+    assert bucket.consume(2000) == pytest.approx(2.0)
+    assert clock.now == pytest.approx(2.5)     # 3500 bytes at 1000 B/s, minus the burst
+
+    bucket.set_rate(0)
+    assert bucket.consume(10 ** 9) == 0
+
+
+def test_schedule_windows_and_default():
+    schedule = BandwidthSchedule.parse("08:00-18:00=1M; 22:00-06:00=4M; 2M")
+    assert schedule.rate_at(datetime(2026, 10, 19, 9, 30)) == 1024 ** 2
+    assert schedule.rate_at(datetime(2026, 10, 19, 18, 0)) == 2 * 1024 ** 2
+    assert schedule.rate_at(datetime(2026, 10, 19, 23, 0)) == 4 * 1024 ** 2
+    assert schedule.rate_at(datetime(2026, 10, 19, 3, 0)) == 4 * 1024 ** 2
+    assert not BandwidthSchedule.parse("").limited
+    assert not BandwidthSchedule.parse("22:00-06:00=0").limited
+    with pytest.raises(ValueError):
+        BandwidthSchedule.parse("8-18=1M")
+
+
+def test_throttle_follows_the_schedule():
+    clock = FakeClock()
+    moment = [datetime(2026, 10, 19, 17, 59)]
+    throttle = Throttle(BandwidthSchedule.parse("08:00-18:00=1000"), now=lambda: moment[0],
+                        bucket=TokenBucket(1000, clock=clock, sleep=clock.sleep))
+
+    reader = ThrottledReader(io.BytesIO(b"x" * 3000), throttle)
+    while reader.read(500):
+        pass
+    assert throttle.waited == pytest.approx(2.0)
+
+    # Office hours are over: the cap is lifted at the next schedule check
+    moment[0] = datetime(2026, 10, 19, 18, 0)
+    clock.now += 1
+    throttle.consume(10 ** 6)
+    assert throttle.rate == 0
+    assert throttle.bytes == 3000 + 10 ** 6
+    assert throttle.stats()['throttled_seconds'] == pytest.approx(2.0)
+
+
+def test_chunked_upload_goes_through_the_throttle(webdav_server, tmp_path):
+    url, dav = webdav_server
+    dav.makedirs(f"{FILES}/DMS")
+    source = tmp_path / "big.zip"
+    source.write_bytes(b"y" * 5000)
+    throttle = Throttle(BandwidthSchedule.parse("1G"))
+
+    ChunkedUploader(url, "dms", "secret", chunk_size=1000, throttle=throttle).upload(str(source), "/DMS/big.zip")
+
+    assert dav.files[f"{FILES}/DMS/big.zip"] == source.read_bytes()
+    assert throttle.bytes == 5000